@@ -1,4 +1,4 @@
-from prometheus_client import Histogram, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 from prometheus_client.utils import INF
 
 from pipert.core.metrics_collector import MetricsCollector
@@ -18,6 +18,57 @@ class PrometheusCollector(MetricsCollector):
                                 ['output_component'],
                                 buckets=buckets)
 
+    REPLICA_TIME = Histogram('routine_replica_processing_seconds',
+                             'Time spent processing routine, per replica',
+                             ['routine', 'component', 'replica'],
+                             buckets=buckets)
+
+    BATCH_TIME = Histogram('routine_batch_processing_seconds',
+                           'Time spent processing a batch of messages',
+                           ['routine', 'component'],
+                           buckets=buckets)
+
+    BATCH_SIZE = Histogram('routine_batch_size',
+                           'Number of messages in a processed batch',
+                           ['routine', 'component'],
+                           buckets=(1, 2, 4, 8, 16, 32, 64, INF))
+
+    MISSED_DEADLINES = Counter('routine_missed_deadlines',
+                               'Iterations of a paced routine that did not start on time',
+                               ['routine', 'component'])
+
+    SECTION_TIME = Counter('routine_section_seconds',
+                           'Time spent in each section of the routine iterations',
+                           ['routine', 'component', 'section'])
+
+    UTILIZATION = Gauge('routine_utilization',
+                        'Share of wall time the routine thread spent on the CPU',
+                        ['routine', 'component'])
+
+    SHED_MESSAGES = Counter('routine_shed_messages',
+                            'Messages dropped because they were older than the routine max age',
+                            ['routine', 'component'])
+
+    CPU_BUDGET = Gauge('routine_cpu_budget',
+                       'Effective intra-op threads and CPUs of the routine',
+                       ['routine', 'component', 'setting'])
+
+    QUEUE_SIZE = Gauge('queue_size',
+                       'Items in the queue, its capacity and high water mark',
+                       ['queue', 'component', 'stat'])
+
+    QUEUE_ITEMS = Gauge('queue_items_total',
+                        'Items that were enqueued, dequeued and dropped',
+                        ['queue', 'component', 'stat'])
+
+    QUEUE_WAIT = Gauge('queue_wait_seconds_total',
+                       'Seconds producers and consumers waited on the queue',
+                       ['queue', 'component', 'stat'])
+
+    SHARED_MEMORY = Gauge('shared_memory_total',
+                          'Late reads, expired leases, pool fallbacks and leaked shared memory',
+                          ['component', 'stat'])
+
     def __init__(self, port):
         super().__init__()
         self.port = port
@@ -31,4 +82,64 @@ class PrometheusCollector(MetricsCollector):
             .observe(execution_time)
 
     def collect_latency(self, latency, output_component):
-        self.REQUEST_LATENCY.labels(output_component=output_component).observe(latency)
\ No newline at end of file
+        self.REQUEST_LATENCY.labels(output_component=output_component).observe(latency)
+
+    def collect_replica_execution_time(self, execution_time, routine_name, component_name, replica):
+        self.REQUEST_TIME.labels(routine=routine_name,
+                                 component=component_name) \
+            .observe(execution_time)
+        self.REPLICA_TIME.labels(routine=routine_name,
+                                 component=component_name,
+                                 replica=replica) \
+            .observe(execution_time)
+
+    def collect_batch_execution_time(self, execution_time, batch_size, routine_name, component_name):
+        self.BATCH_TIME.labels(routine=routine_name,
+                               component=component_name) \
+            .observe(execution_time)
+        self.BATCH_SIZE.labels(routine=routine_name,
+                               component=component_name) \
+            .observe(batch_size)
+
+    def collect_missed_deadlines(self, missed_deadlines, routine_name, component_name):
+        self.MISSED_DEADLINES.labels(routine=routine_name,
+                                     component=component_name) \
+            .inc(missed_deadlines)
+
+    def collect_time_breakdown(self, time_breakdown, routine_name, component_name):
+        for section, seconds in time_breakdown.items():
+            if section in ("iterations", "utilization"):
+                continue
+            self.SECTION_TIME.labels(routine=routine_name,
+                                     component=component_name,
+                                     section=section) \
+                .inc(seconds)
+        self.UTILIZATION.labels(routine=routine_name,
+                                component=component_name) \
+            .set(time_breakdown["utilization"])
+
+    def collect_shed_messages(self, count, routine_name, component_name):
+        self.SHED_MESSAGES.labels(routine=routine_name,
+                                  component=component_name) \
+            .inc(count)
+
+    def collect_cpu_budget(self, settings, routine_name, component_name):
+        for setting, value in settings.items():
+            self.CPU_BUDGET.labels(routine=routine_name,
+                                   component=component_name,
+                                   setting=setting) \
+                .set(value)
+
+    def collect_queue_stats(self, queue_stats, queue_name, component_name):
+        for gauge, stats in ((self.QUEUE_SIZE, ("size", "maxsize", "high_water")),
+                             (self.QUEUE_ITEMS, ("enqueued", "dequeued", "dropped")),
+                             (self.QUEUE_WAIT, ("put_wait", "get_wait"))):
+            for stat in stats:
+                gauge.labels(queue=queue_name,
+                             component=component_name,
+                             stat=stat) \
+                    .set(queue_stats[stat])
+
+    def collect_shared_memory_stats(self, shared_memory_stats, component_name):
+        for stat, value in shared_memory_stats.items():
+            self.SHARED_MEMORY.labels(component=component_name, stat=stat).set(value)
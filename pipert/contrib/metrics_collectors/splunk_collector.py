@@ -25,3 +25,52 @@ class SplunkCollector(MetricsCollector):
         event = {"fields": {"metric_name:latency": latency,
                             "output_component": output_component}}
         self.HEC_sender.batchEvent(event)
+
+    def collect_replica_execution_time(self, execution_time, routine_name, component_name, replica):
+        event = {"fields": {"metric_name:execution_time": execution_time,
+                            "routine": routine_name,
+                            "component": component_name,
+                            "replica": replica}}
+        self.HEC_sender.batchEvent(event)
+
+    def collect_batch_execution_time(self, execution_time, batch_size, routine_name, component_name):
+        event = {"fields": {"metric_name:batch_execution_time": execution_time,
+                            "batch_size": batch_size,
+                            "routine": routine_name,
+                            "component": component_name}}
+        self.HEC_sender.batchEvent(event)
+
+    def collect_missed_deadlines(self, missed_deadlines, routine_name, component_name):
+        event = {"fields": {"metric_name:missed_deadlines": missed_deadlines,
+                            "routine": routine_name,
+                            "component": component_name}}
+        self.HEC_sender.batchEvent(event)
+
+    def collect_time_breakdown(self, time_breakdown, routine_name, component_name):
+        fields = {"metric_name:" + section: value for section, value in time_breakdown.items()}
+        fields.update({"routine": routine_name,
+                       "component": component_name})
+        self.HEC_sender.batchEvent({"fields": fields})
+
+    def collect_shed_messages(self, count, routine_name, component_name):
+        event = {"fields": {"metric_name:shed_messages": count,
+                            "routine": routine_name,
+                            "component": component_name}}
+        self.HEC_sender.batchEvent(event)
+
+    def collect_cpu_budget(self, settings, routine_name, component_name):
+        fields = {"metric_name:" + setting: value for setting, value in settings.items()}
+        fields.update({"routine": routine_name,
+                       "component": component_name})
+        self.HEC_sender.batchEvent({"fields": fields})
+
+    def collect_queue_stats(self, queue_stats, queue_name, component_name):
+        fields = {"metric_name:queue_" + stat: value for stat, value in queue_stats.items()}
+        fields.update({"queue": queue_name,
+                       "component": component_name})
+        self.HEC_sender.batchEvent({"fields": fields})
+
+    def collect_shared_memory_stats(self, shared_memory_stats, component_name):
+        fields = {"metric_name:shared_memory_" + stat: value for stat, value in shared_memory_stats.items()}
+        fields["component"] = component_name
+        self.HEC_sender.batchEvent({"fields": fields})
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from urllib.parse import urlparse
+
+from pipert.core.message_handlers import AsyncRedisHandler, create_message_handler
+from pipert.core.message import message_decode
+from pipert.core.routine import Routine, RoutineTypes
+from pipert.core.utlis.queue_handler import put_latest
+
+
+class AsyncMessageFromRedis(Routine):
+    """
+    Reads the most recent message from a redis stream like MessageFromRedis,
+    but as an asyncio routine, so many readers can share the component's
+    event loop thread instead of holding a thread each.
+
+    A read awaits a message for up to block_ms milliseconds, without
+    block_ms the routine polls every poll_interval seconds.
+    """
+    routine_type = RoutineTypes.INPUT
+
+    def __init__(self, redis_read_key, message_queue, transport="redis", block_ms=100, count=1,
+                 poll_interval=0.005, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redis_read_key = redis_read_key
+        self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
+        self.message_queue = message_queue
+        # "redis", or "shm" for components on the same host
+        self.transport = transport
+        self.block_ms = block_ms
+        # the number of messages a blocking read fetches from Redis at once
+        self.count = count
+        self.poll_interval = poll_interval
+        self.msg_handler = None
+
+    async def main_logic(self, *args, **kwargs):
+        encoded_msg = await self._read_most_recent_msg()
+        if not encoded_msg:
+            if not self.block_ms:
+                await asyncio.sleep(self.poll_interval)
+            return False
+        msg = message_decode(encoded_msg)
+        msg.record_entry(self.component_name, self.logger)
+        put_latest(self.message_queue, msg)
+        return True
+
+    async def _read_most_recent_msg(self):
+        if self.transport == "redis":
+            return await self.msg_handler.read_most_recent_msg(self.redis_read_key)
+        if self.block_ms:
+            # the shared memory rings have no asyncio interface, a blocking
+            # read waits on a thread of the loop's executor so the other
+            # routines of the loop keep running
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.msg_handler.read_most_recent_msg, self.redis_read_key)
+        return self.msg_handler.read_most_recent_msg(self.redis_read_key)
+
+    async def setup(self, *args, **kwargs):
+        if self.transport == "redis":
+            self.msg_handler = AsyncRedisHandler(self.url, block_ms=self.block_ms, count=self.count,
+                                                 connection_pools=self.redis_pools)
+            await self.msg_handler.connect()
+        else:
+            self.msg_handler = create_message_handler(self.transport, self.url, block_ms=self.block_ms)
+
+    async def cleanup(self, *args, **kwargs):
+        if self.transport == "redis":
+            await self.msg_handler.close()
+        else:
+            self.msg_handler.close()
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "redis_read_key": "String",
+            "message_queue": "QueueOut",
+            "transport": "String",
+            "block_ms": "Integer",
+            "count": "Integer",
+            "poll_interval": "Float"
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.message_queue == queue
@@ -1,19 +1,16 @@
-import time
-from pipert import Routine
 from pipert.core import Message
-from pipert.core.routine import RoutineTypes
-from queue import Empty
+from pipert.core.routine import RoutineTypes, BatchRoutine
 import torch
 import torchvision
 
 
-class ClassificationLogic(Routine):
+class ClassificationLogic(BatchRoutine):
     routine_type = RoutineTypes.PROCESSING
 
-    def __init__(self, in_queue, out_queue, weights, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.in_queue = in_queue
-        self.out_queue = out_queue
+    def __init__(self, in_queue, out_queue, weights, drop_oldest=True, *args, **kwargs):
+        # the predictions of the freshest frames are kept when the consumer
+        # falls behind
+        super().__init__(in_queue, out_queue, drop_oldest=drop_oldest, *args, **kwargs)
         self.weights = weights
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.net = torchvision.models.resnet50(pretrained=False)
@@ -27,33 +24,27 @@ class ClassificationLogic(Routine):
             {k[4:]: v for k, v in chkpt['state_dict'].items() if self.net.state_dict()[k[4:]].numel() == v.numel()}
         self.net.load_state_dict(chkpt['state_dict'], strict=False)
 
-    def main_logic(self, *args, **kwargs):
-        try:
-            frame_msg = self.in_queue.get(block=False)
-            frame = frame_msg.get_payload()
-            frame = self.transform(frame)
-            frame = frame.to(self.device)
-            frame = frame.unsqueeze(0)
-            pred = self.net(frame)
-            pred = torch.nn.functional.softmax(pred, dim=1).detach()[0, 1].item()
-            pred = str(round(pred, 2))
-
-            try:
-                self.out_queue.get(block=False)
-                self.state.dropped += 1
-            except Empty:
-                pass
-            pred_msg = Message(pred, frame_msg.source_address)
-            self.out_queue.put(pred_msg, block=False)
-
-            return True
-
-        except Empty:
-            time.sleep(0)
-            return False
+    def main_logic_batch(self, frame_msgs):
+        with self.section("decode"):
+            frames = [frame_msg.get_payload() for frame_msg in frame_msgs]
+        frames = [self.transform(frame) for frame in frames]
+        preds = [None] * len(frames)
+
+        # frames from different cameras may differ in size, so every size
+        # is stacked into a batch of its own
+        for shape in {frame.shape for frame in frames}:
+            indices = [i for i, frame in enumerate(frames) if frame.shape == shape]
+            batch = torch.stack([frames[i] for i in indices]).to(self.device)
+            with torch.no_grad():
+                batch_preds = torch.nn.functional.softmax(self.net(batch), dim=1)[:, 1]
+            for i, pred in zip(indices, batch_preds.tolist()):
+                preds[i] = str(round(pred, 2))
+
+        return [Message(pred, frame_msg.source_address)
+                for pred, frame_msg in zip(preds, frame_msgs)]
 
     def setup(self, *args, **kwargs):
-        self.state.dropped = 0
+        pass
 
     def cleanup(self, *args, **kwargs):
         # del self.model, self.device, self.classes, self.colors
@@ -61,12 +52,8 @@ class ClassificationLogic(Routine):
 
     @staticmethod
     def get_constructor_parameters():
-        dicts = Routine.get_constructor_parameters()
+        dicts = BatchRoutine.get_constructor_parameters()
         dicts.update({
-            "in_queue": "QueueIn",
-            "out_queue": "QueueOut",
+            "weights": "String",
         })
-        return dicts
-
-    def does_routine_use_queue(self, queue):
-        return (self.in_queue == queue) or (self.out_queue == queue)
\ No newline at end of file
+        return dicts
\ No newline at end of file
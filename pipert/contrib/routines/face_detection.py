@@ -1,6 +1,7 @@
 import torch
 from pipert.core.message import Message
 from pipert.core.routine import RoutineTypes, Routine
+from pipert.core.utlis.queue_handler import put_latest
 from pipert.utils.structures import Instances, Boxes
 from queue import Empty
 import time
@@ -20,7 +21,10 @@ class FaceDetection(Routine):
     def main_logic(self, *args, **kwargs):
         try:
             frame_msg = self.in_queue.get(block=False)
-            frame = frame_msg.get_payload()
+            if self.shed_stale(frame_msg):
+                return False
+            with self.section("decode"):
+                frame = frame_msg.get_payload()
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
             faces = self.face_cas.detectMultiScale(
@@ -40,13 +44,10 @@ class FaceDetection(Routine):
                 new_instances = Instances(frame.shape[:2])
                 new_instances.set("pred_classes", [])
 
-            try:
-                self.out_queue.get(block=False)
-                self.state.dropped += 1
-            except Empty:
-                pass
             pred_msg = Message(new_instances, frame_msg.source_address)
-            self.out_queue.put(pred_msg, block=False)
+            with self.section("put"):
+                if put_latest(self.out_queue, pred_msg):
+                    self.state.dropped += 1
 
             return True
 
@@ -1,10 +1,10 @@
 import time
-from queue import Empty
 import cv2
 
 from imutils import resize
 from pipert.core.message import Message
 from pipert.core.routine import Routine, RoutineTypes
+from pipert.core.utlis.queue_handler import put_latest
 
 
 class ListenToStream(Routine):
@@ -22,20 +22,31 @@ class ListenToStream(Routine):
         self.out_queue = out_queue
         self.fps = fps
         self.updated_config = {}
+        # a pace extension in the configuration is kept, otherwise the
+        # routine follows the frame rate of its video files
+        self.pace_from_file = self.pacer is None
+        if self.pacer is None:
+            self._extension_pace(self.fps)
 
     def begin_capture(self):
         self.stream = cv2.VideoCapture(self.stream_address)
         if self.isFile:
-            self.fps = self.stream.get(cv2.CAP_PROP_FPS)
+            # 0 if the file could not be opened or has no frame rate
+            file_fps = self.stream.get(cv2.CAP_PROP_FPS)
             self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            if self.pace_from_file and file_fps > 0:
+                self.fps = file_fps
+                self.pacer.set_fps(self.fps)
         self.logger.info("Starting video capture on %s", self.stream_address)
 
     def change_stream(self):
         if self.stream_address == self.updated_config['stream_address']:
             return
         self.stream_address = self.updated_config['stream_address']
-        self.fps = self.updated_config['FPS']
+        if self.pace_from_file:
+            self.fps = self.updated_config['FPS']
+            self.pacer.set_fps(self.fps)
         self.isFile = str(self.stream_address).endswith("mp4")
         self.logger.info("Changing source stream address to %s",
                          self.updated_config['stream_address'])
@@ -65,16 +76,10 @@ class ListenToStream(Routine):
             self.updated_config = {}
 
         grabbed, msg = self.grab_frame()
-        time.sleep(0.03)
         if grabbed:
-            try:
-                self.out_queue.get(block=False)
-            except Empty:
-                pass
-            finally:
-                self.out_queue.put(msg)
-                time.sleep(0)
-                return True
+            put_latest(self.out_queue, msg)
+            time.sleep(0)
+            return True
 
     def setup(self, *args, **kwargs):
         self.begin_capture()
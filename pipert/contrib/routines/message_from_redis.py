@@ -1,21 +1,34 @@
 import os
 import time
-from queue import Empty, Full
 from urllib.parse import urlparse
 
-from pipert.core.message_handlers import RedisHandler
+from pipert.core.message_handlers import create_message_handler, RedisConsumerGroupHandler
 from pipert.core.message import message_decode
 from pipert.core.routine import Routine, RoutineTypes
+from pipert.core.utlis.queue_handler import put_latest
 
 
 class MessageFromRedis(Routine):
     routine_type = RoutineTypes.INPUT
 
-    def __init__(self, redis_read_key, message_queue, *args, **kwargs):
+    def __init__(self, redis_read_key, message_queue, transport="redis", block_ms=None, count=1, group=None,
+                 consumer=None, claim_idle_ms=RedisConsumerGroupHandler.CLAIM_IDLE_MS, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_read_key = redis_read_key
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.message_queue = message_queue
+        # "redis", or "shm" for components on the same host
+        self.transport = transport
+        # how long a read waits for a message, the routine checks whether it
+        # was stopped between reads
+        self.block_ms = block_ms
+        # the number of messages a blocking read fetches from Redis at once
+        self.count = count
+        # the replicas reading with the same consumer group split the
+        # messages of the stream between them, see RedisConsumerGroupHandler
+        self.group = group
+        self.consumer = consumer
+        self.claim_idle_ms = claim_idle_ms
         self.msg_handler = None
         self.flip = False
         self.negative = False
@@ -23,25 +36,23 @@ class MessageFromRedis(Routine):
     def main_logic(self, *args, **kwargs):
         encoded_msg = self.msg_handler.read_most_recent_msg(self.redis_read_key)
         if encoded_msg:
-            msg = message_decode(encoded_msg)
+            with self.section("decode"):
+                msg = message_decode(encoded_msg)
             msg.record_entry(self.component_name, self.logger)
-            try:
-                self.message_queue.put(msg, block=False)
-                return True
-            except Full:
-                try:
-                    self.message_queue.get(block=False)
-                except Empty:
-                    pass
-                finally:
-                    self.message_queue.put(msg, block=False)
-                    return True
+            with self.section("put"):
+                put_latest(self.message_queue, msg)
+            return True
         else:
             time.sleep(0)
             return False
 
     def setup(self, *args, **kwargs):
-        self.msg_handler = RedisHandler(self.url)
+        group_options = {}
+        if self.group:
+            group_options = {"group": self.group, "consumer": self.consumer, "claim_idle_ms": self.claim_idle_ms}
+        self.msg_handler = create_message_handler(self.transport, self.url, block_ms=self.block_ms,
+                                                  count=self.count, connection_pools=self.redis_pools,
+                                                  **group_options)
 
     def cleanup(self, *args, **kwargs):
         self.msg_handler.close()
@@ -51,7 +62,13 @@ class MessageFromRedis(Routine):
         dicts = Routine.get_constructor_parameters()
         dicts.update({
             "redis_read_key": "String",
-            "message_queue": "QueueOut"
+            "message_queue": "QueueOut",
+            "transport": "String",
+            "block_ms": "Integer",
+            "count": "Integer",
+            "group": "String",
+            "consumer": "String",
+            "claim_idle_ms": "Integer"
         })
         return dicts
 
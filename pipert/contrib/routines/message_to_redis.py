@@ -2,9 +2,11 @@ import time
 from queue import Empty
 from urllib.parse import urlparse
 
-from pipert.core.message_handlers import RedisHandler
+from pipert.core.message_handlers import create_message_handler
 from pipert.core.message import message_encode, FramePayload
+from pipert.core.frame_codecs import get_frame_codec
 from pipert.core.routine import Routine, RoutineTypes
+from pipert.core.utlis.queue_handler import wait_not_empty
 import os
 
 
@@ -13,29 +15,68 @@ import os
 class MessageToRedis(Routine):
     routine_type = RoutineTypes.OUTPUT
 
-    def __init__(self, redis_send_key, message_queue, max_stream_length, *args, **kwargs):
+    def __init__(self, redis_send_key, message_queue, max_stream_length, codec="raw", quality=None,
+                 transport="redis", batch_size=1, flush_ms=None, max_stream_bytes=None, approximate_trim=False,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_send_key = redis_send_key
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.message_queue = message_queue
         self.max_stream_length = max_stream_length
+        # the codec that compresses the frames, see pipert.core.frame_codecs
+        self.codec = codec
+        self.quality = quality
+        self.frame_codec = None if codec == "raw" else get_frame_codec(codec, quality)
+        # "redis", or "shm" for components on the same host
+        self.transport = transport
+        # how the messages are sent to Redis and the stream is trimmed, see RedisHandler
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_stream_bytes = max_stream_bytes
+        self.approximate_trim = approximate_trim
         self.msg_handler = None
 
     def main_logic(self, *args, **kwargs):
         try:
             msg = self.message_queue.get(block=False)
             msg.record_exit(self.component_name, self.logger)
-            encoded_msg = message_encode(msg, generator=self.generator)
-            self.msg_handler.send(self.redis_send_key, encoded_msg)
+            with self.section("encode"):
+                encoded_msg = message_encode(msg, generator=self.generator, codec=self.frame_codec)
+            with self.section("put"):
+                self.msg_handler.send(self.redis_send_key, encoded_msg)
             time.sleep(0)
             return True
         except Empty:
+            # no more messages to batch with the ones that were sent
+            self.msg_handler.flush(force=False)
             time.sleep(0)  # yield the control of the thread
             return False
 
+    def _wait_for_input(self, input_queues):
+        if self.batch_size <= 1 or self.msg_handler is None:
+            return super()._wait_for_input(input_queues)
+        # main_logic is not called while the queue is empty, so a partial
+        # batch is sent from here: once the queue ran empty, or flush_ms
+        # after its first message
+        if self.flush_ms is None:
+            if self.message_queue.empty():
+                self.msg_handler.flush()
+            return super()._wait_for_input(input_queues)
+        if wait_not_empty(self.message_queue, min(self.wakeup_interval, self.flush_ms / 1000)):
+            return True
+        self.msg_handler.flush(force=False)
+        return False
+
     def setup(self, *args, **kwargs):
-        self.msg_handler = RedisHandler(self.url, self.max_stream_length)
-        self.msg_handler.connect()
+        if self.transport == "redis":
+            self.msg_handler = create_message_handler(self.transport, self.url, self.max_stream_length,
+                                                      batch_size=self.batch_size, flush_ms=self.flush_ms,
+                                                      max_stream_bytes=self.max_stream_bytes,
+                                                      approximate_trim=self.approximate_trim,
+                                                      connection_pools=self.redis_pools)
+        else:
+            self.msg_handler = create_message_handler(self.transport, self.url, self.max_stream_length,
+                                                      max_stream_bytes=self.max_stream_bytes)
 
     def cleanup(self, *args, **kwargs):
         self.msg_handler.close()
@@ -46,7 +87,14 @@ class MessageToRedis(Routine):
         dicts.update({
             "redis_send_key": "String",
             "message_queue": "QueueIn",
-            "max_stream_length": "Integer"
+            "max_stream_length": "Integer",
+            "codec": "String",
+            "quality": "Integer",
+            "transport": "String",
+            "batch_size": "Integer",
+            "flush_ms": "Integer",
+            "max_stream_bytes": "Integer",
+            "approximate_trim": "Boolean"
         })
         return dicts
 
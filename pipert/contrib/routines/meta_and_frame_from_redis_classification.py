@@ -2,22 +2,25 @@ import os
 from urllib.parse import urlparse
 
 from pipert.core.routine import Routine, RoutineTypes
-from queue import Empty
+from pipert.core.utlis.queue_handler import put_latest
 import cv2
 from pipert.core.message import message_decode
-from pipert.core.message_handlers import RedisHandler
+from pipert.core.message_handlers import create_message_handler
 import time
 
 
 class MetaAndFrameFromRedisClassification(Routine):
     routine_type = RoutineTypes.INPUT
 
-    def __init__(self, redis_read_meta_key, redis_read_image_key, image_meta_queue, *args, **kwargs):
+    def __init__(self, redis_read_meta_key, redis_read_image_key, image_meta_queue, transport="redis",
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_read_meta_key = redis_read_meta_key
         self.redis_read_image_key = redis_read_image_key
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.image_meta_queue = image_meta_queue
+        # "redis", or "shm" for components on the same host
+        self.transport = transport
         self.msg_handler = None
         self.flip = False
         self.negative = False
@@ -29,7 +32,8 @@ class MetaAndFrameFromRedisClassification(Routine):
             encoded_msg = self.msg_handler.receive(in_key)
         if not encoded_msg:
             return None
-        msg = message_decode(encoded_msg)
+        with self.section("decode"):
+            msg = message_decode(encoded_msg)
         msg.record_entry(self.component_name, self.logger)
         return msg
 
@@ -45,12 +49,9 @@ class MetaAndFrameFromRedisClassification(Routine):
             if self.negative:
                 arr = 255 - arr
 
-            try:
-                self.image_meta_queue.get(block=False)
-            except Empty:
-                pass
             frame_msg.update_payload(arr)
-            self.image_meta_queue.put((frame_msg, pred_msg))
+            with self.section("put"):
+                put_latest(self.image_meta_queue, (frame_msg, pred_msg))
             return True
 
         else:
@@ -58,7 +59,7 @@ class MetaAndFrameFromRedisClassification(Routine):
             return False
 
     def setup(self, *args, **kwargs):
-        self.msg_handler = RedisHandler(self.url)
+        self.msg_handler = create_message_handler(self.transport, self.url, connection_pools=self.redis_pools)
 
     def cleanup(self, *args, **kwargs):
         self.msg_handler.close()
@@ -70,6 +71,7 @@ class MetaAndFrameFromRedisClassification(Routine):
             "redis_read_meta_key": "String",
             "redis_read_image_key": "String",
             "image_meta_queue": "QueueOut",
+            "transport": "String",
         })
         return dicts
 
@@ -1,5 +1,6 @@
 from pipert.core.routine import Routine, RoutineTypes
-from queue import Empty, Full
+from pipert.core.utlis.queue_handler import put_latest
+from queue import Empty
 from pipert.utils.visualizer import VideoVisualizer
 from pipert.utils.visualizer.catalog import MetadataCatalog
 import time
@@ -22,28 +23,18 @@ class VisLogic(Routine):
             # print("frame", frame_msg)
             # print("pred", pred_msg)
             if pred_msg is not None and not pred_msg.is_empty():
-                frame = frame_msg.get_payload()
-                pred = pred_msg.get_payload()
+                with self.section("decode"):
+                    frame = frame_msg.get_payload()
+                    pred = pred_msg.get_payload()
                 image = self.vis.draw_instance_predictions(frame, pred, self.NAMES) \
                     .get_image()
                 frame_msg.update_payload(image)
                 frame_msg.history = pred_msg.history
             frame_msg.record_exit(self.component_name, self.logger)
-            try:
-                self.out_queue.put(frame_msg, block=False)
-                return True
-            except Full:
-                try:
-                    self.out_queue.get(block=False)
+            with self.section("put"):
+                if put_latest(self.out_queue, frame_msg):
                     self.state.dropped += 1
-                except Empty:
-                    pass
-                finally:
-                    try:
-                        self.out_queue.put(frame_msg, block=False)
-                    except Full:
-                        pass
-                    return True
+            return True
 
         except Empty:
             time.sleep(0)
@@ -1,6 +1,7 @@
 import cv2
 from pipert.core.routine import Routine, RoutineTypes
-from queue import Empty, Full
+from pipert.core.utlis.queue_handler import put_latest
+from queue import Empty
 import time
 
 
@@ -19,27 +20,17 @@ class VisLogicClassification(Routine):
             # print("frame", frame_msg)
             # print("pred msg = ", pred_msg)
             if pred_msg is not None and not pred_msg.is_empty():
-                frame = frame_msg.get_payload()
-                pred = pred_msg.get_payload()
+                with self.section("decode"):
+                    frame = frame_msg.get_payload()
+                    pred = pred_msg.get_payload()
                 image = self.draw_pred_on_frame(frame, pred)
                 frame_msg.update_payload(image)
                 frame_msg.history = pred_msg.history
             frame_msg.record_exit(self.component_name, self.logger)
-            try:
-                self.out_queue.put(frame_msg, block=False)
-                return True
-            except Full:
-                try:
-                    self.out_queue.get(block=False)
+            with self.section("put"):
+                if put_latest(self.out_queue, frame_msg):
                     self.state.dropped += 1
-                except Empty:
-                    pass
-                finally:
-                    try:
-                        self.out_queue.put(frame_msg, block=False)
-                    except Full:
-                        pass
-                    return True
+            return True
 
         except Empty:
             time.sleep(0)
@@ -51,6 +42,9 @@ class VisLogicClassification(Routine):
         fontScale = 1
         color = (255, 0, 0)
         thickness = 2
+        if not frame.flags.writeable:
+            # frames read from a broadcast queue are shared with other routines
+            frame = frame.copy()
         frame = cv2.putText(frame, pred, org, font, fontScale, color, thickness, cv2.LINE_AA)
         return frame
 
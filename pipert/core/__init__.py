@@ -1,5 +1,6 @@
-from .routine import Routine, Events
+from .routine import Routine, BatchRoutine, Events
 from .component import BaseComponent
 from .message import Message, Payload
-from .message_handlers import MessageHandler, RedisHandler
+from .message_handlers import MessageHandler, RedisHandler, RedisConsumerGroupHandler, RedisConnectionPools, \
+    SharedMemoryRingHandler
 from .utlis import QueueHandler
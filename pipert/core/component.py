@@ -9,29 +9,55 @@ from typing import Union
 import signal
 import gevent
 from pipert.core.metrics_collector import NullCollector
+from pipert.core.event_loop import EventLoopThread, AsyncioRunner
+from pipert.core.cpu_budget import CpuBudget
 import sys
 if sys.version_info.minor == 8:
     from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen
 else:
     from pipert.core.shared_memory import SharedMemoryGenerator as smGen
-from pipert.core.errors import RegisteredException, QueueDoesNotExist
+from pipert.core.shared_memory_pool import get_shared_memory_stats, remove_orphaned_segments, owned_name
+from pipert.core.message_handlers import RedisConnectionPools
+from pipert.core.errors import RegisteredException, QueueDoesNotExist, QueueWiringException
 from pipert.core.class_factory import ClassFactory
 from queue import Queue
+from pipert.core.utlis.queue_handler import wake_waiters
+from pipert.core.utlis.shared_memory_queue import SharedMemoryQueue
+from pipert.core.utlis.spsc_queue import SpscQueue
+from pipert.core.utlis.latest_value_slot import LatestValueSlot
+from pipert.core.utlis.monitored_queue import MonitoredQueue, MonitoredSubscriber
+from pipert.core.utlis.broadcast_queue import BroadcastQueue
 from pipert.utils.logger_utils import create_parent_logger
 
 
 class BaseComponent:
+    EXECUTION_MODES = ("thread", "process")
+    QUEUE_TYPES = {"queue": Queue, "spsc": SpscQueue, "latest": LatestValueSlot, "broadcast": BroadcastQueue}
+    # seconds between reports of the queue stats to the monitoring system
+    QUEUE_STATS_INTERVAL = 5.
 
     def __init__(self, component_config, start_component=False):
         self.name = ""
         self.ROUTINES_FOLDER_PATH = "pipert/contrib/routines"
         self.MONITORING_SYSTEMS_FOLDER_PATH = "pipert/contrib/metrics_collectors"
         self.use_memory = False
+        # "thread" runs the routines as threads connected by queue.Queue,
+        # "process" runs them as processes connected by SharedMemoryQueue
+        self.execution_mode = "thread"
         self.stop_event = Event()
         self.stop_event.set()
         self.queues = {}
+        # the options every queue was created with, other than its size
+        self.queue_options = {}
+        self.queue_stats_interval = self.QUEUE_STATS_INTERVAL
+        self._queue_stats_reporter = None
         self._routines = {}
+        # the event loop shared by all the asyncio routines of the component
+        self.event_loop_thread = EventLoopThread(name="asyncio-routines")
         self.metrics_collector = NullCollector()
+        self.cpu_budget = None
+        # the Redis connections shared by all the routines of the component
+        self.redis_pools = RedisConnectionPools()
         self.parent_logger = None
         self.logger = None
         self.setup_component(component_config)
@@ -52,13 +78,39 @@ class BaseComponent:
         if ("shared_memory" in component_parameters) and \
                 (component_parameters["shared_memory"]):
             self.use_memory = True
-            self.generator = smGen(self.name)
+            self.generator = smGen(owned_name(self.name),
+                                   slot_size=component_parameters.get("shared_memory_slot_size"))
+
+        execution_mode = component_parameters.get("execution_mode", "thread").lower()
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError("Unknown execution mode '{0}'".format(execution_mode))
+        self.execution_mode = execution_mode
+        if self.use_memory or self.execution_mode == "process":
+            self._remove_orphaned_memory()
+
+        self.queue_stats_interval = component_parameters.get("queue_stats_interval", self.queue_stats_interval)
 
         if "monitoring_system" in component_parameters:
             self.set_monitoring_system(component_parameters["monitoring_system"])
 
+        # the thread pools have to be limited before the routines load their
+        # models and libraries
+        self.cpu_budget = CpuBudget.from_config(component_parameters.get("cpu_budget"))
+        if self.cpu_budget is not None:
+            self.cpu_budget.apply_to_process()
+
         for queue in component_parameters["queues"]:
-            self.create_queue(queue_name=queue, queue_size=1)
+            # a queue is either a name or a mapping of a name to its options
+            if isinstance(queue, dict):
+                queue_name, queue_options = list(queue.items())[0]
+                self.create_queue(queue_name=queue_name,
+                                  queue_size=queue_options.get("size", 1),
+                                  queue_type=queue_options.get("type", "queue"),
+                                  policy=queue_options.get("policy"),
+                                  timeout_ms=queue_options.get("timeout_ms"),
+                                  subscribers=queue_options.get("subscribers"))
+            else:
+                self.create_queue(queue_name=queue, queue_size=1)
 
         routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH)
         for routine_name, routine_parameters_real in component_parameters["routines"].items():
@@ -73,10 +125,96 @@ class BaseComponent:
                 self._replace_queue_names_with_queue_objects(routine_parameters)
             except QueueDoesNotExist as e:
                 continue
+            constructor_parameters = routine_class.get_constructor_parameters()
+            for parameter_name, value in routine_parameters.items():
+                if constructor_parameters.get(parameter_name) == "QueueIn":
+                    routine_parameters[parameter_name] = self._subscribe_to_queue(value, routine_name)
 
             routine_parameters["component_name"] = self.name
+            replicas = routine_parameters.pop("replicas", 1)
+            ordered = routine_parameters.pop("ordered", False)
+
+            routine = routine_class(**routine_parameters)
+            routine.replicas = replicas
+            routine.ordered = ordered
+            self._set_routine_runner(routine)
+            self.register_routine(routine)
+
+    def _set_routine_runner(self, routine):
+        if self.cpu_budget is not None:
+            self._set_routine_cpu_budget(routine)
+        if self.execution_mode == "process":
+            routine.as_process_pool(routine.replicas)
+        elif routine.is_async():
+            routine.as_asyncio(self.event_loop_thread)
+        else:
+            routine.as_thread_pool(routine.replicas, ordered=routine.ordered)
+
+    def _set_routine_cpu_budget(self, routine):
+        ignored_threads = self.cpu_budget.ignored_threads(routine.name, self.execution_mode)
+        if ignored_threads is not None:
+            self.logger.warning("The {0} threads of routine {1} are only applied in process execution mode, "
+                                "using the component's {2} threads".format(ignored_threads, routine.name,
+                                                                           self.cpu_budget.threads))
+        routine.cpu_budget = self.cpu_budget.for_routine(routine.name, self.execution_mode)
+
+    def as_thread(self):
+        """
+        Changes the component to run its routines as threads connected by
+        regular queues. Can only be done while the component is not running.
+        Returns True if the execution mode was changed.
+        """
+        return self._change_execution_mode("thread")
+
+    def as_process(self):
+        """
+        Changes the component to run each of its routines in a process of
+        its own, connected by queues that pass frames through shared memory.
+        Can only be done while the component is not running.
+        Returns True if the execution mode was changed.
+        """
+        return self._change_execution_mode("process")
 
-            self.register_routine(routine_class(**routine_parameters).as_thread())
+    def _change_execution_mode(self, execution_mode):
+        if self.is_component_running():
+            self.logger.error("Cannot change the execution mode of a running component")
+            return False
+        self.execution_mode = execution_mode
+        old_queues = self.queues
+        self.queues = {}
+        for queue_name, old_queue in old_queues.items():
+            self.create_queue(queue_name, old_queue.maxsize, **self.queue_options.pop(queue_name))
+            if isinstance(old_queue.queue, SharedMemoryQueue):
+                old_queue.drain()
+        # routines keep their queues as attributes, point them to the new ones
+        new_queues = {id(old_queues[queue_name]): self.queues[queue_name] for queue_name in old_queues}
+        new_queues.update({id(old_queues[queue_name].queue): self.queues[queue_name]
+                           for queue_name in old_queues})
+        for routine in self._routines.values():
+            if not isinstance(routine, Routine):
+                continue
+            constructor_parameters = routine.get_constructor_parameters()
+            for attribute_name, value in list(vars(routine).items()):
+                if isinstance(value, MonitoredSubscriber):
+                    value = value.broadcast_queue
+                if id(value) not in new_queues:
+                    continue
+                queue = new_queues[id(value)]
+                if constructor_parameters.get(attribute_name) == "QueueIn":
+                    queue = self._subscribe_to_queue(queue, routine.name)
+                setattr(routine, attribute_name, queue)
+            self._set_routine_runner(routine)
+        return True
+
+    @staticmethod
+    def _subscribe_to_queue(queue, routine_name):
+        """
+        Returns the queue a routine reads from, which is a subscriber of its
+        own when the queue is a broadcast queue.
+        """
+        if isinstance(queue, MonitoredQueue) and isinstance(queue.queue, BroadcastQueue):
+            return queue.subscribe(routine_name)
+        return queue
 
     def _replace_queue_names_with_queue_objects(self, routine_parameters_kwargs):
         for key, value in routine_parameters_kwargs.items():
@@ -100,6 +238,8 @@ class BaseComponent:
         self.logger.info("Running component")
         self.stop_event.clear()
         self._start()
+        self._queue_stats_reporter = Thread(target=self._report_queue_stats, daemon=True)
+        self._queue_stats_reporter.start()
         gevent.signal_handler(signal.SIGTERM, self.stop_run)
 
     def register_routine(self, routine: Union[Routine, Process, Thread]):
@@ -117,18 +257,51 @@ class BaseComponent:
                 raise RegisteredException("routine name already exist")
             if routine.stop_event is None:
                 routine.stop_event = self.stop_event
+                if routine.runner_creator is AsyncioRunner:
+                    routine.runner_creator_kwargs["event_loop_thread"] = self.event_loop_thread
+                routine.redis_pools = self.redis_pools
                 if self.use_memory:
                     routine.use_memory = self.use_memory
                     routine.generator = self.generator
             else:
                 self.logger.error("Routine is already registered")
                 raise RegisteredException("routine is already registered")
+            self._check_spsc_queues(routine)
             self.logger.info("Routine registered")
             self._routines[routine.name] = routine
         else:
             self.logger.info("Routine registered")
             self._routines[routine.__str__()] = routine
 
+    def _check_spsc_queues(self, routine):
+        """
+        Raises QueueWiringException if registering the routine gives a spsc
+        queue more than one producer or consumer, counting every replica.
+        """
+        routines = [other for other in self._routines.values() if isinstance(other, Routine)] + [routine]
+        for queue_name, queue in self.queues.items():
+            if self.queue_options[queue_name]["queue_type"] != "spsc":
+                continue
+            for side, role in (("QueueIn", "consumer"), ("QueueOut", "producer")):
+                routine_names = []
+                for other in routines:
+                    if any(other_queue is queue or other_queue is queue.queue
+                           for other_queue in self._get_routine_queues(other, side)):
+                        routine_names += [other.name] * other.replicas
+                if len(routine_names) > 1:
+                    self.logger.error("The spsc queue %s has more than one %s", queue_name, role)
+                    raise QueueWiringException(queue_name, role, routine_names)
+
+    @staticmethod
+    def _get_routine_queues(routine, side):
+        """
+        Returns the queues a routine reads from when side is "QueueIn" or
+        writes to when side is "QueueOut".
+        """
+        return [getattr(routine, parameter_name, None)
+                for parameter_name, parameter_type in routine.get_constructor_parameters().items()
+                if parameter_type == side]
+
     def _teardown_callback(self, *args, **kwargs):
         """
         Implemented by subclasses of BaseComponent. Used for stopping or
@@ -145,6 +318,8 @@ class BaseComponent:
         if self.stop_event.is_set():
             return 0
         self.stop_event.set()
+        for queue in self.queues.values():
+            wake_waiters(queue)
 
         try:
             self._teardown_callback()
@@ -154,27 +329,107 @@ class BaseComponent:
             for routine in self._routines.values():
                 self.logger.info("Stopping routine {0}".format(routine.name))
                 if isinstance(routine, Routine):
-                    routine.runner.join()
+                    routine.join()
                 elif isinstance(routine, (Process, Thread)):
                     routine.join()
                 self.logger.info("Routine {0} stopped".format(routine.name))
+            for queue in self.queues.values():
+                if isinstance(queue.queue, SharedMemoryQueue):
+                    queue.drain()
+            self.redis_pools.disconnect()
+            if self.use_memory or self.execution_mode == "process":
+                self._remove_orphaned_memory(self._get_routine_pids())
+            if self._queue_stats_reporter is not None:
+                self._queue_stats_reporter.join()
             return 0
         except RuntimeError:
             return 1
 
-    def create_queue(self, queue_name, queue_size=1):
+    def create_queue(self, queue_name, queue_size=1, queue_type="queue", policy=None, timeout_ms=None,
+                     subscribers=None):
         """
            Create a new queue for the component.
            Returns True if created or False otherwise
            Args:
                queue_name: the name of the queue, must be unique
                queue_size: the size of the queue
+               queue_type: "queue" for a queue.Queue, "spsc" for a
+               SpscQueue, a faster queue for a link with a single producer
+               routine and a single consumer routine, "latest" for a
+               LatestValueSlot that only keeps the most recent item, or
+               "broadcast" for a BroadcastQueue that gives every item to
+               each of the routines reading from it.
+               Process mode always uses a SharedMemoryQueue.
+               policy: what a put does when the queue is full, one of
+               "block", "drop_oldest", "drop_newest" and "latest", or None
+               to leave it to each put.
+               timeout_ms: how long a put waits for room under the "block"
+               policy before dropping the item, None waits until there is
+               room or the component stops.
+               subscribers: for a broadcast queue, the policy of each
+               reading routine by its name, one of "drop_oldest" (the
+               default), "latest" and "block".
         """
         if queue_name in self.queues:
             return False
-        self.queues[queue_name] = Queue(maxsize=queue_size)
+        if queue_type not in self.QUEUE_TYPES:
+            raise ValueError("Unknown queue type '{0}'".format(queue_type))
+        if self.execution_mode == "process":
+            if queue_type == "broadcast" and self.logger is not None:
+                self.logger.warning("Broadcast queue %s is a regular queue in process mode, "
+                                    "its readers will share its items", queue_name)
+            queue = SharedMemoryQueue(maxsize=queue_size, name=queue_name, component_name=self.name)
+        elif queue_type == "broadcast":
+            queue = BroadcastQueue(maxsize=queue_size, subscriber_policies=subscribers)
+        elif policy == "latest":
+            queue = LatestValueSlot()
+        else:
+            queue = self.QUEUE_TYPES[queue_type](maxsize=queue_size)
+        self.queues[queue_name] = MonitoredQueue(queue, shared=self.execution_mode == "process",
+                                                 policy=policy, timeout_ms=timeout_ms,
+                                                 stop_event=self.stop_event)
+        self.queue_options[queue_name] = {"queue_type": queue_type, "policy": policy, "timeout_ms": timeout_ms,
+                                          "subscribers": subscribers}
         return True
 
+    def get_queue_stats(self):
+        """
+           Returns the stats of every queue of the component by its name:
+           its size and maxsize, the number of items that were enqueued,
+           dequeued and dropped, its high water mark and the seconds
+           producers and consumers waited on it (put_wait, get_wait).
+        """
+        return {queue_name: queue.get_stats() for queue_name, queue in self.queues.items()}
+
+    def _report_queue_stats(self):
+        while not self.stop_event.wait(self.queue_stats_interval):
+            for queue_name, stats in self.get_queue_stats().items():
+                self.metrics_collector.collect_queue_stats(stats, queue_name, self.name)
+            if self.use_memory or self.execution_mode == "process":
+                self.metrics_collector.collect_shared_memory_stats(get_shared_memory_stats(), self.name)
+
+    def _remove_orphaned_memory(self, owners=None):
+        """
+        Deletes the shared memories of the component that processes which
+        are gone left behind, like a crashed run or a routine process that
+        did not clean up when it stopped. Other running instances of the
+        component keep theirs. With owners, only the memories of those
+        processes are deleted.
+        """
+        removed, leaked_bytes = remove_orphaned_segments(self.name, owners)
+        if removed:
+            self.logger.warning("Removed %d orphaned shared memories (%d bytes)", removed, leaked_bytes)
+
+    def _get_routine_pids(self):
+        """
+        Returns the ids of the processes the routines of the component ran in.
+        """
+        pids = set()
+        for routine in self._routines.values():
+            runners = routine.runners if isinstance(routine, Routine) else [routine]
+            pids.update(runner.pid for runner in runners if getattr(runner, "pid", None))
+        return pids
+
     def get_queue(self, queue_name):
         """
            Returns the queue object by its name
@@ -219,6 +474,7 @@ class BaseComponent:
             return False
         try:
             del self.queues[queue_name]
+            self.queue_options.pop(queue_name, None)
             return True
         except KeyError:
             raise QueueDoesNotExist(queue_name)
@@ -234,8 +490,12 @@ class BaseComponent:
             return False
 
     def does_routines_use_queue(self, queue_name):
+        queue = self.queues[queue_name]
+        if isinstance(queue.queue, BroadcastQueue) and \
+                any(routine_name in self._routines for routine_name in queue.queue.subscribers):
+            return True
         for routine in self._routines.values():
-            if routine.does_routine_use_queue(self.queues[queue_name]):
+            if routine.does_routine_use_queue(queue):
                 return True
         return False
 
@@ -249,10 +509,18 @@ class BaseComponent:
         component_dict = {
             "shared_memory": self.use_memory,
             "queues":
-                list(self.get_all_queue_names()),
+                [self._get_queue_creation(queue_name) for queue_name in self.get_all_queue_names()],
             "routines": {}
         }
 
+        if self.execution_mode != "thread":
+            component_dict["execution_mode"] = self.execution_mode
+        if self.use_memory and self.generator.slot_size is not None:
+            component_dict["shared_memory_slot_size"] = self.generator.slot_size
+        if self.cpu_budget is not None:
+            component_dict["cpu_budget"] = self.cpu_budget.to_config()
+        if self.queue_stats_interval != self.QUEUE_STATS_INTERVAL:
+            component_dict["queue_stats_interval"] = self.queue_stats_interval
         if type(self).__name__ != BaseComponent.__name__:
             component_dict["component_type_name"] = type(self).__name__
         for current_routine_object in self._routines.values():
@@ -263,14 +531,34 @@ class BaseComponent:
                 routine_creation_dict
         return {self.name: component_dict}
 
+    def _get_queue_creation(self, queue_name):
+        queue_options = self.queue_options.get(queue_name, {})
+        queue_creation = {}
+        if self.queues[queue_name].maxsize != 1:
+            queue_creation["size"] = self.queues[queue_name].maxsize
+        if queue_options.get("queue_type", "queue") != "queue":
+            queue_creation["type"] = queue_options["queue_type"]
+        for option in ("policy", "timeout_ms", "subscribers"):
+            if queue_options.get(option) is not None:
+                queue_creation[option] = queue_options[option]
+        if not queue_creation:
+            return queue_name
+        return {queue_name: queue_creation}
+
     def _get_routine_creation(self, routine):
         routine_dict = routine.get_creation_dictionary()
         routine_dict["routine_type_name"] = routine.__class__.__name__
+        if routine.replicas > 1:
+            routine_dict["replicas"] = routine.replicas
+            if routine.ordered:
+                routine_dict["ordered"] = True
         for routine_param_name in routine_dict.keys():
             if "queue" in routine_param_name:
+                queue = getattr(routine, routine_param_name)
+                if isinstance(queue, MonitoredSubscriber):
+                    queue = queue.broadcast_queue
                 for queue_name in self.queues.keys():
-                    if getattr(routine, routine_param_name) is \
-                            self.queues[queue_name]:
+                    if queue is self.queues[queue_name] or queue is self.queues[queue_name].queue:
                         routine_dict[routine_param_name] = queue_name
 
         return routine_dict
@@ -289,6 +577,16 @@ class BaseComponent:
         except TypeError:
             print("Bad parameters given for the monitoring system " + monitoring_system_name)
 
+    def get_routines_time_breakdown(self):
+        """
+           Returns for every routine with the time_breakdown extension the
+           seconds it spent waiting, decoding, in its logic, encoding,
+           putting and in event handlers, and its utilization.
+        """
+        return {routine.name: routine.time_breakdown.as_dict()
+                for routine in self._routines.values()
+                if isinstance(routine, Routine) and routine.time_breakdown is not None}
+
     def set_routine_attribute(self, routine_name, attribute_name, attribute_value):
         routine = self._routines.get(routine_name, None)
         if routine is not None:
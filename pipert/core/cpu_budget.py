@@ -0,0 +1,119 @@
+import os
+import sys
+
+# the environment variables the common BLAS/OpenMP builds read their thread
+# count from when they are loaded
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                 "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class CpuBudget:
+    """
+    The CPU budget of a component: how many intra-op threads torch, OpenCV
+    and BLAS may use, and optionally which CPUs each routine may run on.
+    Configured by the component's cpu_budget field, for example:
+
+        cpu_budget:
+          threads: 2
+          affinity: [0, 1, 2, 3]
+          routines:
+            Classifier: {threads: 4, affinity: [4, 5, 6, 7]}
+
+    The component level threads and affinity are the defaults of routines
+    that are not listed under routines. The thread pools of torch and OpenCV
+    are shared by the whole process, so the threads of a routine only take
+    effect when the routine runs in a process of its own.
+    """
+
+    def __init__(self, threads=None, affinity=None, routines=None):
+        self.threads = threads
+        self.affinity = affinity
+        self.routines = routines or {}
+
+    @classmethod
+    def from_config(cls, config):
+        if config is None:
+            return None
+        if not isinstance(config, dict):
+            raise ValueError("cpu_budget must be a mapping, got {!r}".format(config))
+        return cls(threads=config.get("threads"),
+                   affinity=config.get("affinity"),
+                   routines=config.get("routines"))
+
+    def to_config(self):
+        config = {"threads": self.threads, "affinity": self.affinity, "routines": self.routines}
+        return {key: value for key, value in config.items() if value}
+
+    def for_routine(self, routine_name, execution_mode="process"):
+        """
+        Returns the budget of a routine as a dictionary with the keys threads
+        and affinity, a None value means the library default is kept. Unless
+        the routine runs in a process of its own it gets the component level
+        threads, its affinity is applied to its thread either way.
+        """
+        budget = {"threads": self.threads, "affinity": self.affinity}
+        budget.update(self.routines.get(routine_name, {}))
+        if execution_mode != "process":
+            budget["threads"] = self.threads
+        return budget
+
+    def ignored_threads(self, routine_name, execution_mode):
+        """
+        Returns the threads configured for a routine that cannot be applied
+        in the execution mode, or None.
+        """
+        threads = self.routines.get(routine_name, {}).get("threads")
+        if execution_mode == "process" or threads in (None, self.threads):
+            return None
+        return threads
+
+    def apply_to_process(self):
+        """
+        Limits the thread pools of the BLAS libraries of the process. Has to
+        be called before the routines are created, the environment variables
+        only take effect in libraries that were not loaded yet and in child
+        processes.
+        """
+        if self.threads is None:
+            return
+        for env_var in BLAS_ENV_VARS:
+            os.environ[env_var] = str(self.threads)
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            return
+        # already loaded BLAS libraries are limited at runtime
+        threadpool_limits(limits=self.threads)
+
+
+def apply_thread_budget(threads=None, affinity=None):
+    """
+    Applies a routine's budget. The threads of torch and OpenCV are set for
+    the whole process and only when the routine's code already imported
+    them, the affinity is set on the calling thread and only supported on
+    Linux.
+
+    Returns:
+        The effective settings as a dictionary.
+    """
+    torch = sys.modules.get("torch")
+    cv2 = sys.modules.get("cv2")
+    if threads is not None:
+        if torch is not None:
+            torch.set_num_threads(threads)
+        if cv2 is not None:
+            cv2.setNumThreads(threads)
+    if affinity is not None and hasattr(os, "sched_setaffinity"):
+        # pid 0 is the calling thread
+        os.sched_setaffinity(0, affinity)
+
+    effective = {}
+    if torch is not None:
+        effective["torch_threads"] = torch.get_num_threads()
+    if cv2 is not None:
+        effective["cv2_threads"] = cv2.getNumThreads()
+    if "OMP_NUM_THREADS" in os.environ:
+        effective["blas_threads"] = int(os.environ["OMP_NUM_THREADS"])
+    if hasattr(os, "sched_getaffinity"):
+        effective["cpus"] = len(os.sched_getaffinity(0))
+    return effective
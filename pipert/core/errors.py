@@ -26,3 +26,22 @@ class QueueDoesNotExist(Exception):
 
     def message(self):
         return "The queue " + self.queue_name + " doesn't exist"
+
+
+class QueueWiringException(Exception):
+    """
+        Exception class to raise if a queue is connected to more routines
+        than its type supports
+    """
+
+    def __init__(self, queue_name, side, routine_names):
+        self.queue_name = queue_name
+        self.side = side
+        self.routine_names = routine_names
+
+    def message(self):
+        return "The spsc queue {0} has more than one {1}: {2}".format(
+            self.queue_name, self.side, ", ".join(self.routine_names))
+
+    def __str__(self):
+        return self.message()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+
+class EventLoopThread:
+    """
+    A thread that runs an asyncio event loop shared by all the asyncio
+    routines of a component. The thread is started when the first routine is
+    submitted and stops once every submitted routine has finished.
+    """
+
+    def __init__(self, name="asyncio-routines"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def submit(self, coroutine):
+        """
+        Schedules a coroutine on the event loop.
+
+        Args:
+            coroutine: the coroutine to run.
+
+        Returns:
+            A concurrent.futures.Future of the coroutine's result.
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self.loop,), name=self.name, daemon=True)
+                self._thread.start()
+            self._running += 1
+            loop = self.loop
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, _):
+        with self._lock:
+            self._running -= 1
+            if self._running == 0:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.loop = None
+                self._thread = None
+
+    @staticmethod
+    def _run(loop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def is_alive(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+
+class AsyncioRunner:
+    """
+    Runs a coroutine on an EventLoopThread, with the start/join interface of
+    threading.Thread so routines can use it as their runner.
+    """
+
+    def __init__(self, target, event_loop_thread):
+        self.target = target
+        self.event_loop_thread = event_loop_thread
+        self.future = None
+
+    def start(self):
+        self.future = self.event_loop_thread.submit(self.target())
+
+    def join(self, timeout=None):
+        if self.future is None:
+            return
+        try:
+            self.future.result(timeout)
+        except Exception:
+            # like threading.Thread.join, joining does not raise what the
+            # routine raised
+            pass
+
+    def is_alive(self):
+        return self.future is not None and not self.future.done()
@@ -0,0 +1,176 @@
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class FrameCodec(ABC):
+    """
+    Compresses the frames of messages that are sent out of a component.
+    quality is the JPEG quality of lossy codecs and the compression level of
+    lossless ones, None keeps the codec's default.
+    """
+    name = None
+    lossless = True
+
+    def __init__(self, quality=None):
+        self.quality = quality
+
+    @abstractmethod
+    def encode(self, frame):
+        """
+        Returns the frame compressed into a bytes-like object.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, buffer, dtype, shape):
+        """
+        Returns the frame that was compressed into buffer.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _require(cls, module, package):
+        if module is None:
+            raise ImportError("The {0} codec requires the {1} package".format(cls.name, package))
+
+
+class RawCodec(FrameCodec):
+    name = "raw"
+
+    def encode(self, frame):
+        return frame.tobytes()
+
+    def decode(self, buffer, dtype, shape):
+        return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+
+class JpegCodec(FrameCodec):
+    name = "jpeg"
+    lossless = False
+
+    def __init__(self, quality=None):
+        self._require(cv2, "opencv-python")
+        super().__init__(quality)
+
+    def encode(self, frame):
+        quality = 90 if self.quality is None else self.quality
+        _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes()
+
+    def decode(self, buffer, dtype, shape):
+        return cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_UNCHANGED).reshape(shape)
+
+
+class PngCodec(FrameCodec):
+    name = "png"
+
+    def __init__(self, quality=None):
+        self._require(cv2, "opencv-python")
+        super().__init__(quality)
+
+    def encode(self, frame):
+        level = 1 if self.quality is None else self.quality
+        _, buffer = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, level])
+        return buffer.tobytes()
+
+    def decode(self, buffer, dtype, shape):
+        return cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_UNCHANGED).reshape(shape)
+
+
+class _ByteCodec(FrameCodec):
+    """
+    A lossless codec that compresses the raw bytes of the frame.
+    """
+
+    def encode(self, frame):
+        return self._compress(memoryview(np.ascontiguousarray(frame)).cast("B"))
+
+    def decode(self, buffer, dtype, shape):
+        return np.frombuffer(self._decompress(buffer), dtype=dtype).reshape(shape)
+
+    @abstractmethod
+    def _compress(self, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _decompress(self, buffer):
+        raise NotImplementedError
+
+
+class Lz4Codec(_ByteCodec):
+    name = "lz4"
+
+    def __init__(self, quality=None):
+        self._require(lz4_frame, "lz4")
+        super().__init__(quality)
+
+    def _compress(self, data):
+        return lz4_frame.compress(data, compression_level=self.quality or 0)
+
+    def _decompress(self, buffer):
+        return lz4_frame.decompress(buffer)
+
+
+class ZstdCodec(_ByteCodec):
+    name = "zstd"
+
+    def __init__(self, quality=None):
+        self._require(zstandard, "zstandard")
+        super().__init__(quality)
+        self._compressor = zstandard.ZstdCompressor(level=3 if quality is None else quality)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def _compress(self, data):
+        return self._compressor.compress(data)
+
+    def _decompress(self, buffer):
+        return self._decompressor.decompress(buffer)
+
+
+class ZlibCodec(_ByteCodec):
+    name = "zlib"
+
+    def _compress(self, data):
+        return zlib.compress(data, 1 if self.quality is None else self.quality)
+
+    def _decompress(self, buffer):
+        return zlib.decompress(buffer)
+
+
+FRAME_CODECS = {codec.name: codec for codec in (RawCodec, JpegCodec, PngCodec, Lz4Codec, ZstdCodec, ZlibCodec)}
+
+
+def get_frame_codec(name, quality=None):
+    """
+    Returns a codec by its name.
+    Raises:
+        ValueError - if no codec has the name
+        ImportError - if the package the codec needs is not installed
+    """
+    if name not in FRAME_CODECS:
+        raise ValueError("Unknown frame codec '{0}'".format(name))
+    return FRAME_CODECS[name](quality)
+
+
+@lru_cache(maxsize=None)
+def get_frame_decoder(name):
+    """
+    Returns a codec that is shared by every decode of the frames
+    compressed by the codec with the name.
+    """
+    return get_frame_codec(name)
@@ -1,17 +1,17 @@
 import time
 import logging
 from pipert.core.routine import Routine
-import numpy as np
 
 # TODO - move all handlers to contrib? or write some monitoring handlers?
 
+logger = logging.getLogger()
+
 
 def tick(routine: Routine):
     routine.state.tick = time.time()
 
 
 def tock(routine: Routine):
-    if routine.state.output:
-        msg = f"routine {routine.name} iteration {routine.state.count} took" \
-              f" {np.round(time.time() - routine.state.tick, 4)} seconds"
-        logging.getLogger().debug(msg)
+    if routine.state.output and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("routine %s iteration %d took %.4f seconds",
+                     routine.name, routine.state.count, time.time() - routine.state.tick)
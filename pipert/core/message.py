@@ -1,15 +1,37 @@
 import collections
+import copy
 from abc import ABC, abstractmethod
 
 import sys
 if sys.version_info.minor == 8:
-    from pipert.core.multiprocessing_shared_memory import get_shared_memory_object
+    from pipert.core.multiprocessing_shared_memory import get_shared_memory_object, map_shared_memory
 else:
-    from pipert.core.shared_memory import get_shared_memory_object
+    from pipert.core.shared_memory import get_shared_memory_object, map_shared_memory
+from pipert.core.frame_codecs import get_frame_decoder
+from pipert.core.shared_memory_pool import SharedMemorySlot, acknowledge_slot, read_slot, record_late_read
 
 import numpy as np
 import time
 import pickle
+import struct
+import weakref
+
+# the first byte of an encoded message, a pickled message always starts with
+# the pickle protocol byte 0x80 instead
+PICKLE_FORMAT = 0
+BINARY_FORMAT = 1
+# the number of length prefixed sections of the binary format
+_BINARY_SECTIONS = 8
+
+# format, payload type, data kind and reached_exit
+_HEADER = struct.Struct("<BBBB")
+_SECTION_LENGTH = struct.Struct("<I")
+_COUNT = struct.Struct("<H")
+_TIMESTAMP = struct.Struct("<d")
+# the ways the data of a payload is stored in the data section
+_DATA_BUFFER, _DATA_SHARED_MEMORY, _DATA_OBJECT, _DATA_SHARED_MEMORY_SLOT = range(4)
+# the instance, index, generation and size of a slot, followed by the name of its pool
+_SLOT = struct.Struct("<QQQQ")
 
 
 class Payload(ABC):
@@ -24,13 +46,86 @@ class Payload(ABC):
         pass
 
     @abstractmethod
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         pass
 
     @abstractmethod
     def is_empty(self):
         pass
 
+    def shared_copy(self):
+        """
+        Returns a copy of the payload that shares its data with this one.
+        """
+        return copy.copy(self)
+
+
+def _encode_frame(frame, codec):
+    return frame.tobytes() if codec is None else codec.encode(frame)
+
+
+def _decode_frame(buffer, dtype, shape, codec_name):
+    if codec_name is None:
+        return np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    return get_frame_decoder(codec_name).decode(buffer, dtype, shape)
+
+
+def _write_to_shared_memory(frame, generator, codec):
+    """
+    Writes the frame into the pool of the generator, or into a new shared
+    memory of its own if it does not fit in a slot, straight from the array
+    unless a codec compresses it.
+    Returns the SharedMemorySlot or the name of the memory.
+    """
+    if codec is None:
+        data = np.ascontiguousarray(frame)
+    else:
+        data = np.frombuffer(codec.encode(frame), dtype=np.uint8)
+    write_to_pool = getattr(generator, "write_to_pool", None)
+    if write_to_pool is not None:
+        slot = write_to_pool(data)
+        if slot is not None:
+            return slot
+    if sys.version_info.minor == 8:
+        memory = generator.get_next_shared_memory(size=data.nbytes)
+        np.ndarray(data.shape, data.dtype, buffer=memory.buf)[...] = data
+        return memory.name
+    memory_name = generator.get_next_shared_memory(size=data.nbytes)
+    memory = get_shared_memory_object(memory_name)
+    memory.acquire_semaphore()
+    memory.write_array(data)
+    memory.release_semaphore()
+    return memory_name
+
+
+def _read_from_shared_memory(memory, dtype, shape, codec_name):
+    """
+    Returns the frame in a slot of a pool or in the shared memory with the
+    name, as a read-only view of the memory unless it was compressed by a
+    codec, or None if the frame is gone. A slot is acknowledged once the
+    frame and every view of it are released.
+    """
+    if isinstance(memory, SharedMemorySlot):
+        buffer = read_slot(memory)
+        if buffer is None:
+            return None
+        buffer = np.frombuffer(buffer, dtype=np.uint8)
+        weakref.finalize(buffer, acknowledge_slot, memory)
+    else:
+        buffer = map_shared_memory(memory)
+        if buffer is None:
+            record_late_read()
+            return None
+    return _decode_frame(buffer, dtype, shape, codec_name)
+
+
+def _read_only_view(frame):
+    if not isinstance(frame, np.ndarray):
+        return frame
+    view = frame.view()
+    view.flags.writeable = False
+    return view
+
 
 class FramePayload(Payload):
 
@@ -38,54 +133,40 @@ class FramePayload(Payload):
         super().__init__(data)
         self.shape = None
         self.dtype = None
+        # the name of the codec the encoded frame is compressed with
+        self.codec = None
 
     def decode(self):
         if self.encoded:
-            if isinstance(self.data, str):
+            if isinstance(self.data, (str, SharedMemorySlot)):
                 decoded_img = self._get_frame()
             else:
-                decoded_img = np.frombuffer(self.data, dtype=self.dtype)
-                decoded_img = decoded_img.reshape(self.shape)
+                decoded_img = _decode_frame(self.data, self.dtype, self.shape, getattr(self, "codec", None))
             self.data = decoded_img
             self.encoded = False
+            self.codec = None
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         if not self.encoded:
             self.shape = self.data.shape
             self.dtype = self.data.dtype
-            buf = self.data.tobytes()
+            self.codec = None if codec is None else codec.name
             if generator is None:
-                self.data = buf
+                self.data = _encode_frame(self.data, codec)
             else:
-                if sys.version_info.minor == 8:
-                    memory = generator.get_next_shared_memory(size=len(buf))
-                    memory.buf[:] = bytes(buf)
-                    self.data = memory.name
-                else:
-                    memory_name = generator.get_next_shared_memory(size=len(buf))
-                    memory = get_shared_memory_object(memory_name)
-                    memory.acquire_semaphore()
-                    memory.write_to_memory(buf)
-                    memory.release_semaphore()
-                    self.data = memory_name
+                self.data = _write_to_shared_memory(self.data, generator, codec)
             self.encoded = True
 
     def is_empty(self):
         return self.data is None
 
+    def shared_copy(self):
+        payload = copy.copy(self)
+        payload.data = _read_only_view(self.data)
+        return payload
+
     def _get_frame(self):
-        memory = get_shared_memory_object(self.data)
-        if memory:
-            if sys.version_info.minor == 8:
-                data = bytes(memory.buf)
-                memory.close()
-            else:
-                memory.acquire_semaphore()
-                data = memory.read_from_memory()
-                memory.release_semaphore()
-            frame = np.frombuffer(data, dtype=self.dtype)
-            return frame.reshape(self.shape)
-        return None
+        return _read_from_shared_memory(self.data, self.dtype, self.shape, getattr(self, "codec", None))
 
 
 class PredictionPayload(Payload):
@@ -95,7 +176,7 @@ class PredictionPayload(Payload):
     def decode(self):
         pass
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         pass
 
     def is_empty(self):
@@ -111,54 +192,41 @@ class FrameMetadataPayload(Payload):
         super().__init__(data)
         self.shape = None
         self.dtype = None
+        # the name of the codec the encoded frame is compressed with
+        self.codec = None
 
     def decode(self):
         if self.encoded:
-            if isinstance(self.data[0], str):
+            if isinstance(self.data[0], (str, SharedMemorySlot)):
                 decoded_img = self._get_frame()
             else:
-                decoded_img = np.frombuffer(self.data[0], dtype=self.dtype)
-                decoded_img = decoded_img.reshape(self.shape)
+                decoded_img = _decode_frame(self.data[0], self.dtype, self.shape, getattr(self, "codec", None))
             self.data = (decoded_img, self.data[1])
             self.encoded = False
+            self.codec = None
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         if not self.encoded:
             self.shape = self.data[0].shape
             self.dtype = self.data[0].dtype
-            buf = self.data[0].tobytes()
+            self.codec = None if codec is None else codec.name
             if generator is None:
-                self.data = (buf, self.data[1])
+                self.data = (_encode_frame(self.data[0], codec), self.data[1])
             else:
-                if sys.version_info.minor == 8:
-                    memory = generator.get_next_shared_memory(size=len(buf))
-                    memory.buf[:] = bytes(buf)
-                    self.data = (memory.name, self.data[1])
-                else:
-                    memory_name = generator.get_next_shared_memory(size=len(buf))
-                    memory = get_shared_memory_object(memory_name)
-                    memory.acquire_semaphore()
-                    memory.write_to_memory(buf)
-                    memory.release_semaphore()
-                    self.data = (memory_name, self.data[1])
+                self.data = (_write_to_shared_memory(self.data[0], generator, codec), self.data[1])
             self.encoded = True
 
     def is_empty(self):
         return self.data is None
 
+    def shared_copy(self):
+        payload = copy.copy(self)
+        if isinstance(self.data, tuple):
+            payload.data = (_read_only_view(self.data[0]), copy.copy(self.data[1]))
+        return payload
+
     def _get_frame(self):
-        memory = get_shared_memory_object(self.data[0])
-        if memory:
-            if sys.version_info.minor == 8:
-                data = bytes(memory.buf)
-                memory.close()
-            else:
-                memory.acquire_semaphore()
-                data = memory.read_from_memory()
-                memory.release_semaphore()
-            frame = np.frombuffer(data, dtype=self.dtype)
-            return frame.reshape(self.shape)
-        return None
+        return _read_from_shared_memory(self.data[0], self.dtype, self.shape, getattr(self, "codec", None))
 
 
 class Message:
@@ -182,6 +250,20 @@ class Message:
             self.payload.decode()
         self.payload.data = data
 
+    def shared_copy(self):
+        """
+        Returns a copy of the message for one of several consumers of the
+        same message. The copy has its own history and payload object, but
+        its frame is a read-only view of the frame of this message, so
+        nothing is copied unless the consumer replaces the frame with
+        update_payload.
+        """
+        msg = copy.copy(self)
+        msg.history = collections.defaultdict(dict, {component_name: sections.copy()
+                                                     for component_name, sections in self.history.items()})
+        msg.payload = self.payload.shared_copy()
+        return msg
+
     def get_payload(self):
         if self.payload.encoded:
             self.payload.decode()
@@ -232,6 +314,16 @@ class Message:
             else:
                 logger.debug("Sending the following message: %s", str(self))
 
+    def get_age(self):
+        """
+        Returns the number of seconds that passed since the message first
+        entered a component, or None if it has no recorded entry.
+        """
+        entries = [sections["entry"] for sections in self.history.values() if "entry" in sections]
+        if not entries:
+            return None
+        return time.time() - min(entries)
+
     def get_latency(self, component_name):
         """
         Returns the time it took for a message to pass through a whole
@@ -278,34 +370,159 @@ class Message:
                f"history: {self.history} \n"
 
 
-def message_encode(msg, generator=None):
+def message_encode(msg, generator=None, wire_format=BINARY_FORMAT, codec=None):
     """
     Encodes the message object.
 
-    This method compresses the message payload and then serializes the whole
-    message object into bytes, using pickle.
+    The binary format starts with a header of the format, payload type and
+    data kind, followed by length prefixed sections: the id, the source
+    address, the history, the dtype and shape of the frame, the metadata or
+    prediction pickled on its own, the buffer of the frame (or the name of
+    the shared memory holding it) and the name of the codec that compressed
+    the frame.
 
     Args:
         msg: the message to encode.
         generator: generator necessary for shared memory usage.
+        wire_format: BINARY_FORMAT, or PICKLE_FORMAT to pickle the whole
+        message for consumers that cannot decode the binary format yet.
+        codec: the FrameCodec to compress the frame with, None sends the
+        raw frame.
     """
-    msg.payload.encode(generator)
-    return pickle.dumps(msg)
+    if wire_format == PICKLE_FORMAT:
+        msg.payload.encode(generator, codec)
+        return pickle.dumps(msg)
+    if generator is not None or codec is not None:
+        msg.payload.encode(generator, codec)
+    payload = msg.payload
+    payload_type = _PAYLOAD_TYPES.index(type(payload))
+    dtype, shape, data = "", (), b""
+    codec_name = getattr(payload, "codec", None) or ""
+    if isinstance(payload, PredictionPayload):
+        data_kind, extra = _DATA_OBJECT, pickle.dumps(payload.data, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        if isinstance(payload, FrameMetadataPayload):
+            frame, metadata = payload.data
+            extra = pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            frame, extra = payload.data, b""
+        if payload.encoded:
+            dtype, shape = payload.dtype, payload.shape
+        else:
+            frame = np.ascontiguousarray(frame)
+            dtype, shape = frame.dtype, frame.shape
+        dtype = np.dtype(dtype).str
+        if isinstance(frame, SharedMemorySlot):
+            data_kind = _DATA_SHARED_MEMORY_SLOT
+            data = _SLOT.pack(frame.instance, frame.index, frame.generation, frame.size) + frame.pool_name.encode()
+        elif isinstance(frame, str):
+            data_kind, data = _DATA_SHARED_MEMORY, frame.encode()
+        else:
+            # the frame is only copied once, into the encoded message
+            data_kind, data = _DATA_BUFFER, memoryview(frame).cast("B")
+    sections = (msg.id.encode(), msg.source_address.encode(), _pack_history(msg.history),
+                dtype.encode(), struct.pack("<{0}q".format(len(shape)), *shape), extra, data,
+                codec_name.encode())
+    parts = [_HEADER.pack(BINARY_FORMAT, payload_type, data_kind, msg.reached_exit)]
+    for section in sections:
+        parts.append(_SECTION_LENGTH.pack(len(section)))
+        parts.append(section)
+    return b"".join(parts)
 
 
 def message_decode(encoded_msg, lazy=False):
     """
     Decodes the message object.
 
-    This method deserializes the pickled message, and decodes the message
-    payload if 'lazy' is False.
+    This method deserializes the message, either binary or pickled, and
+    decodes the message payload if 'lazy' is False. The frame of a binary
+    message is a view of encoded_msg, it is not copied. A frame compressed
+    by a codec is always decompressed once it's accessed, so the frames a
+    routine drops are never decompressed.
 
     Args:
         encoded_msg: the message to decode.
         lazy: if this is True, then the payload will only be decoded once it's
         accessed.
     """
-    msg = pickle.loads(encoded_msg)
-    if not lazy:
+    if encoded_msg[0] == BINARY_FORMAT:
+        msg = _decode_binary(encoded_msg)
+    else:
+        msg = pickle.loads(encoded_msg)
+    if not lazy and getattr(msg.payload, "codec", None) is None:
         msg.payload.decode()
     return msg
+
+
+_PAYLOAD_TYPES = (FramePayload, FrameMetadataPayload, PredictionPayload)
+
+
+def _pack_history(history):
+    parts = [_COUNT.pack(len(history))]
+    for component_name, sections in history.items():
+        component_name = component_name.encode()
+        parts += [_COUNT.pack(len(component_name)), component_name, _COUNT.pack(len(sections))]
+        for section, timestamp in sections.items():
+            section = section.encode()
+            parts += [_COUNT.pack(len(section)), section, _TIMESTAMP.pack(timestamp)]
+    return b"".join(parts)
+
+
+def _unpack_history(buffer):
+    history = collections.defaultdict(dict)
+
+    def read_string(offset):
+        (length,) = _COUNT.unpack_from(buffer, offset)
+        offset += _COUNT.size
+        return str(buffer[offset:offset + length], "utf-8"), offset + length
+
+    (components,) = _COUNT.unpack_from(buffer, 0)
+    offset = _COUNT.size
+    for _ in range(components):
+        component_name, offset = read_string(offset)
+        (sections,) = _COUNT.unpack_from(buffer, offset)
+        offset += _COUNT.size
+        for _ in range(sections):
+            section, offset = read_string(offset)
+            (history[component_name][section],) = _TIMESTAMP.unpack_from(buffer, offset)
+            offset += _TIMESTAMP.size
+    return history
+
+
+def _decode_binary(encoded_msg):
+    buffer = memoryview(encoded_msg)
+    _, payload_type, data_kind, reached_exit = _HEADER.unpack_from(buffer, 0)
+    offset = _HEADER.size
+    sections = []
+    for _ in range(_BINARY_SECTIONS):
+        (length,) = _SECTION_LENGTH.unpack_from(buffer, offset)
+        offset += _SECTION_LENGTH.size
+        sections.append(buffer[offset:offset + length])
+        offset += length
+    msg_id, source_address, history, dtype, shape, extra, data, codec_name = sections
+
+    payload_class = _PAYLOAD_TYPES[payload_type]
+    payload = payload_class.__new__(payload_class)
+    if data_kind == _DATA_OBJECT:
+        payload.data = pickle.loads(extra)
+        payload.encoded = False
+    else:
+        if data_kind == _DATA_SHARED_MEMORY_SLOT:
+            frame = SharedMemorySlot(str(data[_SLOT.size:], "utf-8"), *_SLOT.unpack_from(data))
+        elif data_kind == _DATA_SHARED_MEMORY:
+            frame = str(data, "utf-8")
+        else:
+            frame = data
+        payload.data = (frame, pickle.loads(extra)) if payload_class is FrameMetadataPayload else frame
+        payload.encoded = True
+        payload.codec = str(codec_name, "ascii") or None
+        payload.dtype = np.dtype(str(dtype, "ascii"))
+        payload.shape = struct.unpack("<{0}q".format(len(shape) // 8), shape)
+
+    msg = Message.__new__(Message)
+    msg.payload = payload
+    msg.source_address = str(source_address, "utf-8")
+    msg.history = _unpack_history(history)
+    msg.reached_exit = bool(reached_exit)
+    msg.id = str(msg_id, "utf-8")
+    return msg
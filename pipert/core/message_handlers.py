@@ -1,5 +1,20 @@
+import asyncio
+import collections
+import os
+import socket
+import threading
+import time
 from abc import ABC, abstractmethod
 import redis
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis-py older than 4.2
+    aioredis = None
+
+from pipert.core.shared_memory_ring import SharedMemoryRing, ring_name
+
+# the transports a routine can send and read its messages through
+TRANSPORTS = ("redis", "shm")
 
 
 class MessageHandler(ABC):
@@ -53,6 +68,17 @@ class MessageHandler(ABC):
         """
         pass
 
+    def flush(self, force=True):
+        """
+        Sends the messages that a handler batched. Handlers that do not
+        batch send every message at once and have nothing to flush.
+
+        Args:
+            force: whether to send a batch before it waited as long as the
+            handler lets messages wait.
+        """
+        pass
+
     @abstractmethod
     def connect(self):
         """
@@ -69,15 +95,60 @@ class MessageHandler(ABC):
 
 
 class RedisHandler(MessageHandler):
+    """
+    Reads and sends messages through Redis streams. By default every read
+    polls the stream with a single command. With block_ms, a read with no
+    message to return waits up to block_ms milliseconds on the server with
+    XREAD BLOCK, and fetches up to count messages at once into a local
+    buffer that the following reads take from.
+
+    Streams are trimmed to maxlen messages, exactly unless approximate_trim
+    is set (MAXLEN ~, which Redis only applies to whole nodes of about 100
+    messages), and to about max_stream_bytes if it is given, always exactly,
+    going by the average size of the messages sent to the stream. With a
+    batch_size, sends are pipelined and a batch goes out once it holds
+    batch_size messages, its first message waited flush_ms milliseconds or
+    flush is called.
 
-    def __init__(self, url, maxlen=100):
+    The url is a redis://, rediss:// or unix:// URL, as a string or parsed.
+    A handler given the connection_pools of its component shares their
+    connections with the other handlers of the component.
+    """
+
+    def __init__(self, url, maxlen=100, block_ms=None, count=1, approximate_trim=False, batch_size=1,
+                 flush_ms=None, max_stream_bytes=None, connection_pools=None):
         self.conn = None
         self.url = url
+        self.connection_pools = connection_pools
         self.maxlen = maxlen
+        self.block_ms = block_ms
+        self.count = count
+        # a byte budget is not kept by trimming whole nodes
+        self.approximate_trim = approximate_trim and max_stream_bytes is None
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_stream_bytes = max_stream_bytes
         self.last_msg_id = None
+        # the messages fetched by a blocking read that were not read yet,
+        # oldest first, and the key they were read from
+        self.prefetched = collections.deque()
+        self.prefetched_key = None
+        # the pipeline of the batch being sent and when its first message was added
+        self.pipeline = None
+        self.batch_started = None
+        # the average size of the messages sent to every stream
+        self.message_sizes = {}
         self.connect()
 
     def read_next_msg(self, in_key):
+        if self.block_ms:
+            if self.last_msg_id is None:
+                msg = self._receive_or_wait_from_start(in_key)
+                if msg is not None:
+                    return msg
+            if not self._get_prefetched(in_key):
+                self._prefetch(in_key, block=True)
+            return self.prefetched.popleft() if self.prefetched else None
         return self._read_from_redis_using_method(
             in_key=in_key,
             reading_method=self.conn.xrange,
@@ -87,6 +158,29 @@ class RedisHandler(MessageHandler):
         )
 
     def read_most_recent_msg(self, in_key):
+        if self.block_ms:
+            if self.last_msg_id is None:
+                msg = self._receive_or_wait_from_start(in_key)
+                if msg is not None:
+                    return msg
+            # drain everything that arrived since the last read, and only
+            # wait when nothing did
+            if self._prefetch(in_key, block=not self._get_prefetched(in_key)) == self.count:
+                # the stream may hold newer messages than a full batch
+                latest_msg = self._read_from_redis_using_method(
+                    in_key,
+                    self.conn.xrevrange,
+                    name=in_key,
+                    count=1,
+                    min=self._add_offset_to_stream_id(self.last_msg_id, 1)
+                )
+                if latest_msg is not None:
+                    self.prefetched.append(latest_msg)
+            if not self.prefetched:
+                return None
+            msg = self.prefetched.pop()
+            self.prefetched.clear()
+            return msg
         return self._read_from_redis_using_method(
             in_key=in_key,
             reading_method=self.conn.xrevrange,
@@ -95,7 +189,45 @@ class RedisHandler(MessageHandler):
             min=self._add_offset_to_stream_id(self.last_msg_id, 1)
         )
 
+    def _receive_or_wait_from_start(self, in_key):
+        """
+        Returns the last message of the stream, or None if it is empty or
+        does not exist yet, in which case the blocking reads that follow wait
+        for its messages from its start.
+        """
+        msg = self.receive(in_key)
+        if msg is None:
+            self.last_msg_id = "0-0"
+        return msg
+
+    def _get_prefetched(self, in_key):
+        """
+        Returns the number of prefetched messages of the key, the messages
+        of another key are dropped.
+        """
+        if self.prefetched_key != in_key:
+            self.prefetched.clear()
+            self.prefetched_key = in_key
+        return len(self.prefetched)
+
+    def _prefetch(self, in_key, block):
+        """
+        Appends the messages after the last one fetched to the buffer, up to
+        count of them, waiting up to block_ms for one if block is set.
+        Returns the number of messages fetched.
+        """
+        streams = self.conn.xread({in_key: self.last_msg_id}, count=self.count,
+                                  block=self.block_ms if block else None)
+        if not streams:
+            return 0
+        entries = streams[0][1]
+        for msg_id, fields in entries:
+            self.prefetched.append(fields["msg".encode("utf-8")])
+        self.last_msg_id = entries[-1][0].decode()
+        return len(entries)
+
     def receive(self, in_key):
+        self.prefetched.clear()
         # Need to set value in last_msg_id so
         # _read_from_redis_using_method will not cause an infinite loop
         self.last_msg_id = ""
@@ -129,15 +261,55 @@ class RedisHandler(MessageHandler):
         fields = {
             "msg": msg
         }
-        _ = self.conn.xadd(out_key, fields, maxlen=self.maxlen)
+        maxlen = self._get_maxlen(out_key, len(msg))
+        if self.batch_size <= 1:
+            _ = self.conn.xadd(out_key, fields, maxlen=maxlen, approximate=self.approximate_trim)
+            return
+        if self.pipeline is None:
+            self.pipeline = self.conn.pipeline(transaction=False)
+        if not len(self.pipeline):
+            self.batch_started = time.monotonic()
+        self.pipeline.xadd(out_key, fields, maxlen=maxlen, approximate=self.approximate_trim)
+        if len(self.pipeline) >= self.batch_size or self._batch_expired():
+            self.flush()
+
+    def flush(self, force=True):
+        if self.pipeline is None or not len(self.pipeline):
+            return
+        if not force and self.flush_ms is not None and not self._batch_expired():
+            return
+        self.pipeline.execute()
+
+    def _batch_expired(self):
+        return self.flush_ms is not None and time.monotonic() - self.batch_started >= self.flush_ms / 1000
+
+    def _get_maxlen(self, out_key, msg_size):
+        """
+        Returns the number of messages to trim a stream to, so it stays within
+        max_stream_bytes.
+        """
+        if self.max_stream_bytes is None:
+            return self.maxlen
+        average_size = self.message_sizes.get(out_key, msg_size)
+        average_size += (msg_size - average_size) / 8
+        self.message_sizes[out_key] = average_size
+        return max(1, min(self.maxlen, int(self.max_stream_bytes // average_size)))
 
     def connect(self):
-        self.conn = redis.Redis(host=self.url.hostname, port=self.url.port)
+        if self.conn is not None:
+            return
+        if self.connection_pools is not None:
+            self.conn = self.connection_pools.get_client(self.url)
+            return
+        self.conn = redis.Redis.from_url(_url_string(self.url))
         if not self.conn.ping():
             raise Exception('Redis unavailable')
 
     def close(self):
-        self.conn.close()
+        self.flush()
+        # the connections of a shared pool are closed by its component
+        if self.connection_pools is None:
+            self.conn.close()
 
     @staticmethod
     def _add_offset_to_stream_id(stream_id, offset):
@@ -147,3 +319,483 @@ class RedisHandler(MessageHandler):
         last_msg_id_to_read = '-'.join([fixed_id[0],
                                         str(int(fixed_id[1]) + offset)])
         return last_msg_id_to_read
+
+
+class RedisConsumerGroupHandler(RedisHandler):
+    """
+    Reads the messages of a stream as a consumer of a Redis consumer group,
+    so the handlers of the group split the messages of the stream between
+    them (XREADGROUP) instead of each of them reading all of them. The group
+    is created with the stream when it is first read, and gets the messages
+    sent from then on.
+
+    A message is acknowledged (XACK) when the next message is read or the
+    handler is closed, so the messages of a consumer that died while it
+    processed them stay pending. Every claim_idle_ms the handler claims the
+    messages that were pending for longer than that (XAUTOCLAIM) and reads
+    them before new ones.
+
+    Every message read has to be processed by someone, so
+    read_most_recent_msg returns the next message like read_next_msg does.
+    """
+    CLAIM_IDLE_MS = 5000
+
+    def __init__(self, url, group, consumer=None, maxlen=100, block_ms=None, count=1,
+                 claim_idle_ms=CLAIM_IDLE_MS, *args, **kwargs):
+        super().__init__(url, maxlen, block_ms, count, *args, **kwargs)
+        self.group = group
+        # unique among the consumers of the group, whose handlers may run
+        # in the same process
+        self.consumer = consumer or "{0}_{1}_{2}".format(socket.gethostname(), os.getpid(), os.urandom(4).hex())
+        self.claim_idle_ms = claim_idle_ms
+        # the streams the handler joined the group of
+        self.joined = set()
+        # the ids of the messages read that were not acknowledged yet, by key
+        self.unacked = collections.defaultdict(list)
+        self.last_claim = None
+        # the number of messages claimed from other consumers
+        self.claimed = 0
+
+    def read_next_msg(self, in_key):
+        self._acknowledge()
+        self._join(in_key)
+        if not self._get_prefetched(in_key):
+            self._claim(in_key)
+        if not self.prefetched:
+            streams = self.conn.xreadgroup(self.group, self.consumer, {in_key: ">"}, count=self.count,
+                                           block=self.block_ms)
+            if streams:
+                self._add_prefetched(streams[0][1])
+        if not self.prefetched:
+            return None
+        msg_id, msg = self.prefetched.popleft()
+        self.unacked[in_key].append(msg_id)
+        return msg
+
+    def read_most_recent_msg(self, in_key):
+        return self.read_next_msg(in_key)
+
+    def receive(self, in_key):
+        return self.read_next_msg(in_key)
+
+    def _join(self, in_key):
+        if in_key in self.joined:
+            return
+        try:
+            self.conn.xgroup_create(in_key, self.group, id="$", mkstream=True)
+        except redis.exceptions.ResponseError as error:
+            # another consumer created the group
+            if "BUSYGROUP" not in str(error):
+                raise
+        self.joined.add(in_key)
+
+    def _claim(self, in_key):
+        """
+        Prefetches up to count messages that other consumers did not
+        acknowledge for claim_idle_ms, at most once every claim_idle_ms.
+        """
+        now = time.monotonic()
+        if self.last_claim is not None and now - self.last_claim < self.claim_idle_ms / 1000:
+            return
+        self.last_claim = now
+        _, entries, *_ = self.conn.xautoclaim(in_key, self.group, self.consumer, self.claim_idle_ms,
+                                              count=self.count)
+        self.claimed += self._add_prefetched(entries)
+
+    def _add_prefetched(self, entries):
+        added = 0
+        for msg_id, fields in entries:
+            # a message that was trimmed from the stream while it was pending
+            if not fields:
+                continue
+            self.prefetched.append((msg_id, fields["msg".encode("utf-8")]))
+            added += 1
+        return added
+
+    def _acknowledge(self):
+        for key, msg_ids in self.unacked.items():
+            if msg_ids:
+                self.conn.xack(key, self.group, *msg_ids)
+        self.unacked.clear()
+
+    def close(self):
+        self._acknowledge()
+        # the messages that were prefetched and not read stay pending until
+        # another consumer claims them
+        super().close()
+
+
+class AsyncRedisHandler(MessageHandler):
+    """
+    The asyncio counterpart of RedisHandler, to be used by routines that run
+    on the component's event loop. Every method is a coroutine and connect
+    has to be awaited before the handler is used.
+
+    Like RedisHandler, reads poll the stream unless block_ms is given, then
+    a read with no message to return awaits one for up to block_ms
+    milliseconds with XREAD BLOCK, fetching up to count messages at once. A
+    handler given the connection_pools of its component shares a pool per
+    server and event loop with the other asyncio handlers of the component.
+    """
+
+    def __init__(self, url, maxlen=100, block_ms=None, count=1, connection_pools=None):
+        if aioredis is None:
+            raise ImportError("AsyncRedisHandler requires redis-py 4.2 or newer")
+        self.conn = None
+        self.url = url
+        self.connection_pools = connection_pools
+        self.maxlen = maxlen
+        self.block_ms = block_ms
+        self.count = count
+        self.last_msg_id = None
+        # the messages fetched by a blocking read that were not read yet,
+        # oldest first, and the key they were read from
+        self.prefetched = collections.deque()
+        self.prefetched_key = None
+
+    async def read_next_msg(self, in_key):
+        if self.block_ms:
+            if self.last_msg_id is None:
+                msg = await self._receive_or_wait_from_start(in_key)
+                if msg is not None:
+                    return msg
+            if self.prefetched_key != in_key:
+                self.prefetched.clear()
+                self.prefetched_key = in_key
+            if not self.prefetched:
+                await self._prefetch(in_key, self.count)
+            return self.prefetched.popleft() if self.prefetched else None
+        if self.last_msg_id is None:
+            return await self.receive(in_key)
+        return await self._read(self.conn.xrange(
+            in_key, count=1,
+            min=RedisHandler._add_offset_to_stream_id(self.last_msg_id, 1)))
+
+    async def read_most_recent_msg(self, in_key):
+        if self.block_ms and self.last_msg_id is None:
+            msg = await self._receive_or_wait_from_start(in_key)
+            if msg is not None:
+                return msg
+        if self.last_msg_id is None:
+            return await self.receive(in_key)
+        self.prefetched.clear()
+        msg = await self._read(self.conn.xrevrange(
+            in_key, count=1,
+            min=RedisHandler._add_offset_to_stream_id(self.last_msg_id, 1)))
+        if msg is None and self.block_ms:
+            # nothing arrived since the last read, wait for the next message
+            await self._prefetch(in_key, 1)
+            msg = self.prefetched.pop() if self.prefetched else None
+        return msg
+
+    async def _receive_or_wait_from_start(self, in_key):
+        """
+        Returns the last message of the stream, or None if it is empty or
+        does not exist yet, in which case the blocking reads that follow wait
+        for its messages from its start.
+        """
+        msg = await self.receive(in_key)
+        if msg is None:
+            self.last_msg_id = "0-0"
+        return msg
+
+    async def _prefetch(self, in_key, count):
+        """
+        Appends up to count messages after the last one fetched to the
+        buffer, waiting up to block_ms for one.
+        """
+        streams = await self.conn.xread({in_key: self.last_msg_id}, count=count, block=self.block_ms)
+        if not streams:
+            return
+        entries = streams[0][1]
+        for msg_id, fields in entries:
+            self.prefetched.append(fields["msg".encode("utf-8")])
+        self.last_msg_id = entries[-1][0].decode()
+
+    async def receive(self, in_key):
+        self.prefetched.clear()
+        return await self._read(self.conn.xrevrange(in_key, count=1))
+
+    async def _read(self, pending_read):
+        redis_msg = await pending_read
+        if not redis_msg:
+            return None
+        self.last_msg_id = redis_msg[0][0].decode()
+        return redis_msg[0][1]["msg".encode("utf-8")]
+
+    async def send(self, out_key, msg):
+        fields = {
+            "msg": msg
+        }
+        _ = await self.conn.xadd(out_key, fields, maxlen=self.maxlen)
+
+    async def connect(self):
+        if self.conn is not None:
+            return
+        if self.connection_pools is not None:
+            self.conn = self.connection_pools.get_async_client(self.url)
+        else:
+            self.conn = aioredis.Redis.from_url(_url_string(self.url))
+        if not await self.conn.ping():
+            raise Exception('Redis unavailable')
+
+    async def close(self):
+        if self.connection_pools is not None:
+            await self.connection_pools.release_async_client(self.url)
+        else:
+            await self.conn.close()
+
+
+def _url_string(url):
+    return url if isinstance(url, str) else url.geturl()
+
+
+class RedisConnectionPools:
+    """
+    The Redis connection pools of a component by their URL, shared by the
+    RedisHandlers of all its routines, so a component opens and checks a
+    single pool per server. The pools are not shared between processes, a
+    copy of the registry in another process starts without pools.
+
+    The AsyncRedisHandlers of the component share an asyncio pool per server
+    and event loop, which is closed once the last of them released it.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        # the asyncio clients by their URL and event loop, with the number of
+        # handlers using them
+        self.async_clients = {}
+        self._lock = threading.Lock()
+
+    def get_client(self, url):
+        """
+        Returns a client of the pool of the URL, a redis://, rediss:// or
+        unix:// URL as a string or parsed. The pool is created and the
+        server is checked on the first call for the URL.
+        """
+        url = _url_string(url)
+        with self._lock:
+            client = self.clients.get(url)
+            if client is None:
+                client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(url))
+                if not client.ping():
+                    raise Exception('Redis unavailable')
+                self.clients[url] = client
+            return client
+
+    def get_async_client(self, url):
+        """
+        Returns a client of the asyncio pool of the URL for the running event
+        loop, to be released with release_async_client.
+        """
+        key = (_url_string(url), asyncio.get_running_loop())
+        with self._lock:
+            client, users = self.async_clients.get(key, (None, 0))
+            if client is None:
+                client = aioredis.Redis(connection_pool=aioredis.ConnectionPool.from_url(key[0]))
+            self.async_clients[key] = (client, users + 1)
+            return client
+
+    async def release_async_client(self, url):
+        """
+        Releases a client returned by get_async_client, the connections of
+        its pool are closed with the last client.
+        """
+        key = (_url_string(url), asyncio.get_running_loop())
+        with self._lock:
+            client, users = self.async_clients.pop(key)
+            if users > 1:
+                self.async_clients[key] = (client, users - 1)
+                return
+        await client.connection_pool.disconnect()
+
+    def disconnect(self):
+        """
+        Closes the connections of every pool.
+        """
+        with self._lock:
+            for client in self.clients.values():
+                client.connection_pool.disconnect()
+            self.clients = {}
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+class SharedMemoryRingHandler(MessageHandler):
+    """
+    Links components that run on the same host without a broker: the
+    messages of every key are kept in a ring of maxlen slots in shared
+    memory, see pipert.core.shared_memory_ring. The ring is created by the
+    first message sent to the key with slots of at least slot_size bytes,
+    and created again with larger slots when a message does not fit. A ring
+    has fewer slots when maxlen of them would take more than max_ring_bytes,
+    but at least two.
+
+    Reads never block unless block_ms is given, then a read waits up to
+    block_ms milliseconds for a message when there is no new one. The
+    handler keeps the last message read from every key, so it can read
+    several keys.
+    """
+    SLOT_SIZE = 64 * 1024
+    MAX_RING_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, maxlen=100, slot_size=SLOT_SIZE, block_ms=None, max_ring_bytes=MAX_RING_BYTES):
+        self.maxlen = maxlen
+        self.slot_size = slot_size
+        self.block_ms = block_ms
+        self.max_ring_bytes = max_ring_bytes
+        # the rings the handler reads from and sends to, by their key
+        self.rings = {}
+        self.out_rings = {}
+        # the sequence number of the next message to read from every key
+        self.next_sequences = {}
+        # the id and semaphore of the handler as a reader of every ring
+        self.readers = {}
+
+    def read_next_msg(self, in_key):
+        if self.next_sequences.get(in_key) is None:
+            return self.receive(in_key)
+        ring = self._get_ring(in_key)
+        if ring is None or not self._wait_for_message(in_key, ring):
+            return None
+        msg = None
+        while msg is None:
+            # skip the messages that were overwritten before they were read
+            sequence = max(self.next_sequences[in_key], ring.head - ring.slot_count)
+            msg = ring.read(sequence)
+        self.next_sequences[in_key] = sequence + 1
+        return msg
+
+    def read_most_recent_msg(self, in_key):
+        if self.next_sequences.get(in_key) is None:
+            return self.receive(in_key)
+        ring = self._get_ring(in_key)
+        if ring is None or not self._wait_for_message(in_key, ring):
+            return None
+        return self._read_latest(in_key, ring)
+
+    def receive(self, in_key):
+        ring = self._get_ring(in_key)
+        if ring is None or (ring.head == 0 and not self._wait_for_message(in_key, ring)):
+            return None
+        return self._read_latest(in_key, ring)
+
+    def _read_latest(self, in_key, ring):
+        msg = None
+        while msg is None:
+            head = ring.head
+            msg = ring.read(head - 1)
+        self.next_sequences[in_key] = head
+        return msg
+
+    def _wait_for_message(self, in_key, ring):
+        """
+        Returns whether the ring has a message that was not read yet, after
+        waiting up to block_ms for one.
+        """
+        if ring.head > self.next_sequences.get(in_key, 0):
+            return True
+        if not self.block_ms:
+            return False
+        reader = self.readers.get(in_key)
+        if reader is None:
+            time.sleep(self.block_ms / 1000)
+            return ring.head > self.next_sequences.get(in_key, 0)
+        deadline = time.monotonic() + self.block_ms / 1000
+        # the semaphore may have been released for a message that was read
+        while ring.head <= self.next_sequences.get(in_key, 0):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return False
+            ring.wait(reader, timeout)
+        return True
+
+    def _get_ring(self, in_key):
+        """
+        Returns the ring of a key to read from, or None if no message was
+        sent to the key yet.
+        """
+        ring = self.rings.get(in_key)
+        if ring is not None and ring.closed and ring.head <= (self.next_sequences.get(in_key) or 0):
+            # its writer created the ring again or stopped, and the messages
+            # sent before were read
+            self._forget_ring(in_key)
+            ring = None
+        if ring is None:
+            ring = SharedMemoryRing.open(ring_name(in_key))
+            if ring is None or ring.closed:
+                if self.block_ms:
+                    time.sleep(self.block_ms / 1000)
+                return None
+            self.rings[in_key] = ring
+            if self.block_ms:
+                reader = ring.register_reader()
+                if reader is not None:
+                    self.readers[in_key] = reader
+        return ring
+
+    def _forget_ring(self, in_key):
+        ring = self.rings.pop(in_key)
+        reader = self.readers.pop(in_key, None)
+        if reader is not None:
+            ring.unregister_reader(*reader)
+        ring.detach()
+        if self.next_sequences.get(in_key) is not None:
+            # the messages of the new ring are read from its first one
+            self.next_sequences[in_key] = 0
+
+    def send(self, out_key, msg):
+        ring = self.out_rings.get(out_key)
+        if ring is None or ring.closed or len(msg) > ring.slot_size:
+            if ring is not None:
+                self.out_rings.pop(out_key).detach()
+            ring = SharedMemoryRing.open(ring_name(out_key))
+            if ring is None or ring.closed or len(msg) > ring.slot_size:
+                slot_size = max(self.slot_size, 2 * len(msg))
+                slot_count = max(2, min(self.maxlen, self.max_ring_bytes // slot_size))
+                ring = SharedMemoryRing.create(ring_name(out_key), slot_size, slot_count)
+            self.out_rings[out_key] = ring
+        ring.write(msg)
+
+    def connect(self):
+        pass
+
+    def close(self):
+        """
+        Stops reading from the rings and deletes the rings the handler sent
+        to, their readers read the messages of the next ring created for
+        the key.
+        """
+        for in_key in list(self.rings):
+            self._forget_ring(in_key)
+        for ring in self.out_rings.values():
+            ring.close()
+        self.out_rings = {}
+
+
+def create_message_handler(transport, url, maxlen=100, block_ms=None, group=None, max_stream_bytes=None,
+                           **redis_options):
+    """
+    Returns the handler of a transport: "redis" for a Redis server at the
+    url, "shm" for shared memory rings between components on the same host.
+    block_ms is how long reads wait for a message, with a group the handler
+    reads as a consumer of the Redis consumer group. max_stream_bytes bounds
+    the size of a stream or ring. The redis_options are the other options of
+    RedisHandler.
+    """
+    if transport == "redis" and group:
+        return RedisConsumerGroupHandler(url, group, maxlen=maxlen, block_ms=block_ms,
+                                         max_stream_bytes=max_stream_bytes, **redis_options)
+    if transport == "redis":
+        return RedisHandler(url, maxlen, block_ms=block_ms, max_stream_bytes=max_stream_bytes, **redis_options)
+    if group:
+        raise ValueError("Consumer groups need the redis transport")
+    if transport == "shm":
+        return SharedMemoryRingHandler(maxlen, block_ms=block_ms,
+                                       max_ring_bytes=max_stream_bytes or SharedMemoryRingHandler.MAX_RING_BYTES)
+    raise ValueError("Unknown transport '{0}'".format(transport))
@@ -37,6 +37,105 @@ class MetricsCollector(ABC):
         """
         pass
 
+    def collect_replica_execution_time(self, execution_time, routine_name, component_name, replica):
+        """
+        Saves the execution time of one replica of a routine that runs as several workers.
+        By default it is saved like the execution time of a regular routine.
+
+        Args:
+            execution_time: the time it took the replica to execute its main_logic function, in seconds.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+            replica: the index of the replica that executed main_logic.
+        """
+        self.collect_execution_time(execution_time, routine_name, component_name)
+
+    def collect_batch_execution_time(self, execution_time, batch_size, routine_name, component_name):
+        """
+        Saves the execution time of a whole batch processed by a batch routine.
+        The per item execution time is saved separately through collect_execution_time.
+
+        Args:
+            execution_time: the time it took the routine to process the batch, in seconds.
+            batch_size: the number of messages in the batch.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        pass
+
+    def collect_missed_deadlines(self, missed_deadlines, routine_name, component_name):
+        """
+        Saves the number of deadlines a paced routine missed since its last report.
+
+        Args:
+            missed_deadlines: the number of iterations that did not start on time.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        pass
+
+    def collect_time_breakdown(self, time_breakdown, routine_name, component_name):
+        """
+        Saves where a routine spent its time since its last report.
+
+        Args:
+            time_breakdown: a dictionary with the seconds spent in each section ("wait", "decode", "logic",
+            "encode", "put", "handler"), the number of "iterations", the "busy" CPU seconds, the "wall" seconds
+            and the "utilization", which is busy divided by wall.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        pass
+
+    def collect_shed_messages(self, count, routine_name, component_name):
+        """
+        Saves the number of messages a routine dropped because they were older than its max_age_ms.
+
+        Args:
+            count: the number of dropped messages.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        pass
+
+    def collect_cpu_budget(self, settings, routine_name, component_name):
+        """
+        Saves the effective CPU settings of a routine once it started running.
+
+        Args:
+            settings: a dictionary that can hold the "torch_threads", "cv2_threads" and "blas_threads"
+            intra-op thread counts and the number of "cpus" the routine may run on.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        pass
+
+    def collect_queue_stats(self, queue_stats, queue_name, component_name):
+        """
+        Saves the stats of one of the component's queues, reported periodically.
+
+        Args:
+            queue_stats: a dictionary with the current "size" and the "maxsize" of the queue, the total number of
+            items "enqueued", "dequeued" and "dropped" to make room for fresher ones, the "high_water" mark and the
+            cumulative seconds producers ("put_wait") and consumers ("get_wait") spent waiting on the queue.
+            queue_name: the name of the queue.
+            component_name: the name of the queue's component.
+        """
+        pass
+
+    def collect_shared_memory_stats(self, shared_memory_stats, component_name):
+        """
+        Saves the shared memory counters of the component's process, reported periodically.
+
+        Args:
+            shared_memory_stats: a dictionary with the number of frames that were already gone when read
+            ("late_reads"), of slots reused without being acknowledged ("expired_leases"), of frames that found
+            no free slot ("pool_fallbacks"), and the number and total size of the orphaned shared memories the
+            janitor removed ("orphans_removed", "leaked_bytes").
+            component_name: the name of the component.
+        """
+        pass
+
 
 class NullCollector(MetricsCollector):
 
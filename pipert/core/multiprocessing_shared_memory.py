@@ -1,5 +1,11 @@
+import collections
+import mmap
+import threading
+import weakref
 from multiprocessing.shared_memory import SharedMemory
 
+from pipert.core.shared_memory_pool import SharedMemoryPool
+
 
 class MemoryIdGenerator:
     """
@@ -44,16 +50,71 @@ def get_shared_memory_object(name):
     return memory
 
 
+# the number of mappings of every shared memory that are still referenced by
+# frames read from it
+_live_mappings = collections.Counter()
+_live_mappings_lock = threading.Lock()
+
+
+def map_shared_memory(name):
+    """
+    Returns a read-only buffer over the shared memory with the name given, or
+    None if there is no such memory. Numpy views of the buffer keep the
+    mapping alive, so they stay valid after the memory is deleted, and the
+    mapping is released with the last of them.
+    Params:
+        -name: The name of a shared memory.
+    """
+    memory = get_shared_memory_object(name)
+    if memory is None:
+        return None
+    if getattr(memory, "_fd", -1) < 0:
+        # no file descriptor to map again outside of posix, copy the frame
+        data = bytes(memory.buf)
+        memory.close()
+        return data
+    # a mapping of its own, SharedMemory cannot be closed while views of its
+    # buffer exist
+    mapfile = mmap.mmap(memory._fd, memory.size, prot=mmap.PROT_READ)
+    memory.close()
+    with _live_mappings_lock:
+        _live_mappings[name] += 1
+    weakref.finalize(mapfile, _release_mapping, name)
+    return mapfile
+
+
+def _release_mapping(name):
+    with _live_mappings_lock:
+        _live_mappings[name] -= 1
+        if not _live_mappings[name]:
+            del _live_mappings[name]
+
+
+def get_live_mappings():
+    """
+    Returns the number of mappings of every shared memory that frames still
+    reference, by the name of the memory.
+    """
+    with _live_mappings_lock:
+        return dict(_live_mappings)
+
+
 class MpSharedMemoryGenerator:
     """
     Generates a new shared memory each time get_next_shared_memory is called
     and is responsible for cleaning up shared memories if the count that
     exists now exceeds the max or the proccess has ended.
     """
-    def __init__(self, component_name, max_count=5):
+    def __init__(self, component_name, max_count=5, slot_size=None):
         self.memory_id_gen = MemoryIdGenerator(component_name, max_count)
         self.max_count = max_count
         self.shared_memories = {}
+        # the bytes of a slot of the pool, None sizes the slots by the first
+        # frame
+        self.slot_size = slot_size
+        # the slots the frames are written to, created by the first write
+        self.pool = None
+        self._pool_lock = threading.Lock()
 
     def get_next_shared_memory(self, size=500000):
         next_name, name_to_unlink = self.memory_id_gen.get_next()
@@ -74,7 +135,29 @@ class MpSharedMemoryGenerator:
 
         return memory
 
+    def write_to_pool(self, data):
+        """
+        Writes a frame into the pool of the component, which is created with
+        max_count slots of slot_size bytes, or the size of the first frame.
+        Returns the SharedMemorySlot of the frame, or None if the frame does
+        not fit in a slot.
+        """
+        pool = self.pool
+        if pool is None:
+            # routine threads share the generator, only one of them creates
+            # the pool
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = SharedMemoryPool("{0}_pool".format(self.memory_id_gen.component_name),
+                                                 self.slot_size or data.nbytes, self.max_count)
+                pool = self.pool
+        return pool.write(data)
+
     def cleanup(self):
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.cleanup()
+                self.pool = None
         for _ in range(self.max_count):
             _, name_to_unlink = self.memory_id_gen.get_next()
             if name_to_unlink:
@@ -85,3 +168,38 @@ class MpSharedMemoryGenerator:
         self.shared_memories[name_to_unlink].close()
         self.shared_memories[name_to_unlink].unlink()
         self.shared_memories.pop(name_to_unlink)
+
+
+class HandoffSharedMemoryGenerator:
+    """
+    Generates a new shared memory each time get_next_shared_memory is called
+    without keeping track of it. The memory is handed off to whoever reads
+    it, the reader is responsible for deleting it with unlink_shared_memory.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.name_count = 0
+
+    def get_next_shared_memory(self, size=500000):
+        next_name = "{0}_{1}".format(self.prefix, self.name_count)
+        self.name_count += 1
+
+        try:
+            return SharedMemory(name=next_name, create=True, size=size)
+        except FileExistsError:
+            memory = SharedMemory(name=next_name)
+            memory.close()
+            memory.unlink()
+            return SharedMemory(name=next_name, create=True, size=size)
+
+
+def unlink_shared_memory(name):
+    """
+    Deletes the shared memory with the name given, if it exists.
+    Params:
+        -name: The name of a shared memory.
+    """
+    memory = get_shared_memory_object(name)
+    if memory:
+        memory.close()
+        memory.unlink()
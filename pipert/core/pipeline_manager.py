@@ -4,7 +4,7 @@ import yaml
 import zerorpc
 import re
 from pipert.core.class_factory import ClassFactory
-from pipert.core.errors import QueueDoesNotExist
+from pipert.core.errors import QueueDoesNotExist, QueueWiringException
 from pipert.core.routine import Routine
 from os import listdir
 from os.path import isfile, join
@@ -79,10 +79,15 @@ class PipelineManager:
 
         try:
             # replace all queue names with the queue objects of the component before creating routine
+            constructor_parameters = routine_class_object.get_constructor_parameters()
             for key, value in routine_parameters_kwargs.items():
                 if 'queue' in key.lower():
-                    routine_parameters_kwargs[key] = self.components[component_name] \
-                        .get_queue(queue_name=value)
+                    queue = self.components[component_name].get_queue(queue_name=value)
+                    if constructor_parameters.get(key) == "QueueIn":
+                        # a routine reads a broadcast queue through a subscriber of its own
+                        queue = self.components[component_name] \
+                            ._subscribe_to_queue(queue, routine_parameters_kwargs["name"])
+                    routine_parameters_kwargs[key] = queue
 
             routine_parameters_kwargs["component_name"] = component_name
 
@@ -93,7 +98,7 @@ class PipelineManager:
                 True,
                 f"The routine {routine_parameters_kwargs['name']} has been added"
             )
-        except QueueDoesNotExist as e:
+        except (QueueDoesNotExist, QueueWiringException) as e:
             return self._create_response(
                 False,
                 e.message()
@@ -125,10 +130,15 @@ class PipelineManager:
 
     @component_name_existence_error(need_to_be_exist=True)
     def create_queue_to_component(self, component_name,
-                                  queue_name, queue_size=1):
+                                  queue_name, queue_size=1, queue_type="queue",
+                                  policy=None, timeout_ms=None, subscribers=None):
         if self.components[component_name].\
                 create_queue(queue_name=queue_name,
-                             queue_size=queue_size):
+                             queue_size=queue_size,
+                             queue_type=queue_type,
+                             policy=policy,
+                             timeout_ms=timeout_ms,
+                             subscribers=subscribers):
             return self._create_response(
                 True,
                 f"The Queue {queue_name} has been created"
@@ -247,7 +257,12 @@ class PipelineManager:
     @component_name_existence_error(need_to_be_exist=True)
     def change_component_execution_mode(self, component_name, execution_mode):
         try:
-            getattr(self.components[component_name], "as_" + execution_mode.lower())()
+            changed = getattr(self.components[component_name], "as_" + execution_mode.lower())()
+            if not changed:
+                return self._create_response(
+                    False,
+                    f"You can't change the execution mode while the component {component_name} is running"
+                )
             return self._create_response(
                 True,
                 f"The component {component_name} changed execution mode to {execution_mode}"
@@ -283,7 +298,13 @@ class PipelineManager:
         vvv Expecting to get vvv
           "components": {
             "component_name": {
-              "queues": [str],
+              "queues": [str or {str: {
+                "type": "queue" or "spsc" or "latest" or "broadcast",
+                "size": int,
+                "policy": "block" or "drop_oldest" or "drop_newest" or "latest",
+                "timeout_ms": number,
+                "subscribers": {"routine_name": "drop_oldest" or "latest" or "block"}
+              }}],
               "routines": {
                 "routine_name": {
                   "routine_type_name": str,
@@ -298,7 +319,21 @@ class PipelineManager:
         component_validator = {
             "type": "object",
             "properties": {
-                "queues": {"type": "array", "items": {"type": "string"}},
+                "queues": {"type": "array", "items": {"anyOf": [
+                    {"type": "string"},
+                    {"type": "object", "minProperties": 1, "maxProperties": 1,
+                     "additionalProperties": {
+                         "type": "object",
+                         "properties": {
+                             "type": {"enum": ["queue", "spsc", "latest", "broadcast"]},
+                             "size": {"type": "integer", "minimum": 1},
+                             "policy": {"enum": ["block", "drop_oldest", "drop_newest", "latest"]},
+                             "timeout_ms": {"type": "number", "minimum": 0},
+                             "subscribers": {"type": "object", "additionalProperties": {
+                                 "enum": ["drop_oldest", "latest", "block"]}}
+                         }
+                     }}
+                ]}},
                 "routines": {"type": "object"}
             },
             "required": ["queues", "routines"]
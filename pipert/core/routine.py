@@ -1,5 +1,10 @@
+import asyncio
+import contextlib
+import copy
+import functools
 import time
 from abc import ABC, abstractmethod
+from queue import Empty, Full
 from collections import defaultdict
 from enum import Enum
 import threading
@@ -9,7 +14,22 @@ if os.environ.get('TORCHVISION', 'no') == 'yes':
 else:
     import multiprocessing as mp
 from .errors import NoRunnerException
+from .event_loop import EventLoopThread, AsyncioRunner
+from .cpu_budget import apply_thread_budget
 from .metrics_collector import NullCollector
+from .shared_memory_pool import owned_name
+from .time_breakdown import TimeBreakdown, TimedSection
+from .utlis.queue_handler import wait_any_not_empty, put_latest, add_listener, remove_listener
+from .utlis.reorder_buffer import ReorderBuffer, ReplicaLink, OrderedInputQueue, OrderedOutputQueue
+
+
+_NO_SECTION = contextlib.nullcontext()
+
+
+async def _maybe_await(result):
+    if asyncio.iscoroutine(result):
+        return await result
+    return result
 
 
 class Events(Enum):
@@ -29,7 +49,68 @@ class State(object):
     def __init__(self):
         self.count = 0
         self.success = 0
+        self.shed = 0
         self.output = None
+        # the monotonic time the next iteration may start, set by the pace
+        # extension and waited for by the run loop
+        self.resume_at = None
+
+
+class Pacer(object):
+    """
+    Computes when the iterations of a paced routine should start.
+
+    Iterations are scheduled one period apart. When an iteration ends after
+    the next one should have started, the next iteration starts right away
+    and the policy decides how the schedule goes on:
+
+    - drop: give up the missed iterations but stay on the original schedule.
+    - burst: run the missed iterations back to back until caught up.
+    - skip-to-latest: restart the schedule from now.
+    """
+    POLICIES = ("drop", "burst", "skip-to-latest")
+
+    def __init__(self, fps, policy="drop"):
+        if policy not in self.POLICIES:
+            raise ValueError("Pacing policy {} is not one of {}".format(policy, self.POLICIES))
+        self.policy = policy
+        self.period = None
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        """
+        Sets the pace to fps. A rate that is not positive, like the 0 of a
+        video file without a frame rate, keeps the previous pace.
+
+        Returns:
+            True if the pace was changed
+        """
+        if fps is None or fps <= 0:
+            if self.period is None:
+                raise ValueError("Pacing fps must be positive, got {}".format(fps))
+            return False
+        self.period = 1 / fps
+        return True
+
+    def next_start(self, scheduled_start, now):
+        """
+        Args:
+            scheduled_start: the time the last iteration was scheduled to start.
+            now: the current time, on the same monotonic clock.
+
+        Returns:
+            The time the next iteration is scheduled to start, which may have
+            passed already, and the number of deadlines that were missed.
+        """
+        next_start = scheduled_start + self.period
+        if now <= next_start:
+            return next_start, 0
+        if self.policy == "burst":
+            return next_start, 1
+        if self.policy == "drop":
+            missed = int((now - next_start) // self.period) + 1
+            return next_start + (missed - 1) * self.period, missed
+        return now, 1
 
 
 class RoutineTypes(Enum):
@@ -46,7 +127,8 @@ class Routine(ABC):
     routine_type = RoutineTypes.NO_TYPE
 
     def __init__(self, logger, name="", component_name="",
-                 extensions=None, metrics_collector=NullCollector(), *args, **kwargs):
+                 extensions=None, metrics_collector=NullCollector(),
+                 wait_for_input=True, wakeup_interval=0.1, max_age_ms=None, *args, **kwargs):
 
         self.name = name
 
@@ -55,15 +137,38 @@ class Routine(ABC):
         self.metrics_collector = metrics_collector
         self.use_memory = False
         self.generator = None
+        # the Redis connection pools of the component, see RedisConnectionPools
+        self.redis_pools = None
         self.stop_event: mp.Event = None
         self._event_handlers = defaultdict(list)
+        # the handlers of every event compiled into a tuple of calls that
+        # take no arguments, rebuilt whenever handlers are added or removed
+        self._event_handler_calls = {}
         self.state = None
         self._allowed_events = []
         self.register_events(*Events)
         self.runner = None
+        self.runners = []
         self.runner_creator = None
         self.runner_creator_kwargs = {}
+        # number of workers sharing the routine's queues and the index of
+        # this worker among them
+        self.replicas = 1
+        self.replica_index = 0
+        self.ordered = False
+        self._replica_link = None
+        self.pacer = None
+        self.time_breakdown = None
         self.logger = logger
+        # block on the input queues instead of polling main_logic, waking up
+        # every wakeup_interval seconds to check the stop event
+        self.wait_for_input = wait_for_input
+        self.wakeup_interval = wakeup_interval
+        # messages older than this are dropped before they are processed
+        self.max_age_ms = max_age_ms
+        # the threads and affinity given to the routine by the component's
+        # cpu budget, applied in the routine's own thread when it starts
+        self.cpu_budget = None
         self._setup_extensions(extensions=extensions)
 
     def _setup_extensions(self, extensions):
@@ -166,6 +271,7 @@ class Routine(ABC):
         # in order to guarantee an execution order of the handlers.
         self._event_handlers[event_name] = \
             sorted(self._event_handlers[event_name], key=lambda x: x[0])
+        self._compile_event_handlers(event_name)
         self.logger.debug("added handler for event %s.", event_name)
 
     def has_event_handler(self, handler, event_name=None):
@@ -210,6 +316,22 @@ class Routine(ABC):
             raise ValueError("Input handler '{}' is not found among registered"
                              " event handlers".format(handler))
         self._event_handlers[event_name] = new_event_handlers
+        self._compile_event_handlers(event_name)
+
+    def _compile_event_handlers(self, event_name):
+        """
+        Binds every handler of `event_name` to the routine and its arguments
+        so firing the event is a plain sequence of calls.
+
+        Args:
+            event_name: the event whose handlers changed.
+        """
+        calls = tuple(functools.partial(func, self, *args, **kwargs)
+                      for _, (func, args, kwargs) in self._event_handlers[event_name])
+        if calls:
+            self._event_handler_calls[event_name] = calls
+        else:
+            self._event_handler_calls.pop(event_name, None)
 
     def _extension_log_fps(self, fps_time_interval):
         """
@@ -237,27 +359,38 @@ class Routine(ABC):
                                time_interval=fps_time_interval,
                                first=True)
 
-    def _extension_pace(self, fps):
+    def _extension_pace(self, fps, policy="drop"):
         """
-        Pace the routine to work at a wanted fps
+        Pace the routine to work at a wanted fps.
+        Iterations are scheduled against absolute deadlines on a monotonic
+        clock so timing errors do not accumulate, and missed deadlines are
+        reported to the metrics collector.
 
         Args:
             fps: The wanted fps for the routine
+            policy: What to do when an iteration overruns its deadline, one
+            of the policies of :class:`Pacer`
         """
-        def start_time(routine: Routine):
-            routine.state.start_time = time.time()
-
-        def start_pacing(routine: Routine, required_fps=0):
-            elapsed_time = (time.time() - routine.state.start_time)
-            excess_time = (1 / required_fps) - elapsed_time
-            if excess_time > 0:
-                time.sleep(excess_time)
-
-        self.add_event_handler(Events.BEFORE_LOGIC, start_time, first=True)
-        self.add_event_handler(Events.AFTER_LOGIC,
-                               start_pacing,
-                               last=True,
-                               required_fps=fps)
+        self.pacer = Pacer(fps, policy)
+
+        def start_schedule(routine: Routine):
+            if getattr(routine.state, "scheduled_start", None) is None:
+                routine.state.scheduled_start = time.monotonic()
+                routine.state.missed_deadlines = 0
+
+        def keep_pace(routine: Routine):
+            now = time.monotonic()
+            next_start, missed = routine.pacer.next_start(routine.state.scheduled_start, now)
+            routine.state.scheduled_start = next_start
+            if missed:
+                routine.state.missed_deadlines += missed
+                routine.metrics_collector.collect_missed_deadlines(missed, routine.name, routine.component_name)
+            # the run loop waits, so an asyncio routine does not block the
+            # event loop it shares
+            routine.state.resume_at = next_start
+
+        self.add_event_handler(Events.BEFORE_LOGIC, start_schedule, first=True)
+        self.add_event_handler(Events.AFTER_LOGIC, keep_pace, last=True)
 
     def on(self, event_name, *args, **kwargs):
         """
@@ -296,11 +429,15 @@ class Routine(ABC):
             all handlers.
 
         """
-        if event_name in self._allowed_events:
-            # self.logger.debug("firing handlers for event %s ", event_name)
-            for p, (func, args, kwargs) in self._event_handlers[event_name]:
-                kwargs.update(event_kwargs)
-                func(self, *(event_args + args), **kwargs)
+        calls = self._event_handler_calls.get(event_name)
+        if calls is None:
+            return
+        if not (event_args or event_kwargs):
+            for call in calls:
+                call()
+            return
+        for _, (func, args, kwargs) in self._event_handlers[event_name]:
+            func(self, *(event_args + args), **{**kwargs, **event_kwargs})
 
     @abstractmethod
     def main_logic(self, *args, **kwargs):
@@ -314,6 +451,58 @@ class Routine(ABC):
     def cleanup(self, *args, **kwargs):
         raise NotImplementedError
 
+    def shed_stale(self, msg):
+        """
+        Checks whether a message is older than the routine's max_age_ms,
+        measured from the first entry recorded in its history. Stale
+        messages are counted so they can be dropped before processing.
+
+        Args:
+            msg: the message taken from an input queue.
+
+        Returns:
+            True if the message is stale and should be dropped.
+        """
+        if self.max_age_ms is None:
+            return False
+        age = msg.get_age()
+        if age is None or age * 1000 <= self.max_age_ms:
+            return False
+        self.state.shed += 1
+        self.metrics_collector.collect_shed_messages(1, self.name, self.component_name)
+        return True
+
+    def get_input_queues(self):
+        """
+           Returns the queues the routine reads from, as declared by the
+           'QueueIn' entries of get_constructor_parameters.
+        """
+        parameters = self.get_constructor_parameters() or {}
+        return [getattr(self, name) for name, type_name in parameters.items()
+                if type_name == "QueueIn" and getattr(self, name, None) is not None]
+
+    def get_output_queues(self):
+        """
+           Returns the queues the routine writes to, as declared by the
+           'QueueOut' entries of get_constructor_parameters.
+        """
+        parameters = self.get_constructor_parameters() or {}
+        return [getattr(self, name) for name, type_name in parameters.items()
+                if type_name == "QueueOut" and getattr(self, name, None) is not None]
+
+    def _wait_for_input(self, input_queues):
+        """
+        Blocks until one of the input queues holds an item.
+
+        Args:
+            input_queues: the queues the routine reads from.
+
+        Returns:
+            True if an item is available, False if the wakeup interval passed
+            without any input.
+        """
+        return wait_any_not_empty(input_queues, self.wakeup_interval)
+
     # TODO - replace plain 'setup()' and 'cleanup()' with context manager
     def _extended_run(self):
         """
@@ -321,27 +510,284 @@ class Routine(ABC):
         Returns:
 
         """
+        if self.is_async():
+            # an asyncio routine that was given a thread or a process of its
+            # own runs on a private event loop
+            asyncio.run(self._extended_run_async())
+            return
         self.state = State()
+        in_own_process = self.runner_creator is mp.Process
+        if in_own_process and self.generator is not None:
+            # the component's shared memory generator names its memories by
+            # a counter that is not shared between processes
+            self.generator = type(self.generator)("{0}_{1}".format(owned_name(self.component_name), self.name),
+                                                  slot_size=self.generator.slot_size)
+        if in_own_process and self.redis_pools is not None:
+            # connections cannot be shared between processes
+            self.redis_pools = type(self.redis_pools)()
+        self._apply_cpu_budget()
         # TODO - how to pass different args to setup/cleanup/main_logic?
         self.setup()
+        input_queues = self.get_input_queues() if self.wait_for_input else []
         # TODO - maybe add _fire_event before and after the while loop?
+        if self.time_breakdown is not None:
+            self._run_instrumented(input_queues)
+        else:
+            while not self.stop_event.is_set():
+                if input_queues and not self._wait_for_input(input_queues):
+                    continue
+                self._fire_event(Events.BEFORE_LOGIC)
+                self._run_main_logic()
+                self._fire_event(Events.AFTER_LOGIC)
+                self._wait_for_pace()
+
+        self.cleanup()
+        if in_own_process and self.generator is not None:
+            self.generator.cleanup()
+        if in_own_process and self.redis_pools is not None:
+            self.redis_pools.disconnect()
+
+    def _apply_cpu_budget(self):
+        if self.cpu_budget is None:
+            return
+        effective = apply_thread_budget(**self.cpu_budget)
+        self.logger.info(f"CPU budget applied: {effective}")
+        self.metrics_collector.collect_cpu_budget(effective, self.name, self.component_name)
+
+    async def _extended_run_async(self):
+        """
+        The run loop of an asyncio routine. Yields to the event loop after
+        every iteration so routines sharing the loop take turns.
+        """
+        self.state = State()
+        # on the event loop thread shared by the component, the affinity is
+        # shared by its routines too
+        self._apply_cpu_budget()
+        await _maybe_await(self.setup())
+        input_queues = self.get_input_queues() if self.wait_for_input else []
+        if self.time_breakdown is not None:
+            await self._run_instrumented_async(input_queues)
+        else:
+            while not self.stop_event.is_set():
+                if input_queues and not await self._wait_for_input_async(input_queues):
+                    continue
+                self._fire_event(Events.BEFORE_LOGIC)
+                await self._run_main_logic_async()
+                self._fire_event(Events.AFTER_LOGIC)
+                await self._wait_for_pace_async()
+                await asyncio.sleep(0)
+
+        await _maybe_await(self.cleanup())
+
+    async def _wait_for_input_async(self, input_queues):
+        """
+        Waits without blocking the event loop until one of the input queues
+        holds an item. The queues' listeners wake the loop up, queues without
+        listeners are waited on in the loop's executor.
+
+        Returns:
+            True if an item is available, False if the wakeup interval passed
+            without any input.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def listener():
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # the loop was closed after the wait ended
+                pass
+
+        listened = [q for q in input_queues if add_listener(q, listener)]
+        try:
+            if len(listened) < len(input_queues):
+                return await loop.run_in_executor(None, wait_any_not_empty, input_queues, self.wakeup_interval)
+            if all(q.empty() for q in input_queues):
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.wakeup_interval)
+                except asyncio.TimeoutError:
+                    pass
+            return not all(q.empty() for q in input_queues)
+        finally:
+            for q in listened:
+                remove_listener(q, listener)
+
+    def _run_main_logic(self):
+        tick = time.time()
+        try:
+            self.state.output = self.main_logic()
+        except Exception as error:
+            self.logger.exception("The routine has crashed: " + str(error))
+            self.state.output = False
+        self.state.count += 1
+        tock = time.time()
+        if self._replica_link is not None:
+            with self.section("put"):
+                self._replica_link.flush()
+
+        if self.state.output:
+            self._record_execution_time(tock - tick)
+            self.state.success += 1
+
+    async def _run_main_logic_async(self):
+        tick = time.time()
+        try:
+            self.state.output = await self.main_logic()
+        except Exception as error:
+            self.logger.exception("The routine has crashed: " + str(error))
+            self.state.output = False
+        self.state.count += 1
+        tock = time.time()
+
+        if self.state.output:
+            self._record_execution_time(tock - tick)
+            self.state.success += 1
+
+    def _pace_delay(self):
+        """
+        Returns the seconds left until the next iteration of a paced routine
+        may start.
+        """
+        resume_at, self.state.resume_at = self.state.resume_at, None
+        return 0 if resume_at is None else resume_at - time.monotonic()
+
+    def _wait_for_pace(self):
+        delay = self._pace_delay()
+        if delay > 0:
+            with self.section("wait"):
+                time.sleep(delay)
+
+    async def _wait_for_pace_async(self):
+        delay = self._pace_delay()
+        if delay > 0:
+            with self.section("wait"):
+                await asyncio.sleep(delay)
+
+    def _run_instrumented(self, input_queues):
+        """
+        The run loop of a routine with the time_breakdown extension. Splits
+        every iteration into sections and adds them to the routine's
+        TimeBreakdown.
+        """
         while not self.stop_event.is_set():
+            self.state.sections = {}
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            if input_queues and not self._wait_for_input(input_queues):
+                self._add_idle_iteration(start, cpu_start)
+                continue
+            waited = time.perf_counter()
+
             self._fire_event(Events.BEFORE_LOGIC)
-            tick = time.time()
-            try:
-                self.state.output = self.main_logic()
-            except Exception as error:
-                self.logger.exception("The routine has crashed: " + str(error))
-                self.state.output = False
-            self.state.count += 1
-            tock = time.time()
-
-            if self.state.output:
-                self.metrics_collector.collect_execution_time(tock - tick, self.name, self.component_name)
-                self.state.success += 1
+            logic_start = self._mark_sections()
+            self._run_main_logic()
+            logic_end = self._mark_sections()
             self._fire_event(Events.AFTER_LOGIC)
+            self._wait_for_pace()
+            self._add_iteration(start, waited, logic_start, logic_end, cpu_start)
 
-        self.cleanup()
+    async def _run_instrumented_async(self, input_queues):
+        """
+        The run loop of an asyncio routine with the time_breakdown extension.
+        On an event loop shared with other routines, the CPU time of an
+        iteration also holds the tasks that ran while main_logic awaited.
+        """
+        while not self.stop_event.is_set():
+            self.state.sections = {}
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            if input_queues and not await self._wait_for_input_async(input_queues):
+                self._add_idle_iteration(start, cpu_start)
+                continue
+            waited = time.perf_counter()
+
+            self._fire_event(Events.BEFORE_LOGIC)
+            logic_start = self._mark_sections()
+            await self._run_main_logic_async()
+            logic_end = self._mark_sections()
+            self._fire_event(Events.AFTER_LOGIC)
+            await self._wait_for_pace_async()
+            self._add_iteration(start, waited, logic_start, logic_end, cpu_start)
+            await asyncio.sleep(0)
+
+    def _mark_sections(self):
+        """
+        Returns the current time along with the time of the sections
+        recorded so far in the iteration.
+        """
+        return time.perf_counter(), sum(self.state.sections.values())
+
+    def _add_idle_iteration(self, start, cpu_start):
+        # the wakeup interval passed without input
+        wall_time = time.perf_counter() - start
+        self.time_breakdown.add({"wait": wall_time}, wall_time, time.thread_time() - cpu_start, iterations=0)
+
+    def _add_iteration(self, start, waited, logic_start_mark, logic_end_mark, cpu_start):
+        """
+        Adds an iteration to the routine's TimeBreakdown. The time outside
+        main_logic that no section took is counted as handler time.
+
+        Args:
+            start: when the iteration started to wait for input.
+            waited: when the input arrived.
+            logic_start_mark: the mark taken before main_logic.
+            logic_end_mark: the mark taken after main_logic.
+            cpu_start: the thread time at the start of the iteration.
+        """
+        breakdown, sections = self.time_breakdown, self.state.sections
+        end = time.perf_counter()
+        logic_start, before_sections = logic_start_mark
+        logic_end, logic_sections = logic_end_mark
+        handler_time = (logic_start - waited) + (end - logic_end) \
+            - (sum(sections.values()) - logic_sections) - before_sections
+        logic_time = (logic_end - logic_start) - (logic_sections - before_sections)
+        sections["handler"] = handler_time
+        # an iteration without output was an empty poll
+        logic_section = "logic" if self.state.output else "wait"
+        sections[logic_section] = sections.get(logic_section, 0.) + logic_time
+        sections["wait"] = sections.get("wait", 0.) + waited - start
+        breakdown.add(sections, end - start, time.thread_time() - cpu_start)
+
+        report = breakdown.report_if_due()
+        if report is not None:
+            self.metrics_collector.collect_time_breakdown(report, self.name, self.component_name)
+
+    def section(self, name):
+        """
+        Returns a context manager that times a section of the routine's
+        iteration, such as "decode", "encode" or "put", when the
+        time_breakdown extension is enabled.
+
+        Args:
+            name: the name of the section.
+        """
+        if self.time_breakdown is None:
+            return _NO_SECTION
+        return TimedSection(self.state.sections, name)
+
+    def _extension_time_breakdown(self, report_interval=5.):
+        """
+        Split every iteration of the routine into the time spent waiting,
+        decoding, in the logic itself, encoding, putting the output and in
+        event handlers, and track its utilization.
+
+        Args:
+            report_interval: Interval time between each report to the metrics
+            collector.
+        """
+        self.time_breakdown = TimeBreakdown(report_interval)
+
+    def _record_execution_time(self, execution_time):
+        """
+        Reports the execution time of a successful main_logic call.
+
+        Args:
+            execution_time: the time it took main_logic to run, in seconds.
+        """
+        if self.replicas > 1:
+            self.metrics_collector.collect_replica_execution_time(execution_time, self.name,
+                                                                  self.component_name, self.replica_index)
+        else:
+            self.metrics_collector.collect_execution_time(execution_time, self.name, self.component_name)
 
     def as_thread(self):
         self.runner_creator = threading.Thread
@@ -353,12 +799,101 @@ class Routine(ABC):
         self.runner_creator_kwargs = {"target": self._extended_run}
         return self
 
+    def as_asyncio(self, event_loop_thread=None):
+        """
+        Run the routine as a task on an asyncio event loop. Routines that
+        implement main_logic as a coroutine (async def) should use this mode.
+        All the asyncio routines of a component share one event loop thread,
+        so main_logic, setup, cleanup and the event handlers must not block.
+
+        Args:
+            event_loop_thread: the EventLoopThread to run on, the component
+            sets its own when the routine is registered.
+        """
+        self.runner_creator = AsyncioRunner
+        self.runner_creator_kwargs = {"target": self._extended_run_async,
+                                      "event_loop_thread": event_loop_thread or EventLoopThread()}
+        return self
+
+    def is_async(self):
+        """
+           Returns True if the routine implements main_logic as a coroutine.
+        """
+        return asyncio.iscoroutinefunction(self.main_logic)
+
+    def as_thread_pool(self, replicas, ordered=False):
+        """
+        Run the routine as several threads that share the same queues.
+
+        Args:
+            replicas: the number of threads.
+            ordered: if True, the outputs are put on the output queues in the
+            order their inputs were taken from the input queues.
+        """
+        self.as_thread()
+        self.replicas = replicas
+        self.ordered = ordered
+        return self
+
+    def as_process_pool(self, replicas):
+        """
+        Run the routine as several processes that share the same queues.
+
+        Args:
+            replicas: the number of processes.
+        """
+        self.as_process()
+        self.replicas = replicas
+        self.ordered = False
+        return self
+
+    def _create_replicas(self):
+        """
+        Creates a shallow copy of the routine for every replica, each with its
+        own state. Ordered replicas get their queues wrapped so their outputs
+        go through a shared reorder buffer.
+        """
+        reorder_buffer = ReorderBuffer(self.stop_event, self.wakeup_interval) if self.ordered else None
+        parameters = self.get_constructor_parameters() or {}
+        replicas = []
+        for index in range(self.replicas):
+            replica = copy.copy(self)
+            replica.replica_index = index
+            replica._event_handlers = defaultdict(list, self._event_handlers)
+            replica._event_handler_calls = {}
+            for event_name in replica._event_handlers:
+                replica._compile_event_handlers(event_name)
+            if reorder_buffer is not None:
+                replica._replica_link = ReplicaLink(reorder_buffer)
+                for name, type_name in parameters.items():
+                    if type_name == "QueueIn":
+                        setattr(replica, name, OrderedInputQueue(getattr(self, name), replica._replica_link))
+                    elif type_name == "QueueOut":
+                        setattr(replica, name, OrderedOutputQueue(getattr(self, name), replica._replica_link))
+            replicas.append(replica)
+        return replicas
+
     def start(self):
         if self.runner_creator is None:
             # TODO - create better errors
             raise NoRunnerException("Runner not configured for routine")
-        self.runner = self.runner_creator(**self.runner_creator_kwargs)
-        self.runner.start()
+        if self.replicas > 1:
+            target_name = self.runner_creator_kwargs["target"].__name__
+            self.runners = [self.runner_creator(**dict(self.runner_creator_kwargs,
+                                                       target=getattr(replica, target_name)))
+                            for replica in self._create_replicas()]
+        else:
+            self.runners = [self.runner_creator(**self.runner_creator_kwargs)]
+        self.runner = self.runners[0]
+        for runner in self.runners:
+            runner.start()
+
+    def join(self):
+        """
+        Waits for all the runners of the routine to finish.
+        """
+        for runner in self.runners:
+            runner.join()
 
     @staticmethod
     @abstractmethod
@@ -393,3 +928,112 @@ class Routine(ABC):
         for key in parameters_dictionary_with_routine_params.keys():
             parameters_dictionary_with_routine_params[key] = parameters_dictionary_with_all_params[key]
         return parameters_dictionary_with_routine_params
+
+
+class BatchRoutine(Routine):
+    """
+    A routine that processes its input in micro-batches.
+
+    Messages are collected from `in_queue` until `max_batch` of them were
+    gathered or `max_wait_ms` passed since the first one arrived. The batch is
+    then handed to :meth:`main_logic_batch` and its results are put on
+    `out_queue` in the order of the input messages. When `drop_oldest` is set
+    a full `out_queue` drops its oldest result instead of holding up the
+    routine.
+    """
+
+    def __init__(self, in_queue, out_queue, max_batch=8, max_wait_ms=10, drop_oldest=False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.drop_oldest = drop_oldest
+
+    @abstractmethod
+    def main_logic_batch(self, msgs):
+        """
+        Processes a batch of messages.
+
+        Args:
+            msgs: the list of messages taken from the input queue.
+
+        Returns:
+            A list with one result per input message, in the same order.
+            Results that are None are not put on the output queue.
+        """
+        raise NotImplementedError
+
+    def main_logic(self, *args, **kwargs):
+        batch = self._collect_batch()
+        if not batch:
+            return False
+
+        tick = time.time()
+        results = self.main_logic_batch(batch)
+        self.state.batch_time = time.time() - tick
+        self.state.batch_size = len(batch)
+
+        with self.section("put"):
+            for result in results:
+                if result is not None:
+                    self._put_result(result)
+        return True
+
+    def _collect_batch(self):
+        batch = []
+        deadline = None
+        while len(batch) < self.max_batch:
+            try:
+                if deadline is None:
+                    msg = self.in_queue.get(block=False)
+                    deadline = time.time() + self.max_wait_ms / 1000
+                else:
+                    remaining = deadline - time.time()
+                    if remaining > 0:
+                        msg = self.in_queue.get(timeout=remaining)
+                    else:
+                        msg = self.in_queue.get(block=False)
+            except Empty:
+                break
+            if not self.shed_stale(msg):
+                batch.append(msg)
+        return batch
+
+    def _put_result(self, result):
+        if self.drop_oldest:
+            if put_latest(self.out_queue, result):
+                self.state.dropped = getattr(self.state, "dropped", 0) + 1
+            return True
+        # block until the result fits so batch results are never reordered,
+        # but keep checking the stop event so shutdown is not held up
+        while not self.stop_event.is_set():
+            try:
+                self.out_queue.put(result, timeout=self.wakeup_interval)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _record_execution_time(self, execution_time):
+        batch_time, batch_size = self.state.batch_time, self.state.batch_size
+        self.metrics_collector.collect_batch_execution_time(batch_time, batch_size,
+                                                            self.name, self.component_name)
+        item_time = batch_time / batch_size
+        for _ in range(batch_size):
+            super()._record_execution_time(item_time)
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn",
+            "out_queue": "QueueOut",
+            "max_batch": "Integer",
+            "max_wait_ms": "Integer",
+            "drop_oldest": "Boolean",
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return (self.in_queue == queue) or (self.out_queue == queue)
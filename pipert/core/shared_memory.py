@@ -1,6 +1,13 @@
+import collections
 import mmap
+import threading
+import weakref
+
+import numpy as np
 import posix_ipc
 
+from pipert.core.shared_memory_pool import SharedMemoryPool
+
 
 class MemoryIdGenerator:
     """
@@ -43,6 +50,15 @@ class SharedMemory:
     def acquire_semaphore(self):
         self.semaphore.acquire()
 
+    def write_array(self, array):
+        """
+        writes the array given to it straight into the shared memory object,
+        without converting it to bytes first.
+        Params:
+            -array: A numpy array that fits in the shared memory.
+        """
+        np.ndarray(array.shape, array.dtype, buffer=self.mapfile)[...] = array
+
     def write_to_memory(self, b):
         """
         writes the frame given to it to the shared memory object.
@@ -88,16 +104,67 @@ def get_shared_memory_object(name):
     return SharedMemory(memory, semaphore, mapfile)
 
 
+# the number of mappings of every shared memory that are still referenced by
+# frames read from it
+_live_mappings = collections.Counter()
+_live_mappings_lock = threading.Lock()
+
+
+def map_shared_memory(name):
+    """
+    Returns a read-only buffer over the shared memory with the name given, or
+    None if there is no such memory. Numpy views of the buffer keep the
+    mapping alive, so they stay valid after the memory is deleted, and the
+    mapping is released with the last of them.
+    Params:
+        -name: The name of a shared memory.
+    """
+    try:
+        memory = posix_ipc.SharedMemory(name)
+    except posix_ipc.ExistentialError:
+        return None
+    try:
+        mapfile = mmap.mmap(memory.fd, memory.size, prot=mmap.PROT_READ)
+    finally:
+        memory.close_fd()
+    with _live_mappings_lock:
+        _live_mappings[name] += 1
+    weakref.finalize(mapfile, _release_mapping, name)
+    return mapfile
+
+
+def _release_mapping(name):
+    with _live_mappings_lock:
+        _live_mappings[name] -= 1
+        if not _live_mappings[name]:
+            del _live_mappings[name]
+
+
+def get_live_mappings():
+    """
+    Returns the number of mappings of every shared memory that frames still
+    reference, by the name of the memory.
+    """
+    with _live_mappings_lock:
+        return dict(_live_mappings)
+
+
 class SharedMemoryGenerator:
     """
     Generates a new shared memory each time get_next_shared_memory is called
     and is responsible for cleaning up shared memories if the count that
     exists now exceeds the max or the proccess has ended.
     """
-    def __init__(self, component_name, max_count=50):
+    def __init__(self, component_name, max_count=50, slot_size=None):
         self.memory_id_gen = MemoryIdGenerator(component_name, max_count)
         self.max_count = max_count
         self.shared_memories = {}
+        # the bytes of a slot of the pool, None sizes the slots by the first
+        # frame
+        self.slot_size = slot_size
+        # the slots the frames are written to, created by the first write
+        self.pool = None
+        self._pool_lock = threading.Lock()
 
     def get_next_shared_memory(self, size=5000000):
         next_name, name_to_unlink = self.memory_id_gen.get_next()
@@ -120,7 +187,29 @@ class SharedMemoryGenerator:
 
         return next_name
 
+    def write_to_pool(self, data):
+        """
+        Writes a frame into the pool of the component, which is created with
+        max_count slots of slot_size bytes, or the size of the first frame.
+        Returns the SharedMemorySlot of the frame, or None if the frame does
+        not fit in a slot.
+        """
+        pool = self.pool
+        if pool is None:
+            # routine threads share the generator, only one of them creates
+            # the pool
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = SharedMemoryPool("{0}_pool".format(self.memory_id_gen.component_name),
+                                                 self.slot_size or data.nbytes, self.max_count)
+                pool = self.pool
+        return pool.write(data)
+
     def cleanup(self):
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.cleanup()
+                self.pool = None
         for _ in range(self.max_count):
             _, name_to_unlink = self.memory_id_gen.get_next()
             if name_to_unlink:
@@ -130,3 +219,44 @@ class SharedMemoryGenerator:
     def _destroy_memory(self, name_to_unlink):
         self.shared_memories[name_to_unlink].free_memory()
         self.shared_memories.pop(name_to_unlink)
+
+
+class HandoffSharedMemoryGenerator:
+    """
+    Generates a new shared memory each time get_next_shared_memory is called
+    without keeping track of it. The memory is handed off to whoever reads
+    it, the reader is responsible for deleting it with unlink_shared_memory.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.name_count = 0
+
+    def get_next_shared_memory(self, size=5000000):
+        next_name = "{0}_{1}".format(self.prefix, self.name_count)
+        self.name_count += 1
+
+        memory = posix_ipc.SharedMemory(next_name, posix_ipc.O_CREAT,
+                                        size=size)
+        memory.close_fd()
+        semaphore = posix_ipc.Semaphore(next_name, posix_ipc.O_CREAT)
+        semaphore.release()
+        semaphore.close()
+
+        return next_name
+
+
+def unlink_shared_memory(name):
+    """
+    Deletes the shared memory and the semaphore with the name given, if
+    they exist.
+    Params:
+        -name: The name of a shared memory.
+    """
+    try:
+        posix_ipc.unlink_shared_memory(name)
+    except posix_ipc.ExistentialError:
+        pass
+    try:
+        posix_ipc.unlink_semaphore(name)
+    except posix_ipc.ExistentialError:
+        pass
@@ -0,0 +1,417 @@
+import collections
+import mmap
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import sys
+if sys.version_info.minor == 8:
+    from multiprocessing.shared_memory import SharedMemory
+else:
+    import posix_ipc
+
+# a reference to a frame written into a slot of a pool, the generation tells
+# whether the slot still holds the frame or was reused for a newer one
+SharedMemorySlot = collections.namedtuple("SharedMemorySlot", ["pool_name", "instance", "index",
+                                                               "generation", "size"])
+
+# the pool header holds its instance, slot size and slot count, every slot
+# header holds the generation and size of the frame in the slot, the last
+# generation a reader acknowledged and the time the frame was written. Both
+# are padded to a cache line. The number of readers holding the frame of a
+# slot is kept in a semaphore of the slot, which processes update atomically.
+_POOL_HEADER_SIZE = 64
+_SLOT_HEADER_SIZE = 64
+_GENERATION, _SIZE, _ACKED, _WRITTEN_AT = range(4)
+
+# where Linux keeps the shared memory segments and the posix_ipc semaphores
+SHM_DIR = "/dev/shm"
+
+# the shared memory counters of the process
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+STAT_NAMES = ("late_reads", "expired_leases", "pool_fallbacks", "orphans_removed", "leaked_bytes")
+
+
+def owned_name(component_name, pid=None):
+    """
+    Returns the name the shared memories a process of a component creates
+    start with. It holds the id of the process, so the janitor only removes
+    the memories of processes that are gone.
+    """
+    return "{0}_pid{1}".format(component_name, os.getpid() if pid is None else pid)
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # a process of another user
+        pass
+    return True
+
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def record_late_read():
+    """
+    Counts a frame that was already gone when a reader came to read it.
+    """
+    _count("late_reads")
+
+
+def get_shared_memory_stats():
+    """
+    Returns the shared memory counters of the process: the "late_reads" of
+    frames that were already gone, the "expired_leases" of slots reused
+    without being acknowledged, the "pool_fallbacks" of frames written to a
+    segment of their own because no slot was free, and the "orphans_removed"
+    by the janitor and their "leaked_bytes".
+    """
+    with _stats_lock:
+        return {stat: _stats[stat] for stat in STAT_NAMES}
+
+
+def _create_segment(name, size):
+    """
+    Creates the shared memory segment of a pool, replacing a segment that a
+    previous run left behind, and returns a writable buffer over it and the
+    object to keep for closing it.
+    """
+    if sys.version_info.minor == 8:
+        try:
+            memory = SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            SharedMemory(name=name).unlink()
+            memory = SharedMemory(name=name, create=True, size=size)
+        return memory.buf, memory
+    try:
+        memory = posix_ipc.SharedMemory(name, posix_ipc.O_CREX, size=size)
+    except posix_ipc.ExistentialError:
+        posix_ipc.unlink_shared_memory(name)
+        memory = posix_ipc.SharedMemory(name, posix_ipc.O_CREX, size=size)
+    mapfile = mmap.mmap(memory.fd, size)
+    memory.close_fd()
+    return mapfile, mapfile
+
+
+def _open_segment(name):
+    """
+    Returns a mapping of the segment of a pool, or None if there is no such
+    segment. Readers only write the acknowledgements to it.
+    """
+    if sys.version_info.minor == 8:
+        try:
+            memory = SharedMemory(name=name)
+        except FileNotFoundError:
+            return None
+        mapfile = mmap.mmap(memory._fd, memory.size)
+        memory.close()
+        return mapfile
+    try:
+        memory = posix_ipc.SharedMemory(name)
+    except posix_ipc.ExistentialError:
+        return None
+    try:
+        return mmap.mmap(memory.fd, memory.size)
+    finally:
+        memory.close_fd()
+
+
+def _unlink_segment(name):
+    if sys.version_info.minor == 8:
+        try:
+            SharedMemory(name=name).unlink()
+        except FileNotFoundError:
+            pass
+    else:
+        try:
+            posix_ipc.unlink_shared_memory(name)
+        except posix_ipc.ExistentialError:
+            pass
+
+
+def _reader_count_name(pool_name, index):
+    return "{0}_{1}".format(pool_name, index)
+
+
+def _take(semaphore):
+    try:
+        semaphore.acquire(0)
+        return True
+    except posix_ipc.BusyError:
+        return False
+
+
+def _drain(semaphore):
+    while _take(semaphore):
+        pass
+
+
+class SharedMemoryPool:
+    """
+    A single shared memory segment of slot_count slots of slot_size bytes,
+    created once and reused for the frames of a component, so writing a
+    frame makes no system calls. A frame is referenced by a SharedMemorySlot.
+
+    A written slot is leased to its readers: every reader counts itself in
+    the slot while it holds the frame and acknowledges the frame once it
+    released it, and the pool only reuses a slot that was acknowledged and
+    is held by no reader, or whose lease of lease_ttl seconds expired. A
+    reader that comes for a frame after its slot was reused reads nothing
+    instead of a newer frame. Frames that no reader takes, like the ones
+    skipped in a Redis stream, are reclaimed by the expiry, so a reader may
+    hold a frame for lease_ttl seconds. When no slot is free the frame does
+    not fit in the pool.
+
+    Without posix_ipc (Python 3.8) readers are not counted, so the first
+    acknowledgement frees the slot: a pool there has to have a single
+    reader, or its readers have to copy the frames.
+    """
+    # seconds a reader may hold a frame before its slot is reclaimed
+    LEASE_TTL = 2.
+
+    def __init__(self, name, slot_size, slot_count, lease_ttl=LEASE_TTL):
+        self.name = name
+        self.slot_size = slot_size
+        self.slot_count = slot_count
+        self.lease_ttl = lease_ttl
+        # tells apart pools that were created with the same name
+        self.instance = int.from_bytes(os.urandom(8), "little")
+        self._slot_stride = _SLOT_HEADER_SIZE + slot_size
+        self._buffer, self._memory = _create_segment(name, _POOL_HEADER_SIZE + slot_count * self._slot_stride)
+        np.ndarray((3,), np.uint64, buffer=self._buffer)[:] = (self.instance, slot_size, slot_count)
+        self._slot_headers = np.ndarray((slot_count, 4), np.uint64, buffer=self._buffer,
+                                        offset=_POOL_HEADER_SIZE, strides=(self._slot_stride, 8))
+        self._reader_counts = [None] * slot_count
+        if sys.version_info.minor != 8:
+            self._reader_counts = [posix_ipc.Semaphore(_reader_count_name(name, index), posix_ipc.O_CREAT)
+                                   for index in range(slot_count)]
+            # counts a previous pool with the same name left behind
+            for reader_count in self._reader_counts:
+                _drain(reader_count)
+        self._next_sequence = 0
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        """
+        Writes a contiguous array into the next free slot.
+
+        Returns:
+            the SharedMemorySlot of the frame, or None if it is larger than a
+            slot or every slot is still leased
+        """
+        if data.nbytes > self.slot_size:
+            return None
+        with self._lock:
+            index = self._take_free_slot()
+            if index is None:
+                _count("pool_fallbacks")
+                return None
+            self._next_sequence += 1
+            generation = self._next_sequence
+        header = self._slot_headers[index]
+        offset = _POOL_HEADER_SIZE + index * self._slot_stride + _SLOT_HEADER_SIZE
+        np.ndarray(data.shape, data.dtype, buffer=self._buffer, offset=offset)[...] = data
+        header[_SIZE] = data.nbytes
+        header[_WRITTEN_AT] = time.monotonic_ns()
+        header[_GENERATION] = generation
+        return SharedMemorySlot(self.name, self.instance, index, generation, data.nbytes)
+
+    def _take_free_slot(self):
+        """
+        Returns the index of the first free slot from the last one written,
+        marking it as being written, or None if every slot is leased.
+        Called with the lock held.
+        """
+        now = time.monotonic_ns()
+        for offset in range(self.slot_count):
+            index = (self._next_index + offset) % self.slot_count
+            header = self._slot_headers[index]
+            generation = int(header[_GENERATION])
+            expired = generation != 0 and now - int(header[_WRITTEN_AT]) >= self.lease_ttl * 1e9
+            if generation != 0 and not expired and (header[_ACKED] != generation or self._readers(index)):
+                continue
+            # readers of the previous frame in the slot see that it is gone
+            # before it is overwritten
+            header[_GENERATION] = 0
+            if expired:
+                _count("expired_leases")
+                if self._reader_counts[index] is not None:
+                    _drain(self._reader_counts[index])
+            elif generation != 0 and self._readers(index):
+                # a reader took the frame before it saw the slot was taken
+                header[_GENERATION] = generation
+                continue
+            self._next_index = index + 1
+            return index
+        return None
+
+    def _readers(self, index):
+        reader_count = self._reader_counts[index]
+        return 0 if reader_count is None else reader_count.value
+
+    def cleanup(self):
+        """
+        Deletes the segment of the pool, mappings that readers already have
+        stay valid.
+        """
+        self._slot_headers = None
+        self._buffer = None
+        self._memory.close()
+        self._memory = None
+        _unlink_segment(self.name)
+        for reader_count in self._reader_counts:
+            if reader_count is not None:
+                try:
+                    reader_count.unlink()
+                except posix_ipc.ExistentialError:
+                    pass
+                reader_count.close()
+        self._reader_counts = [None] * self.slot_count
+
+
+# the mapping of every pool this process read from, by the name of the pool
+_pool_mappings = {}
+# the reader counts of the slots this process read, by the name of the pool
+# and the index of the slot, with the instance of their pool
+_reader_counts = {}
+_pool_mappings_lock = threading.Lock()
+
+
+def _mapped_instance(mapping):
+    return np.frombuffer(mapping, np.uint64, count=1)[0]
+
+
+def _get_pool_mapping(pool_name, instance):
+    """
+    Returns the mapping of the pool with the name and instance, or None if
+    that pool is gone.
+    """
+    with _pool_mappings_lock:
+        mapping = _pool_mappings.get(pool_name)
+        if mapping is None or _mapped_instance(mapping) != instance:
+            # the pool was created again since it was mapped
+            mapping = _open_segment(pool_name)
+            if mapping is None:
+                _pool_mappings.pop(pool_name, None)
+                return None
+            _pool_mappings[pool_name] = mapping
+        return mapping if _mapped_instance(mapping) == instance else None
+
+
+def _slot_header(mapping, slot):
+    slot_size = int(np.frombuffer(mapping, np.uint64, count=1, offset=8)[0])
+    header_offset = _POOL_HEADER_SIZE + slot.index * (_SLOT_HEADER_SIZE + slot_size)
+    return np.ndarray((4,), np.uint64, buffer=mapping, offset=header_offset), header_offset + _SLOT_HEADER_SIZE
+
+
+def _get_reader_count(slot):
+    """
+    Returns the semaphore that counts the readers of a slot, or None if
+    readers are not counted.
+    """
+    if sys.version_info.minor == 8:
+        return None
+    key = (slot.pool_name, slot.index)
+    with _pool_mappings_lock:
+        instance, reader_count = _reader_counts.get(key, (None, None))
+        if instance != slot.instance:
+            try:
+                reader_count = posix_ipc.Semaphore(_reader_count_name(slot.pool_name, slot.index))
+            except posix_ipc.ExistentialError:
+                reader_count = None
+            _reader_counts[key] = (slot.instance, reader_count)
+        return reader_count
+
+
+def read_slot(slot):
+    """
+    Returns a read-only buffer over the frame in a slot, or None if the pool
+    is gone or the slot was already reused for a newer frame. The reader
+    holds the frame until it acknowledges it with acknowledge_slot, once it
+    released it.
+    """
+    mapping = _get_pool_mapping(slot.pool_name, slot.instance)
+    if mapping is None:
+        record_late_read()
+        return None
+    header, data_offset = _slot_header(mapping, slot)
+    if header[_GENERATION] != slot.generation:
+        record_late_read()
+        return None
+    reader_count = _get_reader_count(slot)
+    if reader_count is not None:
+        reader_count.release()
+        # the writer took the slot before it saw the reader
+        if header[_GENERATION] != slot.generation:
+            _take(reader_count)
+            record_late_read()
+            return None
+    return memoryview(mapping)[data_offset:data_offset + slot.size].toreadonly()
+
+
+def acknowledge_slot(slot):
+    """
+    Tells the pool a reader is done with the frame in a slot, so the slot
+    can be reused before its lease expires once no other reader holds it.
+    """
+    with _pool_mappings_lock:
+        mapping = _pool_mappings.get(slot.pool_name)
+        if mapping is None or _mapped_instance(mapping) != slot.instance:
+            return
+    header, _ = _slot_header(mapping, slot)
+    if header[_GENERATION] == slot.generation:
+        header[_ACKED] = slot.generation
+        reader_count = _get_reader_count(slot)
+        if reader_count is not None:
+            _take(reader_count)
+
+
+def remove_orphaned_segments(component_name, owners=None):
+    """
+    Deletes the shared memory segments and semaphores of a component that a
+    process which crashed or stopped left behind: the ones whose name starts
+    with the owned_name of a process that no longer exists. With owners,
+    only the memories of those processes are considered. Only supported on
+    Linux, where they are kept in /dev/shm.
+
+    Returns:
+        the number of segments removed and their total size in bytes
+    """
+    if not os.path.isdir(SHM_DIR):
+        return 0, 0
+    owner_pattern = re.compile(r"(?:sem\.)?{0}_pid(\d+)_".format(re.escape(component_name)))
+    removed = leaked_bytes = 0
+    for file_name in os.listdir(SHM_DIR):
+        match = owner_pattern.match(file_name)
+        if match is None:
+            continue
+        owner = int(match.group(1))
+        if (owners is not None and owner not in owners) or _process_exists(owner):
+            continue
+        if file_name.startswith("sem."):
+            if sys.version_info.minor != 8:
+                try:
+                    posix_ipc.unlink_semaphore(file_name[len("sem."):])
+                except posix_ipc.ExistentialError:
+                    pass
+        else:
+            try:
+                size = os.path.getsize(os.path.join(SHM_DIR, file_name))
+            except OSError:
+                continue
+            _unlink_segment(file_name)
+            removed += 1
+            leaked_bytes += size
+    _count("orphans_removed", removed)
+    _count("leaked_bytes", leaked_bytes)
+    return removed, leaked_bytes
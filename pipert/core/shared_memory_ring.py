@@ -0,0 +1,254 @@
+import os
+import threading
+
+import numpy as np
+try:
+    import posix_ipc
+except ImportError:
+    posix_ipc = None
+
+from pipert.core.shared_memory_pool import _create_segment, _open_segment, _unlink_segment
+
+# the ring header holds its slot size, slot count, the number of messages
+# written to it and whether it was closed, followed by the ids of the readers
+# to notify. Every slot header holds the sequence number of the message in
+# the slot and its length, both are padded to a cache line.
+_SLOT_SIZE, _SLOT_COUNT, _HEAD, _CLOSED = range(4)
+_RING_HEADER_SIZE = 64
+MAX_READERS = 16
+_READERS_SIZE = MAX_READERS * 8
+_SLOT_HEADER_SIZE = 64
+_SEQUENCE, _LENGTH = range(2)
+
+
+def ring_name(key):
+    """
+    Returns the name of the shared memory of the ring of a key.
+    """
+    return "pipert_ring_" + key.replace("/", "_")
+
+
+class SharedMemoryRing:
+    """
+    The last slot_count messages sent to a key, kept in a shared memory
+    segment so processes on the same host can read them without a broker.
+
+    A message is written into the slot of its sequence number under a lock
+    shared by every writer of the ring. Readers copy messages out of the
+    slots without locking: a slot holds the sequence number of its message,
+    which is 0 while it is written, so a reader that sees it change while it
+    copies knows the message was overwritten (a seqlock).
+
+    Readers that want to wait for messages register a semaphore of their
+    own, which the writer releases after every message. Without posix_ipc
+    readers cannot be notified and a ring can only have a single writing
+    process.
+    """
+
+    def __init__(self, name, mapping, memory=None):
+        self.name = name
+        self._mapping = mapping
+        self._memory = memory
+        self._header = np.ndarray((4,), np.uint64, buffer=mapping)
+        self._readers = np.ndarray((MAX_READERS,), np.uint64, buffer=mapping, offset=_RING_HEADER_SIZE)
+        self.slot_size = int(self._header[_SLOT_SIZE])
+        self.slot_count = int(self._header[_SLOT_COUNT])
+        self._slot_stride = _SLOT_HEADER_SIZE + self.slot_size
+        self._slots = np.ndarray((self.slot_count, 2), np.uint64, buffer=mapping,
+                                 offset=_RING_HEADER_SIZE + _READERS_SIZE, strides=(self._slot_stride, 8))
+        self._lock = _get_write_lock(name)
+        # the semaphores of the readers, by their id
+        self._reader_semaphores = {}
+
+    @classmethod
+    def create(cls, name, slot_size, slot_count):
+        """
+        Creates the ring, replacing a ring with the same name whose readers
+        are told it was closed.
+        """
+        old_ring = cls.open(name)
+        if old_ring is not None:
+            old_ring.close()
+        size = _RING_HEADER_SIZE + _READERS_SIZE + slot_count * (_SLOT_HEADER_SIZE + slot_size)
+        mapping, memory = _create_segment(name, size)
+        header = np.ndarray((2,), np.uint64, buffer=mapping)
+        header[_SLOT_SIZE] = slot_size
+        header[_SLOT_COUNT] = slot_count
+        return cls(name, mapping, memory)
+
+    @classmethod
+    def open(cls, name):
+        """
+        Returns the ring with the name, or None if there is no such ring.
+        """
+        mapping = _open_segment(name)
+        # the slot count is written last when the ring is created
+        if mapping is None or not np.frombuffer(mapping, np.uint64, count=1, offset=8)[0]:
+            return None
+        return cls(name, mapping)
+
+    @property
+    def head(self):
+        """
+        The number of messages that were written to the ring.
+        """
+        return int(self._header[_HEAD])
+
+    @property
+    def closed(self):
+        return bool(self._header[_CLOSED])
+
+    def write(self, data):
+        """
+        Writes a message into the slot after the last one written and
+        notifies the registered readers. data has to fit in a slot.
+        """
+        with self._lock:
+            sequence = int(self._header[_HEAD])
+            slot = self._slots[sequence % self.slot_count]
+            offset = self._slot_offset(sequence)
+            slot[_SEQUENCE] = 0
+            self._mapping[offset:offset + len(data)] = data
+            slot[_LENGTH] = len(data)
+            slot[_SEQUENCE] = sequence + 1
+            self._header[_HEAD] = sequence + 1
+        self._notify_readers()
+
+    def read(self, sequence):
+        """
+        Returns a copy of the message with the sequence number, or None if it
+        was already overwritten.
+        """
+        slot = self._slots[sequence % self.slot_count]
+        if slot[_SEQUENCE] != sequence + 1:
+            return None
+        offset = self._slot_offset(sequence)
+        data = bytes(self._mapping[offset:offset + int(slot[_LENGTH])])
+        # the writer started on a newer message while the message was copied
+        if slot[_SEQUENCE] != sequence + 1:
+            return None
+        return data
+
+    def _slot_offset(self, sequence):
+        return _RING_HEADER_SIZE + _READERS_SIZE + (sequence % self.slot_count) * self._slot_stride \
+            + _SLOT_HEADER_SIZE
+
+    def register_reader(self):
+        """
+        Returns the id of a new reader and the semaphore that is released
+        when a message is written, or None if readers cannot be notified or
+        the ring has as many readers as it can notify.
+        """
+        if posix_ipc is None:
+            return None
+        reader_id = int.from_bytes(os.urandom(8), "little") | 1
+        with self._lock:
+            free = np.flatnonzero(self._readers == 0)
+            if not len(free):
+                return None
+            semaphore = posix_ipc.Semaphore(_reader_semaphore_name(self.name, reader_id), posix_ipc.O_CREAT)
+            self._readers[free[0]] = reader_id
+        return reader_id, semaphore
+
+    def unregister_reader(self, reader_id, semaphore):
+        with self._lock:
+            self._readers[self._readers == reader_id] = 0
+        try:
+            semaphore.unlink()
+        except posix_ipc.ExistentialError:
+            pass
+        semaphore.close()
+
+    def wait(self, reader, timeout):
+        """
+        Waits up to timeout seconds for a message to be written, the reader
+        is the one returned by register_reader.
+        """
+        try:
+            reader[1].acquire(timeout)
+        except posix_ipc.BusyError:
+            pass
+
+    def _notify_readers(self):
+        for reader_id in self._readers[self._readers != 0].tolist():
+            semaphore = self._reader_semaphores.get(reader_id)
+            if semaphore is None:
+                try:
+                    semaphore = posix_ipc.Semaphore(_reader_semaphore_name(self.name, reader_id))
+                except posix_ipc.ExistentialError:
+                    # the reader is gone
+                    continue
+                self._reader_semaphores[reader_id] = semaphore
+            # a reader that did not wake up yet is not released twice
+            if not posix_ipc.SEMAPHORE_VALUE_SUPPORTED or semaphore.value == 0:
+                semaphore.release()
+
+    def close(self):
+        """
+        Tells the readers the ring was closed and deletes it, mappings that
+        readers already have stay valid.
+        """
+        self._header[_CLOSED] = 1
+        for semaphore in self._reader_semaphores.values():
+            semaphore.close()
+        self._reader_semaphores = {}
+        _unlink_segment(self.name)
+        _unlink_write_lock(self.name)
+
+    def detach(self):
+        """
+        Stops using the ring without closing it.
+        """
+        for semaphore in self._reader_semaphores.values():
+            semaphore.close()
+        self._reader_semaphores = {}
+
+
+def _reader_semaphore_name(name, reader_id):
+    return "{0}_{1:x}".format(name, reader_id)
+
+
+# the locks of the rings that processes without posix_ipc write to
+_write_locks = {}
+
+
+def _get_write_lock(name):
+    if posix_ipc is None:
+        return _write_locks.setdefault(name, threading.Lock())
+    return _SemaphoreLock(posix_ipc.Semaphore(name + "_lock", posix_ipc.O_CREAT, initial_value=1))
+
+
+def _unlink_write_lock(name):
+    if posix_ipc is None:
+        _write_locks.pop(name, None)
+        return
+    try:
+        posix_ipc.unlink_semaphore(name + "_lock")
+    except posix_ipc.ExistentialError:
+        pass
+
+
+class _SemaphoreLock:
+    """
+    A lock shared by processes, held in a posix semaphore. A writer that
+    crashed while holding it cannot stop the other writers, the lock is
+    taken anyway once the timeout expires.
+    """
+    TIMEOUT = 1.
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        # whether the thread holding the lock acquired the semaphore, kept
+        # per thread since the threads of a process share the lock
+        self._state = threading.local()
+
+    def __enter__(self):
+        try:
+            self.semaphore.acquire(self.TIMEOUT)
+            self._state.acquired = True
+        except posix_ipc.BusyError:
+            self._state.acquired = False
+
+    def __exit__(self, *exc_info):
+        if self._state.acquired:
+            self.semaphore.release()
@@ -0,0 +1,115 @@
+import multiprocessing as mp
+import threading
+import time
+
+
+class TimedSection:
+    """
+    Context manager that adds the time spent inside it to a section of the
+    current iteration of a routine.
+    """
+    __slots__ = ("sections", "name", "start")
+
+    def __init__(self, sections, name):
+        self.sections = sections
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sections[self.name] = self.sections.get(self.name, 0.) + time.perf_counter() - self.start
+        return False
+
+
+class TimeBreakdown:
+    """
+    Accumulates where the iterations of a routine spend their time.
+
+    Every iteration is split into the time spent waiting for input (including
+    empty polls), decoding, running the logic itself, encoding, putting the
+    output and running event handlers. Busy time is the CPU time of the
+    routine's thread, so utilization is the share of wall time the routine
+    actually worked.
+
+    The totals are also kept in shared memory, so the time of a routine that
+    runs in a process of its own, or of each of its replica processes, adds
+    up in the process of its component. Sections with other names are
+    counted there as logic.
+    """
+    SECTIONS = ("wait", "decode", "logic", "encode", "put", "handler")
+    TOTALS = SECTIONS + ("iterations", "busy", "wall")
+
+    def __init__(self, report_interval=5.):
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._totals = self._empty_totals()
+        self._reported = self._empty_totals()
+        self._next_report = time.monotonic() + report_interval
+        self._shared_lock = mp.Lock()
+        self._shared_totals = mp.RawArray("d", len(self.TOTALS))
+
+    def _empty_totals(self):
+        totals = dict.fromkeys(self.SECTIONS, 0.)
+        totals.update({"iterations": 0, "busy": 0., "wall": 0.})
+        return totals
+
+    def add(self, sections, wall_time, cpu_time, iterations=1):
+        """
+        Adds the time of an iteration.
+
+        Args:
+            sections: the seconds spent in every section of the iteration.
+            wall_time: the wall time of the whole iteration.
+            cpu_time: the CPU time the routine's thread used in the iteration.
+            iterations: 1 if main_logic ran, 0 if the routine only waited.
+        """
+        with self._lock:
+            for name, seconds in sections.items():
+                self._totals[name] = self._totals.get(name, 0.) + seconds
+            self._totals["iterations"] += iterations
+            self._totals["busy"] += cpu_time
+            self._totals["wall"] += wall_time
+        shared_totals = self._shared_totals
+        with self._shared_lock:
+            for name, seconds in sections.items():
+                shared_totals[self._shared_index(name)] += seconds
+            shared_totals[-3] += iterations
+            shared_totals[-2] += cpu_time
+            shared_totals[-1] += wall_time
+
+    def _shared_index(self, section):
+        try:
+            return self.SECTIONS.index(section)
+        except ValueError:
+            return self.SECTIONS.index("logic")
+
+    def report_if_due(self):
+        """
+        Returns the time accumulated since the last report if the report
+        interval has passed, otherwise None.
+        """
+        now = time.monotonic()
+        if now < self._next_report:
+            return None
+        with self._lock:
+            if now < self._next_report:
+                return None
+            self._next_report = now + self.report_interval
+            report = {name: seconds - self._reported.get(name, 0.) for name, seconds in self._totals.items()}
+            self._reported = dict(self._totals)
+        report["utilization"] = report["busy"] / report["wall"] if report["wall"] else 0.
+        return report
+
+    def as_dict(self):
+        """
+        Returns the time accumulated since the routine started, by all of its
+        threads and processes.
+        """
+        with self._shared_lock:
+            totals = dict(zip(self.TOTALS, self._shared_totals))
+        totals["iterations"] = int(totals["iterations"])
+        totals["utilization"] = totals["busy"] / totals["wall"] if totals["wall"] else 0.
+        return totals
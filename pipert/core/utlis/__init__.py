@@ -1 +1,8 @@
-from .queue_handler import QueueHandler
+from .queue_handler import QueueHandler, wait_not_empty, wait_any_not_empty, wake_waiters, put_latest, \
+    add_listener, remove_listener
+from .latest_value_slot import LatestValueSlot
+from .shared_memory_queue import SharedMemoryQueue
+from .spsc_queue import SpscQueue
+from .broadcast_queue import BroadcastQueue, BroadcastSubscriber
+from .monitored_queue import MonitoredQueue, MonitoredSubscriber
+from .reorder_buffer import ReorderBuffer, ReplicaLink, OrderedInputQueue, OrderedOutputQueue
@@ -0,0 +1,179 @@
+import threading
+import time
+from queue import Empty, Full
+
+
+class BroadcastQueue:
+    """
+    A queue with one producer and any number of subscribers, where every
+    item put is seen by every subscriber. The items are kept once, in a ring
+    of maxsize items, and each subscriber reads them through its own cursor.
+    Messages are handed to the subscribers as shared copies (see
+    Message.shared_copy), so the frame is never copied for them.
+
+    Each subscriber has its own policy for when it falls behind by more than
+    maxsize items:
+        drop_oldest: the items it missed are dropped and counted.
+        latest: it always skips to the newest item.
+        block: the producer waits until it made room.
+    """
+    SUBSCRIBER_POLICIES = ("drop_oldest", "latest", "block")
+
+    def __init__(self, maxsize=1, subscriber_policies=None):
+        if maxsize < 1:
+            raise ValueError("BroadcastQueue must have a maxsize of at least 1")
+        self.maxsize = maxsize
+        # the policy of every subscriber by its name, subscribers that are not
+        # listed use drop_oldest
+        self.subscriber_policies = subscriber_policies or {}
+        self.subscribers = {}
+        self._buffer = [None] * maxsize
+        self._next_seq = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    def subscribe(self, name, policy=None):
+        """
+        Returns a new subscriber that reads every item put from now on.
+
+        Args:
+            name: the name of the subscriber, usually the consuming routine.
+            policy: overrides the policy configured for the subscriber.
+        """
+        policy = policy or self.subscriber_policies.get(name, "drop_oldest")
+        if policy not in self.SUBSCRIBER_POLICIES:
+            raise ValueError("Unknown subscriber policy '{0}'".format(policy))
+        with self._cond:
+            subscriber = BroadcastSubscriber(self, name, policy, self._next_seq)
+            self.subscribers[name] = subscriber
+        return subscriber
+
+    def unsubscribe(self, name):
+        with self._cond:
+            self.subscribers.pop(name, None)
+            self._cond.notify_all()
+
+    def _has_room(self):
+        return all(self._next_seq - subscriber.cursor < self.maxsize
+                   for subscriber in self.subscribers.values() if subscriber.policy == "block")
+
+    def put(self, item, block=True, timeout=None):
+        with self._cond:
+            if not self._has_room():
+                if not block:
+                    raise Full
+                if not self._cond.wait_for(self._has_room, timeout):
+                    raise Full
+            self._buffer[self._next_seq % self.maxsize] = item
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def put_latest(self, item):
+        """
+        Puts the item without waiting for blocking subscribers, which then
+        lose their oldest unread item like drop_oldest subscribers.
+
+        Returns:
+            True if a subscriber lost an unread item
+        """
+        with self._cond:
+            dropped = self.full()
+            self._buffer[self._next_seq % self.maxsize] = item
+            self._next_seq += 1
+            self._cond.notify_all()
+        return dropped
+
+    def get(self, block=True, timeout=None):
+        raise TypeError("Items are taken out of a BroadcastQueue through its subscribers, "
+                        "see BroadcastQueue.subscribe")
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return max((subscriber.qsize() for subscriber in self.subscribers.values()), default=0)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return self.qsize() >= self.maxsize
+
+    def wake_waiters(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class BroadcastSubscriber:
+    """
+    The reading end of a BroadcastQueue for a single consumer, with the
+    get interface of queue.Queue.
+    """
+
+    def __init__(self, broadcast_queue, name, policy, cursor):
+        self.broadcast_queue = broadcast_queue
+        self.name = name
+        self.policy = policy
+        self.cursor = cursor
+        self.dropped = 0
+
+    @property
+    def maxsize(self):
+        return self.broadcast_queue.maxsize
+
+    def _catch_up(self):
+        # called with the queue's lock held
+        next_seq = self.broadcast_queue._next_seq
+        oldest = next_seq - (1 if self.policy == "latest" else self.broadcast_queue.maxsize)
+        if self.cursor < oldest:
+            self.dropped += oldest - self.cursor
+            self.cursor = oldest
+
+    def get(self, block=True, timeout=None):
+        broadcast_queue = self.broadcast_queue
+        with broadcast_queue._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.cursor >= broadcast_queue._next_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Empty
+                broadcast_queue._cond.wait(remaining)
+            self._catch_up()
+            item = broadcast_queue._buffer[self.cursor % broadcast_queue.maxsize]
+            self.cursor += 1
+            if self.policy == "block":
+                broadcast_queue._cond.notify_all()
+        shared_copy = getattr(item, "shared_copy", None)
+        return shared_copy() if shared_copy is not None else item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_not_empty(self, timeout=None):
+        """
+        Blocks until the subscriber has an unread item or until timeout
+        seconds have passed. Returns early if wake_waiters is called.
+
+        Returns:
+            True if the subscriber is not empty, False otherwise
+        """
+        broadcast_queue = self.broadcast_queue
+        with broadcast_queue._cond:
+            if self.cursor >= broadcast_queue._next_seq:
+                broadcast_queue._cond.wait(timeout)
+            return self.cursor < broadcast_queue._next_seq
+
+    def wake_waiters(self):
+        self.broadcast_queue.wake_waiters()
+
+    def qsize(self):
+        return min(self.broadcast_queue._next_seq - self.cursor, self.broadcast_queue.maxsize)
+
+    def empty(self):
+        return self.cursor >= self.broadcast_queue._next_seq
+
+    def full(self):
+        # a subscriber is never put into
+        return False
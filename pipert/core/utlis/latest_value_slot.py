@@ -0,0 +1,116 @@
+import threading
+import time
+from queue import Empty
+
+
+class LatestValueSlot:
+    """
+    A mailbox that holds only the most recent item put into it. A put never
+    blocks, it atomically replaces an item that was not taken yet and counts
+    it as dropped. Every put creates a new version of the value, and a get
+    waits for a version newer than the one the last get returned.
+
+    get/put keep the interface of queue.Queue, so routines can use a slot
+    wherever they used a queue of size 1 that they overwrote.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = 1
+        self.dropped = 0
+        self._value = None
+        self._version = 0
+        self._taken_version = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    def put(self, item, block=True, timeout=None):
+        self.put_latest(item)
+
+    def put_nowait(self, item):
+        self.put_latest(item)
+
+    def put_latest(self, item):
+        """
+        Replaces the value of the slot.
+
+        Returns:
+            True if a value that was not taken yet was dropped
+        """
+        with self._cond:
+            dropped = self._version > self._taken_version
+            if dropped:
+                self.dropped += 1
+            self._value = item
+            self._version += 1
+            self._cond.notify_all()
+        return dropped
+
+    def get(self, block=True, timeout=None):
+        """
+        Takes the value out of the slot, waiting for a new one if the current
+        value was already taken.
+        """
+        with self._cond:
+            if not self._wait_for_version(self._taken_version, block, timeout):
+                raise Empty
+            self._taken_version = self._version
+            item = self._value
+            self._value = None
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_newer(self, seen_version, block=True, timeout=None):
+        """
+        Returns the value of the slot without taking it, once its version is
+        newer than seen_version. Lets several readers follow the same slot.
+
+        Returns:
+            a tuple of the value and its version
+        """
+        with self._cond:
+            if not self._wait_for_version(seen_version, block, timeout):
+                raise Empty
+            return self._value, self._version
+
+    def _wait_for_version(self, seen_version, block, timeout):
+        if self._version > seen_version or not block:
+            return self._version > seen_version
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._version <= seen_version:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def wait_not_empty(self, timeout=None):
+        """
+        Blocks until the slot holds a value that was not taken yet, or until
+        timeout seconds have passed. Returns early if wake_waiters is called.
+
+        Returns:
+            True if the slot is not empty, False otherwise
+        """
+        with self._cond:
+            if self._version == self._taken_version:
+                self._cond.wait(timeout)
+            return self._version > self._taken_version
+
+    def wake_waiters(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def version(self):
+        return self._version
+
+    def qsize(self):
+        return 1 if self._version > self._taken_version else 0
+
+    def empty(self):
+        return self._version == self._taken_version
+
+    def full(self):
+        # a put never has to wait for room
+        return False
@@ -0,0 +1,242 @@
+import multiprocessing as mp
+import queue as queue_module
+import time
+
+from .broadcast_queue import BroadcastQueue
+from .latest_value_slot import LatestValueSlot
+from .queue_handler import put_latest, wait_not_empty, wake_waiters
+
+ENQUEUED, DEQUEUED, DROPPED, HIGH_WATER, PUT_WAIT, GET_WAIT = range(6)
+STAT_NAMES = ("enqueued", "dequeued", "dropped", "high_water", "put_wait", "get_wait")
+POLICIES = ("block", "drop_oldest", "drop_newest", "latest")
+
+
+class MonitoredQueue:
+    """
+    Wraps a component queue with counters of the items that went through it,
+    the items dropped to make room for fresher ones, the highest number of
+    items it held and the seconds producers and consumers spent waiting on
+    it. Any other attribute is looked up on the wrapped queue.
+
+    A queue can have an overflow policy that every put follows, whatever
+    the block and timeout arguments of the put are:
+        block: wait for room, up to timeout_ms if it is set, and drop the new
+        item if there is still no room or the component is stopping.
+        drop_oldest / latest: replace the oldest item.
+        drop_newest: drop the new item.
+    Without a policy a put behaves like the put of the wrapped queue and
+    put_latest replaces the oldest item, so each routine keeps its own
+    behaviour.
+
+    The counters take no lock, so concurrent routines on the same side of
+    the queue may rarely lose an update. Queues shared between processes
+    keep their counters in shared memory so every process adds to them.
+
+    Listeners registered with add_listener are called after every put and
+    by wake_waiters, so a routine can wait on several queues at once. They
+    are only called in the process that registered them.
+    """
+
+    # seconds between checks of the stop event while a put blocks
+    WAKEUP_INTERVAL = 0.1
+
+    def __init__(self, queue, shared=False, policy=None, timeout_ms=None, stop_event=None):
+        if policy is not None and policy not in POLICIES:
+            raise ValueError("Unknown queue policy '{0}'".format(policy))
+        self.queue = queue
+        self.policy = policy
+        self.timeout_ms = timeout_ms
+        self.stop_event = stop_event
+        self._stats = mp.RawArray("d", len(STAT_NAMES)) if shared else [0.] * len(STAT_NAMES)
+        self._listeners = []
+
+    def put(self, item, block=True, timeout=None):
+        stats = self._stats
+        if self.policy is not None:
+            self._put_with_policy(item)
+            return
+        if isinstance(self.queue, LatestValueSlot):
+            if self.queue.put_latest(item):
+                stats[DROPPED] += 1
+        elif block:
+            start = time.perf_counter()
+            try:
+                self.queue.put(item, block, timeout)
+            finally:
+                stats[PUT_WAIT] += time.perf_counter() - start
+        else:
+            self.queue.put(item, block)
+        self._record_put()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def put_latest(self, item):
+        if self.policy is not None:
+            return self._put_with_policy(item)
+        dropped = put_latest(self.queue, item)
+        self._record_replaced(dropped)
+        self._record_put()
+        return dropped
+
+    def _put_with_policy(self, item):
+        """
+        Puts the item the way the queue's policy says.
+
+        Returns:
+            True if an item, the new one or an older one, was dropped
+        """
+        if self.policy in ("drop_oldest", "latest"):
+            dropped = put_latest(self.queue, item)
+        elif self.policy == "drop_newest":
+            try:
+                self.queue.put(item, block=False)
+                dropped = False
+            except queue_module.Full:
+                self._stats[DROPPED] += 1
+                return True
+        else:
+            if not self._put_blocking(item):
+                self._stats[DROPPED] += 1
+                return True
+            dropped = False
+        self._record_replaced(dropped)
+        self._record_put()
+        return dropped
+
+    def _record_replaced(self, dropped):
+        # the subscribers of a broadcast queue count the items they missed
+        # themselves
+        if dropped and not isinstance(self.queue, BroadcastQueue):
+            self._stats[DROPPED] += 1
+
+    def _put_blocking(self, item):
+        start = time.perf_counter()
+        deadline = None if self.timeout_ms is None else start + self.timeout_ms / 1000
+        try:
+            while True:
+                wait = self.WAKEUP_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.perf_counter())
+                try:
+                    self.queue.put(item, block=wait > 0, timeout=max(wait, 0))
+                    return True
+                except queue_module.Full:
+                    if (deadline is not None and time.perf_counter() >= deadline) or \
+                            (self.stop_event is not None and self.stop_event.is_set()):
+                        return False
+        finally:
+            self._stats[PUT_WAIT] += time.perf_counter() - start
+
+    def _record_put(self):
+        stats = self._stats
+        stats[ENQUEUED] += 1
+        size = self.queue.qsize()
+        if size > stats[HIGH_WATER]:
+            stats[HIGH_WATER] = size
+        self._call_listeners()
+
+    def _call_listeners(self):
+        # a copy, so a listener removed meanwhile does not make the loop skip
+        # another one
+        for listener in tuple(self._listeners):
+            listener()
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def get(self, block=True, timeout=None):
+        if block:
+            start = time.perf_counter()
+            try:
+                item = self.queue.get(block, timeout)
+            finally:
+                self._stats[GET_WAIT] += time.perf_counter() - start
+        else:
+            item = self.queue.get(block)
+        self._stats[DEQUEUED] += 1
+        return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_not_empty(self, timeout=None):
+        start = time.perf_counter()
+        try:
+            return wait_not_empty(self.queue, timeout)
+        finally:
+            self._stats[GET_WAIT] += time.perf_counter() - start
+
+    def wake_waiters(self):
+        wake_waiters(self.queue)
+        self._call_listeners()
+
+    def subscribe(self, name, policy=None):
+        """
+        Returns a subscriber of the wrapped BroadcastQueue whose reads and
+        missed items are added to the counters of this queue.
+        """
+        return MonitoredSubscriber(self.queue.subscribe(name, policy), self._stats, self._listeners)
+
+    def get_stats(self):
+        """
+        Returns the counters of the queue along with its current size and
+        capacity, the waits are in seconds.
+        """
+        stats = dict(zip(STAT_NAMES, self._stats))
+        for name in ("enqueued", "dequeued", "dropped", "high_water"):
+            stats[name] = int(stats[name])
+        stats["size"] = self.queue.qsize()
+        stats["maxsize"] = self.maxsize
+        return stats
+
+    @property
+    def maxsize(self):
+        return self.queue.maxsize
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def full(self):
+        return self.queue.full()
+
+    def __getattr__(self, name):
+        if name == "queue":
+            # not set yet, while the object is being copied or unpickled
+            raise AttributeError(name)
+        return getattr(self.queue, name)
+
+
+class MonitoredSubscriber(MonitoredQueue):
+    """
+    The reading end of a monitored BroadcastQueue for a single consumer. It
+    shares the counters of the queue, so the items every subscriber gets are
+    counted as dequeued and the items it missed by falling behind as dropped.
+    It also shares the listeners of the queue, since items are put there.
+    """
+
+    def __init__(self, subscriber, stats, listeners):
+        super().__init__(subscriber)
+        # a subscriber is never put into, its policy is the one it follows
+        # when it falls behind
+        self.policy = subscriber.policy
+        self._stats = stats
+        self._listeners = listeners
+        self._dropped = subscriber.dropped
+
+    def get(self, block=True, timeout=None):
+        item = super().get(block, timeout)
+        dropped = self.queue.dropped
+        if dropped > self._dropped:
+            self._stats[DROPPED] += dropped - self._dropped
+            self._dropped = dropped
+        return item
@@ -1,9 +1,157 @@
 import queue
 import multiprocessing as mp
+from multiprocessing import connection
+import threading
 from typing import Union
 import time
 
 
+def wait_not_empty(q, timeout=None):
+    """
+    Blocks until `q` holds at least one item or until `timeout` seconds have
+    passed, without removing anything from the queue.
+    Args:
+        q: the queue to wait on
+        timeout: number of seconds until timeout, None waits forever
+
+    Returns:
+        True if the queue is not empty, False if timeout was reached
+    """
+    waiter = getattr(q, "wait_not_empty", None)
+    if waiter is not None:
+        return waiter(timeout)
+    if isinstance(q, queue.Queue):
+        with q.not_empty:
+            if not q._qsize():
+                q.not_empty.wait(timeout)
+            return q._qsize() > 0
+    # multiprocessing queues have no condition to wait on, poll them instead
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while q.empty():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def wake_waiters(q):
+    """
+    Wakes up every thread that is blocked in `wait_not_empty` on `q` so it can
+    check whether it should stop.
+    Args:
+        q: the queue that is being waited on
+    """
+    waker = getattr(q, "wake_waiters", None)
+    if waker is not None:
+        waker()
+    elif isinstance(q, queue.Queue):
+        with q.not_empty:
+            q.not_empty.notify_all()
+
+
+def add_listener(q, listener):
+    """
+    Registers `listener`, a callable without arguments, to be called after
+    every item put in `q` and whenever its waiters are woken up.
+    Args:
+        q: the queue to listen to
+        listener: the callable to register
+
+    Returns:
+        True if the queue supports listeners, False otherwise
+    """
+    adder = getattr(q, "add_listener", None)
+    if adder is None:
+        return False
+    adder(listener)
+    return True
+
+
+def remove_listener(q, listener):
+    """
+    Removes a listener that was registered with `add_listener`.
+    """
+    remover = getattr(q, "remove_listener", None)
+    if remover is not None:
+        remover(listener)
+
+
+def wait_any_not_empty(queues, timeout=None):
+    """
+    Blocks until one of `queues` holds at least one item or until `timeout`
+    seconds have passed, without removing anything from the queues.
+    Queues shared between processes are waited on together through their
+    wait handles, other queues through a single wakeup that every queue's
+    listener sets. Queues that support neither share the timeout in turn.
+    Args:
+        queues: the queues to wait on
+        timeout: number of seconds until timeout, None waits forever
+
+    Returns:
+        True if one of the queues is not empty, False if timeout was reached
+    """
+    if len(queues) == 1:
+        return wait_not_empty(queues[0], timeout)
+    handles = [getattr(q, "wait_handle", None) for q in queues]
+    if None not in handles:
+        return bool(connection.wait(handles, timeout))
+    wakeup = threading.Event()
+    listener = wakeup.set
+    listened = [q for q in queues if add_listener(q, listener)]
+    try:
+        if len(listened) == len(queues):
+            # the listeners are registered before the check, so an item put
+            # after it always sets the wakeup
+            if all(q.empty() for q in queues):
+                wakeup.wait(timeout)
+            return not all(q.empty() for q in queues)
+    finally:
+        for q in listened:
+            remove_listener(q, listener)
+    slice_timeout = None if timeout is None else timeout / len(queues)
+    return any(wait_not_empty(q, slice_timeout) for q in queues)
+
+
+def put_latest(q, item):
+    """
+    Puts `item` in `q` without blocking, replacing the oldest item if the
+    queue is full, so the queue always ends up holding the freshest items.
+    The replacement is atomic for queues that support it (LatestValueSlot,
+    queue.Queue), other queues fall back to taking an item out and putting
+    again until the put succeeds.
+    Args:
+        q: the queue to put in
+        item: item to put in queue
+
+    Returns:
+        True if an older item was dropped to make room, False otherwise
+    """
+    putter = getattr(q, "put_latest", None)
+    if putter is not None:
+        return putter(item)
+    if isinstance(q, queue.Queue):
+        with q.mutex:
+            dropped = 0 < q.maxsize <= q._qsize()
+            if dropped:
+                q._get()
+                q.unfinished_tasks -= 1
+            q._put(item)
+            q.unfinished_tasks += 1
+            q.not_empty.notify()
+        return dropped
+    dropped = False
+    while True:
+        try:
+            q.put(item, block=False)
+            return dropped
+        except queue.Full:
+            try:
+                q.get(block=False)
+                dropped = True
+            except queue.Empty:
+                pass
+
+
 class QueueHandler:
 
     def __init__(self, q):
@@ -18,6 +166,17 @@ class QueueHandler:
         """
         return self.q.get(block, timeout)
 
+    def wait_not_empty(self, timeout=None):
+        """
+        Blocks until the queue holds an item without removing it
+        Args:
+            timeout: number of seconds until timeout
+
+        Returns:
+            True if the queue is not empty, False if timeout was reached
+        """
+        return wait_not_empty(self.q, timeout)
+
     def timeout_get(self, timeout):
         """
         If timeout is reached, forces a context switch using `time.sleep(0)`
@@ -99,14 +258,7 @@ class QueueHandler:
             self.q.put(item, timeout=timeout)
             return True
         except queue.Full:
-            try:
-                _ = self.q.get(block=False)
-                dropped = False
-            except queue.Empty:
-                dropped = True
-            # TODO - could crash due to a race condition, could be solved with a lock
-            self.q.put(item, block=False)
-            return dropped
+            return not put_latest(self.q, item)
 
     def deque_non_blocking_put(self, item):
         """
@@ -118,15 +270,4 @@ class QueueHandler:
         Returns:
             True if successful, False if had to deque an item
         """
-        try:
-            self.q.put(item, block=False)
-            return True
-        except queue.Full:
-            try:
-                _ = self.q.get(block=False)
-                dropped = False
-            except queue.Empty:
-                dropped = True
-            # TODO - could crash due to a race condition, could be solved with a lock
-            self.q.put(item, block=False)
-            return dropped
+        return not put_latest(self.q, item)
@@ -0,0 +1,175 @@
+import threading
+from queue import Empty, Full
+
+from .queue_handler import wait_not_empty, put_latest
+
+# how a held back output is put once it is released: a blocking put, a put
+# that drops the item if the queue is full, or a put that replaces the
+# oldest item of a full queue
+PUT_BLOCK, PUT_NOWAIT, PUT_LATEST = "block", "nowait", "latest"
+
+
+class ReorderBuffer:
+    """
+    Restores the input order of the items produced by several replicas of a
+    routine that share the same input and output queues.
+
+    Every item taken from an input queue receives a ticket. Whatever a replica
+    puts on its output queues while handling that item is held back until the
+    items of all the earlier tickets were released.
+    """
+
+    def __init__(self, stop_event, put_timeout=0.1):
+        self.stop_event = stop_event
+        self.put_timeout = put_timeout
+        self._lock = threading.Lock()
+        self._release_lock = threading.Lock()
+        self._next_ticket = 0
+        self._next_release = 0
+        self._finished = {}
+
+    def get_with_ticket(self, q, block=True, timeout=None):
+        """
+        Takes an item from `q` and hands it a ticket, atomically so tickets
+        follow the order of the queue.
+
+        Returns:
+            (item, ticket)
+        """
+        while True:
+            with self._lock:
+                try:
+                    item = q.get(block=False)
+                    ticket = self._next_ticket
+                    self._next_ticket += 1
+                    return item, ticket
+                except Empty:
+                    if not block:
+                        raise
+            if not wait_not_empty(q, timeout):
+                raise Empty
+
+    def finish(self, tickets, outputs):
+        """
+        Marks tickets as handled and releases every output that is next in
+        line.
+        Args:
+            tickets: the tickets taken during one iteration of a replica
+            outputs: the (queue, item, put mode) puts made during that iteration,
+            the i'th output belongs to the i'th ticket and surplus outputs
+            belong to the last ticket
+        """
+        per_ticket = {ticket: [] for ticket in tickets}
+        for i, output in enumerate(outputs):
+            per_ticket[tickets[min(i, len(tickets) - 1)]].append(output)
+        with self._lock:
+            self._finished.update(per_ticket)
+        self._release()
+
+    def _release(self):
+        with self._release_lock:
+            while True:
+                with self._lock:
+                    if self._next_release not in self._finished:
+                        return
+                    outputs = self._finished.pop(self._next_release)
+                    self._next_release += 1
+                for q, item, mode in outputs:
+                    self.put(q, item, mode)
+
+    def put(self, q, item, mode):
+        if mode == PUT_LATEST:
+            put_latest(q, item)
+            return
+        if mode == PUT_NOWAIT:
+            try:
+                q.put(item, block=False)
+            except Full:
+                pass
+            return
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=self.put_timeout)
+                return
+            except Full:
+                pass
+
+
+class ReplicaLink:
+    """
+    Collects the tickets and the outputs of a single replica during one
+    iteration of its main logic.
+    """
+
+    def __init__(self, reorder_buffer):
+        self.reorder_buffer = reorder_buffer
+        self.tickets = []
+        self.outputs = []
+
+    def flush(self):
+        if self.tickets:
+            self.reorder_buffer.finish(self.tickets, self.outputs)
+        else:
+            for q, item, mode in self.outputs:
+                self.reorder_buffer.put(q, item, mode)
+        self.tickets = []
+        self.outputs = []
+
+
+class OrderedInputQueue:
+    """
+    Input queue of a replica, tickets every item it hands out.
+    """
+
+    def __init__(self, q, link):
+        self.q = q
+        self.link = link
+
+    def get(self, block=True, timeout=None):
+        item, ticket = self.link.reorder_buffer.get_with_ticket(self.q, block, timeout)
+        self.link.tickets.append(ticket)
+        return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_not_empty(self, timeout=None):
+        return wait_not_empty(self.q, timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.q, name)
+
+
+class OrderedOutputQueue:
+    """
+    Output queue of a replica, holds every put back until its ticket is
+    released by the reorder buffer. Puts the wrapper does not know would
+    skip the reorder buffer, so they are refused.
+    """
+
+    def __init__(self, q, link):
+        self.q = q
+        self.link = link
+
+    def put(self, item, block=True, timeout=None):
+        self.link.outputs.append((self.q, item, PUT_BLOCK if block else PUT_NOWAIT))
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def put_latest(self, item):
+        """
+        Holds the item back like put does, it replaces the oldest item of the
+        queue once it is released.
+
+        Returns:
+            False, whether an item is dropped is only known on release
+        """
+        self.link.outputs.append((self.q, item, PUT_LATEST))
+        return False
+
+    def __getattr__(self, name):
+        if name.startswith("put") or name.startswith("_put"):
+            raise AttributeError("'{0}' is not supported by the output queues of ordered replicas, "
+                                 "use put, put_nowait or put_latest".format(name))
+        return getattr(self.q, name)
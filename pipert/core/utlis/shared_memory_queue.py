@@ -0,0 +1,152 @@
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+if sys.version_info.minor == 8:
+    from pipert.core.multiprocessing_shared_memory import HandoffSharedMemoryGenerator, unlink_shared_memory
+else:
+    from pipert.core.shared_memory import HandoffSharedMemoryGenerator, unlink_shared_memory
+from pipert.core.shared_memory_pool import owned_name
+
+
+def _memory_name(payload):
+    """
+    Returns the name of the shared memory an encoded frame payload is kept
+    in, or None if the payload holds no frame.
+    """
+    data = payload.data
+    if isinstance(data, tuple):
+        data = data[0] if data else None
+    return data if isinstance(data, str) else None
+
+
+class SharedMemoryQueue:
+    """
+    A queue between routines that run in different processes. Messages go
+    through a pipe the queue owns, but their frames are written to shared
+    memory on put and read back on get, so only the message header is
+    pickled. Every shared memory is used by a single message and is deleted
+    by the process that takes the message out of the queue.
+
+    A semaphore counts the free places of the queue. A put takes a place
+    before it sends and a get gives it back after it receives, so the pipe
+    never holds more than maxsize items.
+
+    Items that are not messages are passed through the pipe as they are.
+    """
+
+    def __init__(self, maxsize=1, name="queue", component_name=None):
+        self.maxsize = maxsize
+        self.name = name
+        # the names of the shared memories of a component's queue start with
+        # the owned_name of the putting process
+        self.component_name = component_name
+        self._reader, self._writer = mp.Pipe(duplex=False)
+        self._read_lock = mp.Lock()
+        self._write_lock = mp.Lock()
+        self._free = mp.BoundedSemaphore(maxsize)
+        # a generator for every process putting into the queue, so the names
+        # of their shared memories never collide
+        self._generators = {}
+
+    @property
+    def wait_handle(self):
+        """
+        The end of the pipe the items arrive on. It becomes ready when the
+        queue holds an item, so it can be passed to
+        multiprocessing.connection.wait together with other handles.
+        """
+        return self._reader
+
+    def _get_generator(self):
+        pid = os.getpid()
+        if pid not in self._generators:
+            if self.component_name is None:
+                prefix = "{0}_{1}".format(self.name, pid)
+            else:
+                prefix = "{0}_{1}".format(owned_name(self.component_name, pid), self.name)
+            self._generators[pid] = HandoffSharedMemoryGenerator(prefix)
+        return self._generators[pid]
+
+    def put(self, item, block=True, timeout=None):
+        # a full queue raises before the frame is written, so the caller
+        # keeps its message the way it was
+        if not self._free.acquire(block, timeout):
+            raise queue.Full
+        try:
+            payload = getattr(item, "payload", None)
+            if payload is not None:
+                payload.encode(self._get_generator())
+            with self._write_lock:
+                self._writer.send(item)
+        except BaseException:
+            self._free.release()
+            raise
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def _receive(self, block, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._read_lock.acquire(block, timeout):
+            raise queue.Empty
+        try:
+            if not block:
+                remaining = 0
+            elif deadline is None:
+                remaining = None
+            else:
+                remaining = max(deadline - time.monotonic(), 0)
+            if not self._reader.poll(remaining):
+                raise queue.Empty
+            item = self._reader.recv()
+        finally:
+            self._read_lock.release()
+        self._free.release()
+        return item
+
+    def get(self, block=True, timeout=None):
+        item = self._receive(block, timeout)
+        payload = getattr(item, "payload", None)
+        if payload is not None and payload.encoded:
+            name = _memory_name(payload)
+            payload.decode()
+            if name is not None:
+                unlink_shared_memory(name)
+        return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_not_empty(self, timeout=None):
+        # polls the pipe the items arrive on without taking anything out
+        return self._reader.poll(timeout)
+
+    def drain(self):
+        """
+        Removes every item left in the queue and deletes their shared
+        memories. Used when the queue's routines have stopped.
+        """
+        while True:
+            try:
+                # puts send on the calling thread, so everything put before
+                # is already in the pipe
+                item = self._receive(block=False, timeout=None)
+            except queue.Empty:
+                return
+            payload = getattr(item, "payload", None)
+            if payload is not None and payload.encoded:
+                name = _memory_name(payload)
+                if name is not None:
+                    unlink_shared_memory(name)
+
+    def qsize(self):
+        # raises NotImplementedError on macOS, like multiprocessing.Queue
+        return self.maxsize - self._free.get_value()
+
+    def empty(self):
+        return not self._reader.poll()
+
+    def full(self):
+        return self.qsize() >= self.maxsize
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+from queue import Empty, Full
+
+
+class SpscQueue:
+    """
+    A bounded queue for a link between one producer thread and one consumer
+    thread. Items are kept in a deque with a maxlen, whose append and popleft
+    are atomic under the GIL, so a put and a get take no lock and signal no
+    condition. A side only pays for a lock when it blocks, and the other side
+    only releases that lock when it sees the flag that someone is waiting.
+
+    get/put keep the interface of queue.Queue (block, timeout, Empty, Full).
+    The drop-oldest pattern used by the routines goes through put_latest,
+    where the deque itself pushes the oldest item out of a full queue, so the
+    producer never takes items out and the consumer stays the only one that
+    does.
+    """
+
+    def __init__(self, maxsize=1):
+        if maxsize < 1:
+            raise ValueError("SpscQueue must have a maxsize of at least 1")
+        self.maxsize = maxsize
+        self._items = deque(maxlen=maxsize)
+        # held locks used as binary semaphores, released to wake the waiter
+        self._not_empty = threading.Lock()
+        self._not_empty.acquire()
+        self._not_full = threading.Lock()
+        self._not_full.acquire()
+        self._consumer_waiting = False
+        self._producer_waiting = False
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+    def full(self):
+        return len(self._items) >= self.maxsize
+
+    def put(self, item, block=True, timeout=None):
+        # only the producer adds items, so a queue that has space keeps it
+        if self.full():
+            self._wait_for_space(block, timeout)
+        self._items.append(item)
+        if self._consumer_waiting:
+            self._signal(self._not_empty)
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def put_latest(self, item):
+        """
+        Puts the item without blocking, pushing the oldest item out if the
+        queue is full.
+
+        Returns:
+            True if an item was dropped to make room
+        """
+        dropped = self.full()
+        self._items.append(item)
+        if self._consumer_waiting:
+            self._signal(self._not_empty)
+        return dropped
+
+    def get(self, block=True, timeout=None):
+        deadline = None
+        while True:
+            try:
+                item = self._items.popleft()
+                break
+            except IndexError:
+                pass
+            if not block:
+                raise Empty
+            if deadline is None and timeout is not None:
+                deadline = time.monotonic() + timeout
+            self._wait_until(self.wait_not_empty, deadline, Empty)
+        if self._producer_waiting:
+            self._signal(self._not_full)
+        return item
+
+    def _wait_for_space(self, block, timeout):
+        if not block:
+            raise Full
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.full():
+            self._wait_until(self._wait_not_full, deadline, Full)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    @staticmethod
+    def _wait_until(wait, deadline, error):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise error
+        wait(remaining)
+
+    def wait_not_empty(self, timeout=None):
+        """
+        Blocks until the queue holds an item or until timeout seconds have
+        passed, without removing anything from the queue. Returns early if
+        wake_waiters is called.
+
+        Returns:
+            True if the queue is not empty, False otherwise
+        """
+        if not self.empty():
+            return True
+        # the flag is raised before checking again, so a put that comes after
+        # the check always sees it and releases the lock
+        self._consumer_waiting = True
+        try:
+            if self.empty():
+                self._not_empty.acquire(True, -1 if timeout is None else timeout)
+        finally:
+            self._consumer_waiting = False
+        return not self.empty()
+
+    def _wait_not_full(self, timeout=None):
+        if not self.full():
+            return True
+        self._producer_waiting = True
+        try:
+            if self.full():
+                self._not_full.acquire(True, -1 if timeout is None else timeout)
+        finally:
+            self._producer_waiting = False
+        return not self.full()
+
+    def wake_waiters(self):
+        """
+        Wakes up the threads blocked on the queue so they can check whether
+        they should stop.
+        """
+        self._signal(self._not_empty)
+        self._signal(self._not_full)
+
+    @staticmethod
+    def _signal(lock):
+        try:
+            lock.release()
+        except RuntimeError:
+            # already released, the waiter has not taken the last signal yet
+            pass
@@ -0,0 +1,75 @@
+"""
+Measures the per-iteration overhead of the routine loop for an empty routine
+with 0, 2 and 10 event handlers, with the compiled event dispatch and with
+the previous dispatch that walked the handler list on every event.
+
+Run with:
+    python -m tests.benchmarks.bench_event_dispatch
+"""
+import logging
+import time
+from multiprocessing import Event
+
+from pipert.core.routine import Routine, Events
+
+ITERATIONS = 100000
+
+
+def empty_handler(routine):
+    pass
+
+
+class EmptyRoutine(Routine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("bench"), *args, **kwargs)
+        self.stop_event = Event()
+        self.iterations = 0
+
+    def main_logic(self, *args, **kwargs):
+        self.iterations += 1
+        if self.iterations == ITERATIONS:
+            self.stop_event.set()
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        return Routine.get_constructor_parameters()
+
+    def does_routine_use_queue(self, queue):
+        return False
+
+
+class LegacyDispatchRoutine(EmptyRoutine):
+    def _fire_event(self, event_name, *event_args, **event_kwargs):
+        if event_name in self._allowed_events:
+            for p, (func, args, kwargs) in self._event_handlers[event_name]:
+                kwargs.update(event_kwargs)
+                func(self, *(event_args + args), **kwargs)
+
+
+def measure(routine_class, handlers):
+    routine = routine_class()
+    for i in range(handlers):
+        event = Events.BEFORE_LOGIC if i % 2 == 0 else Events.AFTER_LOGIC
+        routine.add_event_handler(event, empty_handler)
+    start = time.perf_counter()
+    routine._extended_run()
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    for handlers in (0, 2, 10):
+        legacy = measure(LegacyDispatchRoutine, handlers)
+        compiled = measure(EmptyRoutine, handlers)
+        print(f"{handlers:2} handlers: legacy {legacy * 1e6:.2f}us/iteration, "
+              f"compiled {compiled * 1e6:.2f}us/iteration")
+
+
+if __name__ == '__main__':
+    main()
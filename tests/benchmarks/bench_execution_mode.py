@@ -0,0 +1,103 @@
+"""
+Compares the throughput of a component running its routines as threads with
+the same component running them as processes.
+
+Two CPU-bound routines are chained (in -> stage1 -> mid -> stage2 -> out) and
+fed 720p frames. In thread mode they compete for the GIL, in process mode the
+frames travel between them through shared memory.
+
+Run with:
+    python -m tests.benchmarks.bench_execution_mode
+"""
+import logging
+import time
+from queue import Empty
+
+import numpy as np
+
+from pipert.core.component import BaseComponent
+from pipert.core.message import Message
+from pipert.core.routine import Routine
+
+FRAMES = 200
+FRAME_SHAPE = (720, 1280, 3)
+# pure python work per frame, stands in for preprocessing that holds the GIL
+WORK_ITERATIONS = 200000
+
+
+class CpuBoundRoutine(Routine):
+    def __init__(self, in_queue, out_queue, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("bench"), *args, **kwargs)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            msg = self.in_queue.get(block=False)
+        except Empty:
+            return False
+        total = 0
+        for i in range(WORK_ITERATIONS):
+            total += i
+        msg.get_payload()
+        self.out_queue.put(msg)
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({"in_queue": "QueueIn", "out_queue": "QueueOut"})
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return queue in (self.in_queue, self.out_queue)
+
+
+def create_component(execution_mode):
+    comp = BaseComponent({})
+    comp.name = "bench_" + execution_mode
+    comp.logger = logging.getLogger("bench")
+    getattr(comp, "as_" + execution_mode)()
+    for queue_name in ("in", "mid", "out"):
+        comp.create_queue(queue_name, 4)
+    for routine_name, in_queue, out_queue in (("stage1", "in", "mid"), ("stage2", "mid", "out")):
+        routine = CpuBoundRoutine(comp.queues[in_queue], comp.queues[out_queue], name=routine_name)
+        comp._set_routine_runner(routine)
+        comp.register_routine(routine)
+    return comp
+
+
+def measure_throughput(execution_mode):
+    comp = create_component(execution_mode)
+    frame = np.random.randint(0, 255, FRAME_SHAPE, dtype=np.uint8)
+    comp.run_comp()
+    start = time.perf_counter()
+    sent = received = 0
+    while received < FRAMES:
+        if sent < FRAMES and not comp.queues["in"].full():
+            comp.queues["in"].put(Message(frame, "bench"))
+            sent += 1
+        try:
+            comp.queues["out"].get(timeout=0.001)
+            received += 1
+        except Empty:
+            pass
+    elapsed = time.perf_counter() - start
+    comp.stop_run()
+    return FRAMES / elapsed
+
+
+def main():
+    for execution_mode in BaseComponent.EXECUTION_MODES:
+        fps = measure_throughput(execution_mode)
+        print(f"{execution_mode:8}: {fps:.1f} frames/s through 2 CPU-bound routines")
+
+
+if __name__ == '__main__':
+    main()
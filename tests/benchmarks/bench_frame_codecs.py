@@ -0,0 +1,59 @@
+"""
+Compares the frame codecs MessageToRedis can send frames with.
+
+For every installed codec, reports the bytes a 1080p frame takes on the wire,
+the milliseconds to encode and to decode a message, and the frames per second
+a single core can push through encoding and decoding, which bounds the fps
+of a link between two components.
+
+Run with:
+    python -m tests.benchmarks.bench_frame_codecs
+"""
+import time
+
+import numpy as np
+
+from pipert.core.frame_codecs import FRAME_CODECS, get_frame_codec
+from pipert.core.message import Message, message_encode, message_decode
+
+ITERATIONS = 50
+
+
+def create_frame():
+    # a smooth image with some noise compresses about like a camera frame,
+    # pure noise would not compress at all
+    rows = np.linspace(0, 200, 1080, dtype=np.float32)[:, None]
+    columns = np.linspace(0, 55, 1920, dtype=np.float32)[None, :]
+    frame = np.dstack([rows + columns] * 3)
+    frame += np.random.normal(0, 2, frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def measure(codec, frame):
+    encode_time = decode_time = 0
+    for _ in range(ITERATIONS):
+        msg = Message(frame, "camera")
+        start = time.perf_counter()
+        encoded_msg = message_encode(msg, codec=codec)
+        encode_time += time.perf_counter() - start
+        start = time.perf_counter()
+        message_decode(encoded_msg).get_payload()
+        decode_time += time.perf_counter() - start
+    return len(encoded_msg), encode_time / ITERATIONS, decode_time / ITERATIONS
+
+
+def main():
+    frame = create_frame()
+    for codec_name in FRAME_CODECS:
+        try:
+            codec = None if codec_name == "raw" else get_frame_codec(codec_name)
+        except ImportError as error:
+            print(f"{codec_name:5}: skipped, {error}")
+            continue
+        size, encode_time, decode_time = measure(codec, frame)
+        print(f"{codec_name:5}: {size:>10,} bytes, encode {encode_time * 1e3:6.2f}ms, "
+              f"decode {decode_time * 1e3:6.2f}ms, {1 / (encode_time + decode_time):7.1f} fps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the latency of a hop between two components on the same host
+through Redis and through a shared memory ring (transport: shm).
+
+A second process echoes every message it reads back to the first, which
+reports half of the round trip for a small message, the size of one whose
+frame is in shared memory, and for a message that carries a 640x480 frame. The Redis
+reader polls like MessageFromRedis does, the ring reader waits on its
+semaphore. Redis is skipped when there is no server at REDIS_URL.
+
+Run with:
+    python -m tests.benchmarks.bench_message_transport
+"""
+import multiprocessing as mp
+import os
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+import redis
+
+from pipert.core.message import Message, message_encode
+from pipert.core.message_handlers import RedisHandler, SharedMemoryRingHandler
+
+ITERATIONS = 500
+PING_KEY = "bench_transport_ping"
+PONG_KEY = "bench_transport_pong"
+URL = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
+
+
+def create_handler(transport):
+    if transport == "redis":
+        return RedisHandler(URL, maxlen=10)
+    return SharedMemoryRingHandler(maxlen=10, block_ms=1000)
+
+
+def read(handler, key):
+    msg = None
+    while msg is None:
+        msg = handler.read_next_msg(key)
+    return msg
+
+
+def echo(transport, ready):
+    handler = create_handler(transport)
+    ready.set()
+    for _ in range(ITERATIONS + 1):
+        handler.send(PONG_KEY, read(handler, PING_KEY))
+    handler.close()
+
+
+def hop_latency(transport, encoded_msg):
+    handler = create_handler(transport)
+    # a fresh interpreter, like a component on its own
+    context = mp.get_context("spawn")
+    ready = context.Event()
+    echo_process = context.Process(target=echo, args=(transport, ready))
+    echo_process.start()
+    ready.wait()
+    # the first round trip creates the rings
+    handler.send(PING_KEY, encoded_msg)
+    read(handler, PONG_KEY)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        handler.send(PING_KEY, encoded_msg)
+        read(handler, PONG_KEY)
+    elapsed = time.perf_counter() - start
+    echo_process.join()
+    if transport == "redis":
+        handler.conn.delete(PING_KEY, PONG_KEY)
+    handler.close()
+    return elapsed / ITERATIONS / 2
+
+
+def redis_available():
+    try:
+        return redis.Redis(host=URL.hostname, port=URL.port).ping()
+    except redis.exceptions.ConnectionError:
+        return False
+
+
+def main():
+    frame = np.random.randint(0, 256, (480, 640, 3), dtype=np.uint8)
+    messages = {"small": message_encode(Message(np.zeros((1, 1, 1), dtype=np.uint8), "bench")),
+                "640x480": message_encode(Message(frame, "bench"))}
+    transports = ["shm"]
+    if redis_available():
+        transports.insert(0, "redis")
+    else:
+        print("No Redis server at {0}, skipping redis".format(URL.geturl()))
+    for name, encoded_msg in messages.items():
+        for transport in transports:
+            latency = hop_latency(transport, encoded_msg)
+            print(f"{name:9} {transport:5}: {latency * 1e6:8.1f}us per hop ({len(encoded_msg)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the binary wire format of messages with pickling the whole message,
+for every payload type.
+
+Reports the microseconds to encode and to decode a message with a 1080p
+frame, a 1080p frame with its metadata and a prediction.
+
+Run with:
+    python -m tests.benchmarks.bench_message_wire_format
+"""
+import time
+
+import numpy as np
+
+from pipert.core.message import Message, message_encode, message_decode, PICKLE_FORMAT, BINARY_FORMAT
+
+ITERATIONS = 200
+
+
+def create_messages():
+    frame = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    messages = {
+        "frame": Message(frame, "camera"),
+        "frame+metadata": Message((frame, {"frame_id": 1, "labels": ["person"] * 10}), "camera"),
+        "prediction": Message({"boxes": [[0, 0, 10, 10]] * 10, "scores": [0.9] * 10}, "detector"),
+    }
+    for msg in messages.values():
+        for component_name in ("VideoCapture", "Detector", "Visualizer"):
+            msg.history[component_name]["entry"] = time.time()
+            msg.history[component_name]["exit"] = time.time()
+    return messages
+
+
+def measure(msg, wire_format):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encoded_msg = message_encode(msg, wire_format=wire_format)
+    encode_time = (time.perf_counter() - start) / ITERATIONS
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        message_decode(encoded_msg).get_payload()
+    decode_time = (time.perf_counter() - start) / ITERATIONS
+    return encode_time, decode_time, len(encoded_msg)
+
+
+def main():
+    for format_name, wire_format in (("pickle", PICKLE_FORMAT), ("binary", BINARY_FORMAT)):
+        # a pickled message keeps its payload encoded, so every format gets new messages
+        for payload_name, msg in create_messages().items():
+            encode_time, decode_time, size = measure(msg, wire_format)
+            print(f"{payload_name:15} {format_name:7}: encode {encode_time * 1e6:8.1f}us, "
+                  f"decode {decode_time * 1e6:8.1f}us, {size:,} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares SpscQueue with queue.Queue for a link between two routine threads.
+
+Reports the hop latency, measured as half the round trip of a ping-pong over
+two queues, and the messages per second a producer thread can push to a
+consumer thread.
+
+Run with:
+    python -m tests.benchmarks.bench_queue_hop
+"""
+import time
+from queue import Queue
+from threading import Thread
+
+from pipert.core.utlis.spsc_queue import SpscQueue
+
+PING_PONGS = 20000
+MESSAGES = 200000
+
+
+def measure_hop_latency(queue_class):
+    ping, pong = queue_class(maxsize=1), queue_class(maxsize=1)
+
+    def echo():
+        for _ in range(PING_PONGS):
+            pong.put(ping.get())
+
+    echo_thread = Thread(target=echo)
+    echo_thread.start()
+    start = time.perf_counter()
+    for i in range(PING_PONGS):
+        ping.put(i)
+        pong.get()
+    elapsed = time.perf_counter() - start
+    echo_thread.join()
+    return elapsed / PING_PONGS / 2
+
+
+def measure_throughput(queue_class, maxsize):
+    q = queue_class(maxsize=maxsize)
+
+    def consume():
+        for _ in range(MESSAGES):
+            q.get()
+
+    consumer = Thread(target=consume)
+    start = time.perf_counter()
+    consumer.start()
+    for i in range(MESSAGES):
+        q.put(i)
+    consumer.join()
+    return MESSAGES / (time.perf_counter() - start)
+
+
+def main():
+    for queue_class in (Queue, SpscQueue):
+        latency = measure_hop_latency(queue_class)
+        print(f"{queue_class.__name__:10}: hop latency {latency * 1e6:.1f}us, "
+              f"{measure_throughput(queue_class, 1):,.0f} msgs/s with maxsize 1, "
+              f"{measure_throughput(queue_class, 64):,.0f} msgs/s with maxsize 64")
+
+
+if __name__ == '__main__':
+    main()
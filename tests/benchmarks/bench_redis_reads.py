@@ -0,0 +1,78 @@
+"""
+Compares the Redis commands and the latency of a MessageFromRedis-style
+reader that polls the stream with one that waits on it with XREAD BLOCK.
+
+A producer sends a message at FPS for DURATION seconds while the reader
+reads the most recent message in a loop. Reports the commands per second
+the reader sent, from the server's total_commands_processed without the
+producer's, and the mean and worst latency from send to read. Needs a
+Redis server at REDIS_URL.
+
+Run with:
+    python -m tests.benchmarks.bench_redis_reads
+"""
+import os
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+import redis
+
+from pipert.core.message_handlers import RedisHandler
+
+FPS = 30
+DURATION = 3
+KEY = "bench_redis_reads"
+URL = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
+MODES = {"polling": {}, "block 100ms": {"block_ms": 100}, "block 100ms count 10": {"block_ms": 100, "count": 10}}
+
+
+def produce(stop_event, sent):
+    handler = RedisHandler(URL, maxlen=10)
+    while not stop_event.wait(1 / FPS):
+        handler.send(KEY, struct.pack("<d", time.perf_counter()))
+        sent.append(1)
+    handler.close()
+
+
+def read(options):
+    handler = RedisHandler(URL, maxlen=10, **options)
+    server = redis.Redis(host=URL.hostname, port=URL.port)
+    server.delete(KEY)
+    commands = int(server.info("stats")["total_commands_processed"])
+    stop_event = threading.Event()
+    sent = []
+    producer = threading.Thread(target=produce, args=(stop_event, sent))
+    producer.start()
+    latencies = []
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        msg = handler.read_most_recent_msg(KEY)
+        if msg:
+            latencies.append(time.perf_counter() - struct.unpack("<d", msg)[0])
+        else:
+            time.sleep(0)
+    stop_event.set()
+    producer.join()
+    # without the producer's ping and sends and the info command
+    reader_commands = int(server.info("stats")["total_commands_processed"]) - commands - len(sent) - 2
+    server.delete(KEY)
+    handler.close()
+    return reader_commands / DURATION, latencies
+
+
+def main():
+    try:
+        redis.Redis(host=URL.hostname, port=URL.port).ping()
+    except redis.exceptions.ConnectionError:
+        print("No Redis server at {0}".format(URL.geturl()))
+        return
+    for mode, options in MODES.items():
+        commands_per_second, latencies = read(options)
+        print(f"{mode:21}: {commands_per_second:9.0f} commands/s, {len(latencies)} messages, "
+              f"latency mean {sum(latencies) / len(latencies) * 1e3:6.2f}ms max {max(latencies) * 1e3:6.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
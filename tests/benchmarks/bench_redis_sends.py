@@ -0,0 +1,67 @@
+"""
+Compares the ways RedisHandler sends messages to a stream: an XADD per
+message with exact and with approximate trimming, and pipelined batches.
+
+Sends MESSAGES messages the size of a frame in shared memory and of a JPEG
+frame, and reports the messages per second and the CPU seconds the Redis
+server spent, from INFO cpu. Needs a Redis server at REDIS_URL.
+
+Run with:
+    python -m tests.benchmarks.bench_redis_sends
+"""
+import os
+import time
+from urllib.parse import urlparse
+
+import redis
+
+from pipert.core.message_handlers import RedisHandler
+
+MESSAGES = 5000
+MAXLEN = 100
+KEY = "bench_redis_sends"
+URL = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
+MESSAGE_SIZES = {"reference": 200, "jpeg": 60000}
+MODES = {"exact": {},
+         "approximate": {"approximate_trim": True},
+         "batch 8": {"batch_size": 8},
+         "batch 32": {"batch_size": 32}}
+
+
+def server_cpu(server):
+    info = server.info("cpu")
+    return info["used_cpu_sys"] + info["used_cpu_user"]
+
+
+def send(msg, options):
+    server = redis.Redis(host=URL.hostname, port=URL.port)
+    server.delete(KEY)
+    handler = RedisHandler(URL, maxlen=MAXLEN, **options)
+    cpu = server_cpu(server)
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        handler.send(KEY, msg)
+    handler.flush()
+    elapsed = time.perf_counter() - start
+    cpu = server_cpu(server) - cpu
+    server.delete(KEY)
+    handler.close()
+    return MESSAGES / elapsed, cpu
+
+
+def main():
+    try:
+        redis.Redis(host=URL.hostname, port=URL.port).ping()
+    except redis.exceptions.ConnectionError:
+        print("No Redis server at {0}".format(URL.geturl()))
+        return
+    for size_name, size in MESSAGE_SIZES.items():
+        msg = os.urandom(size)
+        for mode, options in MODES.items():
+            messages_per_second, cpu = send(msg, options)
+            print(f"{size_name:9} {mode:11}: {messages_per_second:8.0f} messages/s, "
+                  f"redis cpu {cpu:5.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares the blocking, wakeup-driven routine loop with the polling loop.
+
+Reports the CPU time burnt by idle routines and the latency between putting
+a message on a routine's input queue and the routine processing it.
+
+Run with:
+    python -m tests.benchmarks.bench_routine_wait
+"""
+import logging
+import time
+from multiprocessing import Event
+from queue import Queue, Empty
+
+from pipert.core.routine import Routine
+
+IDLE_ROUTINES = 6
+IDLE_SECONDS = 2
+LATENCY_SAMPLES = 200
+
+
+class LatencyRoutine(Routine):
+    def __init__(self, in_queue, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("bench"), *args, **kwargs)
+        self.in_queue = in_queue
+        self.latencies = []
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            sent_time = self.in_queue.get(block=False)
+        except Empty:
+            time.sleep(0)
+            return False
+        self.latencies.append(time.perf_counter() - sent_time)
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({"in_queue": "QueueIn"})
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.in_queue == queue
+
+
+def start_routines(count, wait_for_input):
+    stop_event = Event()
+    routines = []
+    for _ in range(count):
+        routine = LatencyRoutine(Queue(maxsize=1), wait_for_input=wait_for_input)
+        routine.stop_event = stop_event
+        routine.as_thread().start()
+        routines.append(routine)
+    return stop_event, routines
+
+
+def stop_routines(stop_event, routines):
+    stop_event.set()
+    for routine in routines:
+        routine.runner.join()
+
+
+def measure_idle_cpu(wait_for_input):
+    stop_event, routines = start_routines(IDLE_ROUTINES, wait_for_input)
+    cpu_start = time.process_time()
+    time.sleep(IDLE_SECONDS)
+    cpu_used = time.process_time() - cpu_start
+    stop_routines(stop_event, routines)
+    return cpu_used / IDLE_SECONDS
+
+
+def measure_latency(wait_for_input):
+    stop_event, routines = start_routines(1, wait_for_input)
+    routine = routines[0]
+    for _ in range(LATENCY_SAMPLES):
+        routine.in_queue.put(time.perf_counter())
+        time.sleep(0.005)
+    stop_routines(stop_event, routines)
+    latencies = sorted(routine.latencies)
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    for wait_for_input, mode in ((False, "polling"), (True, "waiting")):
+        cores = measure_idle_cpu(wait_for_input)
+        median, p99 = measure_latency(wait_for_input)
+        print(f"{mode:8}: idle cpu {cores:.2f} cores for {IDLE_ROUTINES} routines, "
+              f"wake-to-process latency median {median * 1e6:.0f}us p99 {p99 * 1e6:.0f}us")
+
+
+if __name__ == '__main__':
+    main()
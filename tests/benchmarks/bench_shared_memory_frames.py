@@ -0,0 +1,72 @@
+"""
+Compares passing a frame through shared memory by copying it to and from
+bytes with writing it straight from the array and reading it back as a
+read-only view of the mapping.
+
+Reports the milliseconds to write and to read a 720p, 1080p and 4K frame.
+Uses the posix_ipc shared memory of Python 3.9 and later.
+
+Run with:
+    python -m tests.benchmarks.bench_shared_memory_frames
+"""
+import time
+
+import numpy as np
+
+from pipert.core.shared_memory import SharedMemoryGenerator, get_shared_memory_object, map_shared_memory
+
+ITERATIONS = 50
+RESOLUTIONS = {"720p": (720, 1280, 3), "1080p": (1080, 1920, 3), "4K": (2160, 3840, 3)}
+
+
+def copy_through_bytes(generator, frame):
+    start = time.perf_counter()
+    buf = frame.tobytes()
+    memory_name = generator.get_next_shared_memory(size=len(buf))
+    memory = get_shared_memory_object(memory_name)
+    memory.acquire_semaphore()
+    memory.write_to_memory(buf)
+    memory.release_semaphore()
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    memory = get_shared_memory_object(memory_name)
+    memory.acquire_semaphore()
+    data = memory.read_from_memory()
+    memory.release_semaphore()
+    np.frombuffer(data, dtype=frame.dtype).reshape(frame.shape)
+    return write_time, time.perf_counter() - start
+
+
+def zero_copy(generator, frame):
+    start = time.perf_counter()
+    memory_name = generator.get_next_shared_memory(size=frame.nbytes)
+    memory = get_shared_memory_object(memory_name)
+    memory.acquire_semaphore()
+    memory.write_array(frame)
+    memory.release_semaphore()
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    np.frombuffer(map_shared_memory(memory_name), dtype=frame.dtype).reshape(frame.shape)
+    return write_time, time.perf_counter() - start
+
+
+def measure(method, frame):
+    generator = SharedMemoryGenerator("bench_frames", max_count=4)
+    times = np.array([method(generator, frame) for _ in range(ITERATIONS)])
+    generator.cleanup()
+    return times.mean(axis=0)
+
+
+def main():
+    for resolution, shape in RESOLUTIONS.items():
+        frame = np.random.randint(0, 256, shape, dtype=np.uint8)
+        for method in (copy_through_bytes, zero_copy):
+            write_time, read_time = measure(method, frame)
+            print(f"{resolution:6} {method.__name__:18}: write {write_time * 1e3:6.2f}ms, "
+                  f"read {read_time * 1e3:6.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares writing every frame into a shared memory segment of its own with
+writing it into a slot of a SharedMemoryPool, and reading it back.
+
+Reports the microseconds to write and to read a 720p and a 1080p frame.
+Uses the posix_ipc shared memory of Python 3.9 and later.
+
+Run with:
+    python -m tests.benchmarks.bench_shared_memory_pool
+"""
+import time
+
+import numpy as np
+
+from pipert.core.shared_memory import SharedMemoryGenerator, get_shared_memory_object, map_shared_memory
+from pipert.core.shared_memory_pool import SharedMemoryPool, acknowledge_slot, read_slot
+
+ITERATIONS = 200
+SLOTS = 50
+RESOLUTIONS = {"720p": (720, 1280, 3), "1080p": (1080, 1920, 3)}
+
+
+def segment_per_frame(frame):
+    generator = SharedMemoryGenerator("bench_segments", max_count=SLOTS)
+    write_time = read_time = 0
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        memory_name = generator.get_next_shared_memory(size=frame.nbytes)
+        get_shared_memory_object(memory_name).write_array(frame)
+        write_time += time.perf_counter() - start
+        start = time.perf_counter()
+        np.frombuffer(map_shared_memory(memory_name), dtype=frame.dtype).reshape(frame.shape)
+        read_time += time.perf_counter() - start
+    generator.cleanup()
+    return write_time / ITERATIONS, read_time / ITERATIONS
+
+
+def pool_slot(frame):
+    pool = SharedMemoryPool("bench_pool", frame.nbytes, SLOTS)
+    write_time = read_time = 0
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        slot = pool.write(frame)
+        write_time += time.perf_counter() - start
+        start = time.perf_counter()
+        np.frombuffer(read_slot(slot), dtype=frame.dtype).reshape(frame.shape)
+        read_time += time.perf_counter() - start
+        acknowledge_slot(slot)
+    pool.cleanup()
+    return write_time / ITERATIONS, read_time / ITERATIONS
+
+
+def main():
+    for resolution, shape in RESOLUTIONS.items():
+        frame = np.random.randint(0, 256, shape, dtype=np.uint8)
+        for method in (segment_per_frame, pool_slot):
+            write_time, read_time = method(frame)
+            print(f"{resolution:6} {method.__name__:17}: write {write_time * 1e6:8.1f}us, "
+                  f"read {read_time * 1e6:6.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import logging
+from queue import Queue
+
+import pytest
+
+listen_to_stream = pytest.importorskip("pipert.contrib.routines.listen_to_stream")
+
+
+def test_file_without_frame_rate_keeps_pace():
+    routine = listen_to_stream.ListenToStream("missing.mp4", Queue(), fps=10., name="listen",
+                                              logger=logging.getLogger("test_logs.log"))
+    routine.begin_capture()
+    assert routine.pacer.period == pytest.approx(0.1)
+    routine.counter = 0
+    assert routine.grab_frame() == (False, None)
+
+
+@pytest.mark.parametrize("extensions, period", [(None, 0.5), ({"pace": {"fps": 10}}, 0.1)])
+def test_change_stream_keeps_configured_pace(extensions, period):
+    routine = listen_to_stream.ListenToStream("missing.mp4", Queue(), fps=10., name="listen",
+                                              logger=logging.getLogger("test_logs.log"), extensions=extensions)
+    routine.updated_config = {"stream_address": "other.mp4", "FPS": 2.}
+    routine.change_stream()
+    assert routine.pacer.period == pytest.approx(period)
+    routine.stream.release()
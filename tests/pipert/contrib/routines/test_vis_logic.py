@@ -0,0 +1,35 @@
+import logging
+import random
+import time
+from multiprocessing import Event
+from queue import Queue
+
+import numpy as np
+import pytest
+from pipert.core.message import Message
+from pipert.core.utlis.monitored_queue import MonitoredQueue
+
+vis_logic = pytest.importorskip("pipert.contrib.routines.vis_logic")
+
+
+class SlowVisLogic(vis_logic.VisLogic):
+    def section(self, name):
+        # the replicas finish their frames in a random order
+        if name == "put":
+            time.sleep(random.uniform(0, 0.01))
+        return super().section(name)
+
+
+def test_ordered_replicas_keep_order():
+    # a component queue, which has a put_latest of its own
+    in_queue, out_queue = MonitoredQueue(Queue()), MonitoredQueue(Queue())
+    for i in range(30):
+        in_queue.put((Message(np.full((1, 1, 3), i, dtype=np.uint8), "test"), None))
+    routine = SlowVisLogic(in_queue, out_queue, logger=logging.getLogger("test_logs.log"))
+    routine.stop_event = Event()
+    routine.as_thread_pool(3, ordered=True)
+    routine.start()
+    results = [out_queue.get(timeout=1) for _ in range(30)]
+    routine.stop_event.set()
+    routine.join()
+    assert [int(msg.get_payload()[0, 0, 0]) for msg in results] == list(range(30))
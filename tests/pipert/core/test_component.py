@@ -1,14 +1,31 @@
 import logging
+import subprocess
 import time
 from threading import Thread
 
+import numpy as np
 import pytest
 from multiprocessing import Process
+from queue import Queue
 
+from pipert.core.class_factory import ClassFactory
+from pipert.core.errors import QueueWiringException
 from pipert.core.metrics_collector import NullCollector
-from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine, DummyRoutineWithQueue
+from pipert.core.cpu_budget import BLAS_ENV_VARS, CpuBudget
+from pipert.core.message import Message
+from pipert.core.shared_memory_pool import owned_name
+from pipert.core.utlis.shared_memory_queue import SharedMemoryQueue
+from pipert.core.utlis.spsc_queue import SpscQueue
+from pipert.core.utlis.latest_value_slot import LatestValueSlot
+from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine, DummyRoutineWithQueue, DummyAsyncRoutine, \
+    DummyFrameRoutine
 from tests.pipert.core.utils.component.dummy_component import DummyComponent
 import os
+import sys
+if sys.version_info.minor == 8:
+    from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen
+else:
+    from pipert.core.shared_memory import SharedMemoryGenerator as smGen
 
 
 @pytest.fixture(scope="function")
@@ -152,3 +169,320 @@ def test_set_monitoring_with_good_params(component_with_queue_and_routine):
     })
     assert not isinstance(component_with_queue_and_routine.metrics_collector, NullCollector)
 
+
+
+def test_get_routines_time_breakdown(component_with_queue_and_routine):
+    comp = component_with_queue_and_routine
+    assert comp.get_routines_time_breakdown() == {}
+    comp.get_routines()["rout1"]._extension_time_breakdown()
+    assert "rout1" in comp.get_routines_time_breakdown()
+
+
+def test_async_routines_share_event_loop_thread():
+    comp = DummyComponent({})
+    rout1 = DummyAsyncRoutine(name="async1").as_asyncio()
+    rout2 = DummyAsyncRoutine(name="async2").as_asyncio()
+    comp.register_routine(rout1)
+    comp.register_routine(rout2)
+
+    comp.run_comp()
+    time.sleep(0.1)
+    assert comp.stop_run() == 0
+
+    assert rout1.counter > 0 and rout2.counter > 0
+    assert len(rout1.threads | rout2.threads) == 1
+    assert not comp.event_loop_thread.is_alive()
+
+
+def test_routines_share_redis_pools():
+    comp = DummyComponent({})
+    rout1 = DummyRoutine(name="rout1").as_thread()
+    rout2 = DummyRoutine(name="rout2").as_thread()
+    comp.register_routine(rout1)
+    comp.register_routine(rout2)
+
+    assert rout1.redis_pools is comp.redis_pools
+    assert rout2.redis_pools is comp.redis_pools
+
+
+def test_setup_component_with_cpu_budget(monkeypatch):
+    for env_var in BLAS_ENV_VARS:
+        monkeypatch.setenv(env_var, "")
+    component = DummyComponent(component_config={})
+    cpu_budget = {"threads": 2,
+                  "routines": {"rout1": {"threads": 1, "affinity": [0]}}}
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": [],
+            "routines": {},
+            "cpu_budget": cpu_budget
+        }
+    }
+
+    component.setup_component(component_config=component_configuration)
+    assert all(os.environ[env_var] == "2" for env_var in BLAS_ENV_VARS)
+    assert component.cpu_budget.for_routine("rout1") == {"threads": 1, "affinity": [0]}
+    assert component.cpu_budget.for_routine("rout2") == {"threads": 2, "affinity": None}
+    assert component.get_component_configuration()["comp"]["cpu_budget"] == cpu_budget
+
+
+def test_routine_threads_only_apply_in_process_mode():
+    comp = DummyComponent({})
+    comp.cpu_budget = CpuBudget(threads=2, routines={"rout1": {"threads": 1, "affinity": [0]}})
+    rout = DummyRoutine(name="rout1")
+
+    comp._set_routine_runner(rout)
+    # torch and OpenCV share their threads between the routine threads
+    assert rout.cpu_budget == {"threads": 2, "affinity": [0]}
+    assert comp.as_process()
+    comp._set_routine_runner(rout)
+    assert rout.cpu_budget == {"threads": 1, "affinity": [0]}
+
+
+class CpuBudgetCollector(NullCollector):
+    def __init__(self):
+        super().__init__()
+        self.settings = {}
+
+    def collect_cpu_budget(self, settings, routine_name, component_name):
+        self.settings[routine_name] = settings
+
+
+def test_routine_applies_cpu_budget(component_with_queue_and_routine):
+    comp = component_with_queue_and_routine
+    routine = comp.get_routines()["rout1"]
+    routine.cpu_budget = {"threads": 1, "affinity": [0]}
+    routine.metrics_collector = CpuBudgetCollector()
+    affinity = os.sched_getaffinity(0)
+
+    comp.run_comp()
+    time.sleep(0.1)
+    assert comp.stop_run() == 0
+
+    assert routine.metrics_collector.settings["rout1"]["cpus"] == 1
+    # the affinity is set on the routine's thread only
+    assert os.sched_getaffinity(0) == affinity
+
+
+def test_process_execution_mode():
+    comp = DummyComponent({})
+    comp.name = "proc_comp"
+    assert comp.as_process()
+    comp.create_queue("in", 1)
+    comp.create_queue("out", 1)
+    rout = DummyFrameRoutine(in_queue=comp.queues["in"], out_queue=comp.queues["out"], name="worker")
+    comp._set_routine_runner(rout)
+    comp.register_routine(rout)
+
+    comp.run_comp()
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    comp.queues["in"].put(Message(frame, "source"))
+    msg = comp.queues["out"].get(timeout=5)
+    assert comp.stop_run() == 0
+
+    assert isinstance(rout.runner, Process)
+    assert np.array_equal(msg.get_payload(), frame + 1)
+
+
+def test_change_execution_mode(component_with_queue_and_routine):
+    comp = component_with_queue_and_routine
+    routine = comp.get_routines()["rout1"]
+    assert comp.as_process()
+    assert isinstance(comp.queues["que1"].queue, SharedMemoryQueue)
+    assert routine.queue is comp.queues["que1"]
+    assert routine.runner_creator is Process
+
+    assert comp.as_thread()
+    assert isinstance(comp.queues["que1"].queue, Queue)
+    assert routine.queue is comp.queues["que1"]
+
+
+def test_setup_component_with_spsc_queue():
+    component = DummyComponent(component_config={})
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": ["que1", {"que2": {"type": "spsc"}}],
+            "routines": {},
+            "component_type_name": "DummyComponent"
+        }
+    }
+
+    component.setup_component(component_config=component_configuration)
+    assert isinstance(component.queues["que1"].queue, Queue)
+    assert isinstance(component.queues["que2"].queue, SpscQueue)
+    assert component_configuration == component.get_component_configuration()
+
+
+@pytest.mark.parametrize("routines", [
+    {"first": {"in_queue": "frames", "out_queue": "out1"},
+     "second": {"in_queue": "frames", "out_queue": "out2"}},
+    {"first": {"in_queue": "in", "out_queue": "frames"},
+     "second": {"in_queue": "out1", "out_queue": "frames"}},
+    {"first": {"in_queue": "frames", "out_queue": "out1", "replicas": 2}},
+])
+def test_spsc_queue_with_several_producers_or_consumers(monkeypatch, routines):
+    monkeypatch.setattr(ClassFactory, "get_class", lambda self, class_name: DummyFrameRoutine)
+    component = DummyComponent(component_config={})
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": ["in", {"frames": {"type": "spsc"}}, "out1", "out2"],
+            "routines": {name: dict(parameters, routine_type_name="DummyFrameRoutine")
+                         for name, parameters in routines.items()},
+            "component_type_name": "DummyComponent"
+        }
+    }
+
+    with pytest.raises(QueueWiringException, match="spsc queue frames"):
+        component.setup_component(component_config=component_configuration)
+
+
+class QueueStatsCollector(NullCollector):
+    def __init__(self):
+        super().__init__()
+        self.stats = {}
+
+    def collect_queue_stats(self, queue_stats, queue_name, component_name):
+        self.stats[queue_name] = queue_stats
+
+
+def test_get_queue_stats(component_with_queue):
+    comp = component_with_queue
+    comp.metrics_collector = QueueStatsCollector()
+    comp.queue_stats_interval = 0.01
+    q = comp.queues["que1"]
+    q.put(1)
+    q.put_latest(2)
+    assert q.get(block=False) == 2
+
+    stats = comp.get_queue_stats()["que1"]
+    assert stats["enqueued"] == 2
+    assert stats["dequeued"] == 1
+    assert stats["dropped"] == 1
+    assert stats["high_water"] == 1
+    assert stats["size"] == 0 and stats["maxsize"] == 1
+
+    comp.run_comp()
+    time.sleep(0.1)
+    assert comp.stop_run() == 0
+    assert comp.metrics_collector.stats["que1"]["enqueued"] == 2
+
+
+class SharedMemoryStatsCollector(NullCollector):
+    def __init__(self):
+        super().__init__()
+        self.stats = None
+
+    def collect_shared_memory_stats(self, shared_memory_stats, component_name):
+        self.stats = shared_memory_stats
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def create_shared_memory_component(name):
+    component = DummyComponent(component_config={})
+    component.setup_component({
+        name: {
+            "shared_memory": True,
+            "queues": ["que1"],
+            "routines": {},
+            "component_type_name": "DummyComponent"
+        }
+    })
+    return component
+
+
+def test_janitor_removes_orphaned_shared_memory():
+    # a shared memory that a crashed run of the component left behind
+    leaked = smGen(owned_name("janitor_comp", dead_pid()), max_count=2)
+    leaked.write_to_pool(np.zeros(16, dtype=np.uint8))
+    leaked.pool = None
+    component = create_shared_memory_component("janitor_comp")
+    assert not [name for name in os.listdir("/dev/shm") if name.startswith("janitor_comp_")]
+
+    component.metrics_collector = SharedMemoryStatsCollector()
+    component.queue_stats_interval = 0.01
+    component.run_comp()
+    time.sleep(0.1)
+    assert component.stop_run() == 0
+    assert component.metrics_collector.stats["orphans_removed"] >= 1
+    assert component.metrics_collector.stats["leaked_bytes"] >= 16
+
+
+def test_janitor_keeps_shared_memory_of_running_instance():
+    first = create_shared_memory_component("replica_comp")
+    first.generator.write_to_pool(np.zeros(16, dtype=np.uint8))
+    pool_name = first.generator.pool.name
+    # a component whose name starts with the name of the first one
+    other = create_shared_memory_component("replica_comp_other")
+    other.generator.write_to_pool(np.zeros(16, dtype=np.uint8))
+    second = create_shared_memory_component("replica_comp")
+    second.run_comp()
+    time.sleep(0.1)
+    assert second.stop_run() == 0
+    assert pool_name in os.listdir("/dev/shm")
+    assert other.generator.pool.name in os.listdir("/dev/shm")
+    first.generator.cleanup()
+    other.generator.cleanup()
+    second.generator.cleanup()
+
+
+def test_setup_component_with_queue_options():
+    component = DummyComponent(component_config={})
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": [{"frames": {"size": 4, "policy": "block", "timeout_ms": 20}},
+                       {"preds": {"policy": "latest"}}],
+            "routines": {},
+            "component_type_name": "DummyComponent"
+        }
+    }
+
+    component.setup_component(component_config=component_configuration)
+    assert component.queues["frames"].maxsize == 4
+    assert component.queues["frames"].policy == "block"
+    assert isinstance(component.queues["preds"].queue, LatestValueSlot)
+    assert component_configuration == component.get_component_configuration()
+
+
+def test_setup_component_with_broadcast_queue(monkeypatch):
+    monkeypatch.setattr(ClassFactory, "get_class", lambda self, class_name: DummyFrameRoutine)
+    component = DummyComponent(component_config={})
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": [{"frames": {"type": "broadcast", "size": 2, "subscribers": {"second": "latest"}}},
+                       "out1", "out2"],
+            "routines": {
+                "first": {"in_queue": "frames", "out_queue": "out1", "routine_type_name": "DummyFrameRoutine"},
+                "second": {"in_queue": "frames", "out_queue": "out2", "routine_type_name": "DummyFrameRoutine"}
+            },
+            "component_type_name": "DummyComponent"
+        }
+    }
+
+    component.setup_component(component_config=component_configuration)
+    first, second = component.get_routines()["first"], component.get_routines()["second"]
+    assert first.in_queue.policy == "drop_oldest" and second.in_queue.policy == "latest"
+    assert component.does_routines_use_queue("frames")
+    assert component_configuration == component.get_component_configuration()
+
+    component.run_comp()
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    component.queues["frames"].put(Message(frame, "source"))
+    first_msg = component.queues["out1"].get(timeout=5)
+    second_msg = component.queues["out2"].get(timeout=5)
+    assert component.stop_run() == 0
+    assert np.array_equal(first_msg.get_payload(), frame + 1)
+    assert np.array_equal(second_msg.get_payload(), frame + 1)
+    assert first_msg is not second_msg
+
+    assert component.as_process() and component.as_thread()
+    assert first.in_queue.broadcast_queue is component.queues["frames"].queue
@@ -0,0 +1,114 @@
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+import redis
+from pipert.core.message_handlers import RedisHandler, RedisConsumerGroupHandler
+
+key = "TestGroup"
+group = "workers"
+MESSAGES = 200
+# the seconds a consumer spends on every message, like a slow detector
+WORK = 0.01
+
+
+@pytest.fixture(scope="module")
+def redis_url(tmp_path_factory):
+    if shutil.which("redis-server") is None:
+        pytest.skip("redis-server is not installed")
+    socket_path = tmp_path_factory.mktemp("redis") / "redis.sock"
+    server = subprocess.Popen(["redis-server", "--port", "0", "--unixsocket", str(socket_path),
+                               "--save", "", "--appendonly", "no"], stdout=subprocess.DEVNULL)
+    url = "unix://" + str(socket_path)
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            redis.Redis.from_url(url).ping()
+            break
+        except (redis.exceptions.ConnectionError, FileNotFoundError):
+            if time.monotonic() > deadline:
+                server.kill()
+                pytest.skip("redis-server did not start")
+            time.sleep(0.05)
+    yield url
+    server.terminate()
+    server.wait()
+
+
+@pytest.fixture(scope="function")
+def sender(redis_url):
+    sender = RedisHandler(redis_url, maxlen=MESSAGES)
+    yield sender
+    sender.conn.delete(key)
+    sender.close()
+
+
+def create_consumers(redis_url, number, **options):
+    consumers = [RedisConsumerGroupHandler(redis_url, group, maxlen=MESSAGES, block_ms=50, **options)
+                 for _ in range(number)]
+    # the group only gets the messages sent after it was created
+    consumers[0].read_next_msg(key)
+    return consumers
+
+
+def consume(consumer, read):
+    while True:
+        msg = consumer.read_next_msg(key)
+        if msg is None:
+            return
+        time.sleep(WORK)
+        read.append(msg)
+
+
+def run_consumers(consumers, sender):
+    read = []
+    for i in range(MESSAGES):
+        sender.send(key, str(i))
+    threads = [threading.Thread(target=consume, args=(consumer, read)) for consumer in consumers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for consumer in consumers:
+        consumer.close()
+    return read, MESSAGES / elapsed
+
+
+def test_consumers_split_messages(redis_url, sender):
+    consumers = create_consumers(redis_url, 2)
+    sender.send(key, "AAA")
+    sender.send(key, "BBB")
+    assert consumers[0].read_next_msg(key).decode() == "AAA"
+    assert consumers[1].read_next_msg(key).decode() == "BBB"
+    assert consumers[0].read_next_msg(key) is None
+    for consumer in consumers:
+        consumer.close()
+    assert sender.conn.xpending(key, group)["pending"] == 0
+
+
+def test_messages_of_dead_consumer_are_claimed(redis_url, sender):
+    dead, alive = create_consumers(redis_url, 2, claim_idle_ms=50)
+    sender.send(key, "AAA")
+    assert dead.read_next_msg(key).decode() == "AAA"
+    # the consumer dies without acknowledging the message
+    time.sleep(0.1)
+    assert alive.read_next_msg(key).decode() == "AAA"
+    assert alive.claimed == 1
+    alive.close()
+    dead.conn.close()
+    assert sender.conn.xpending(key, group)["pending"] == 0
+
+
+def test_throughput_scales_with_consumers(redis_url, sender):
+    read, single_throughput = run_consumers(create_consumers(redis_url, 1), sender)
+    assert sorted(read) == sorted(str(i).encode() for i in range(MESSAGES))
+    sender.conn.delete(key)
+
+    read, throughput = run_consumers(create_consumers(redis_url, 4), sender)
+    # every message is read by a single consumer
+    assert sorted(read) == sorted(str(i).encode() for i in range(MESSAGES))
+    assert throughput > 3 * single_throughput
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from pipert.core.frame_codecs import get_frame_codec, FRAME_CODECS
+from pipert.core.message import Message, message_encode, message_decode
+
+
+def create_frame():
+    gradient = np.linspace(0, 255, 64, dtype=np.uint8)
+    return np.dstack([np.tile(gradient, (48, 1))] * 3)
+
+
+@pytest.mark.parametrize("codec_name", ["raw", "zlib", "lz4", "zstd", "png"])
+def test_lossless_codecs(codec_name):
+    try:
+        codec = get_frame_codec(codec_name)
+    except ImportError:
+        pytest.skip("the {0} codec is not installed".format(codec_name))
+    frame = create_frame()
+    decoded = codec.decode(codec.encode(frame), frame.dtype, frame.shape)
+    assert codec.lossless
+    assert (decoded == frame).all()
+
+
+def test_jpeg_codec():
+    try:
+        codec = get_frame_codec("jpeg", quality=95)
+    except ImportError:
+        pytest.skip("the jpeg codec is not installed")
+    frame = create_frame()
+    decoded = codec.decode(codec.encode(frame), frame.dtype, frame.shape)
+    assert decoded.shape == frame.shape
+    assert np.abs(decoded.astype(int) - frame).mean() < 5
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_frame_codec("gif")
+    assert "jpeg" in FRAME_CODECS
+
+
+def test_compressed_frame_is_decoded_on_get_payload():
+    frame = create_frame()
+    msg = Message((frame, {"id": 1}), "camera")
+    encoded_msg = message_encode(msg, codec=get_frame_codec("zlib"))
+    assert len(encoded_msg) < frame.nbytes
+    decoded_msg = message_decode(encoded_msg)
+    assert decoded_msg.payload.encoded
+    decoded_frame, metadata = decoded_msg.get_payload()
+    assert (decoded_frame == frame).all()
+    assert metadata == {"id": 1}
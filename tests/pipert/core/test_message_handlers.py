@@ -1,5 +1,18 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from multiprocessing import Event
+from queue import Queue
+
+import numpy as np
 import pytest
-from pipert.core.message_handlers import RedisHandler
+from pipert.contrib.routines.message_to_redis import MessageToRedis
+from pipert.core.message import Message
+from pipert.core.message_handlers import RedisHandler, AsyncRedisHandler, SharedMemoryRingHandler, \
+    RedisConnectionPools
+from pipert.core.shared_memory_ring import _SemaphoreLock, _get_write_lock, _unlink_write_lock
 from urllib.parse import urlparse
 
 key = "Test"
@@ -53,3 +66,239 @@ def test_redis_read_most_recent_message_cannot_read_the_same_message(redis_handl
     redis_handler.send(key, "AAA")
     assert redis_handler.read_most_recent_msg(key).decode() == "AAA"
     assert redis_handler.read_most_recent_msg(key) is None
+
+
+@pytest.fixture(scope="function")
+def blocking_redis_handler():
+    redis_handler = RedisHandler(urlparse("redis://127.0.0.1:6379"), block_ms=50, count=2)
+    yield redis_handler
+    redis_handler.conn.delete(key)
+    redis_handler.close()
+
+
+def test_redis_blocking_read_next_msg(redis_handler, blocking_redis_handler):
+    assert blocking_redis_handler.read_next_msg(key) is None
+    redis_handler.send(key, "AAA")
+    assert blocking_redis_handler.read_next_msg(key).decode() == "AAA"
+    for msg in ("BBB", "CCC", "DDD"):
+        redis_handler.send(key, msg)
+    assert [blocking_redis_handler.read_next_msg(key).decode() for _ in range(3)] == ["BBB", "CCC", "DDD"]
+    assert blocking_redis_handler.read_next_msg(key) is None
+
+
+def test_redis_blocking_read_waits_for_message(redis_handler, blocking_redis_handler):
+    redis_handler.send(key, "AAA")
+    assert blocking_redis_handler.read_next_msg(key).decode() == "AAA"
+    threading.Timer(0.01, redis_handler.send, (key, "BBB")).start()
+    assert blocking_redis_handler.read_next_msg(key).decode() == "BBB"
+
+
+def test_redis_blocking_read_waits_on_empty_stream(redis_handler, blocking_redis_handler):
+    start = time.monotonic()
+    assert blocking_redis_handler.read_most_recent_msg(key) is None
+    assert time.monotonic() - start >= 0.04
+    threading.Timer(0.01, redis_handler.send, (key, "AAA")).start()
+    assert blocking_redis_handler.read_most_recent_msg(key).decode() == "AAA"
+
+
+def test_redis_blocking_read_most_recent_message_drains_the_batch(redis_handler, blocking_redis_handler):
+    redis_handler.send(key, "AAA")
+    assert blocking_redis_handler.read_most_recent_msg(key).decode() == "AAA"
+    for msg in ("BBB", "CCC", "DDD", "EEE"):
+        redis_handler.send(key, msg)
+    assert blocking_redis_handler.read_most_recent_msg(key).decode() == "EEE"
+    assert blocking_redis_handler.read_most_recent_msg(key) is None
+
+
+def test_redis_batched_send(redis_handler):
+    batching_handler = RedisHandler(urlparse("redis://127.0.0.1:6379"), batch_size=3)
+    batching_handler.send(key, "AAA")
+    batching_handler.send(key, "BBB")
+    assert redis_handler.receive(key) is None
+    batching_handler.send(key, "CCC")
+    assert redis_handler.read_next_msg(key).decode() == "CCC"
+    batching_handler.send(key, "DDD")
+    batching_handler.flush()
+    assert redis_handler.read_next_msg(key).decode() == "DDD"
+    batching_handler.close()
+
+
+def test_redis_batch_waits_for_flush_ms(redis_handler):
+    batching_handler = RedisHandler(urlparse("redis://127.0.0.1:6379"), batch_size=10, flush_ms=50)
+    batching_handler.send(key, "AAA")
+    batching_handler.flush(force=False)
+    assert redis_handler.receive(key) is None
+    time.sleep(0.05)
+    batching_handler.flush(force=False)
+    assert redis_handler.receive(key).decode() == "AAA"
+    batching_handler.close()
+
+
+def test_message_to_redis_flushes_partial_batch_when_idle(redis_handler):
+    message_queue = Queue(maxsize=10)
+    routine = MessageToRedis(key, message_queue, 100, batch_size=8, flush_ms=20, name="to_redis",
+                             logger=logging.getLogger("test_logs.log"))
+    routine.stop_event = Event()
+    routine.as_thread()
+    routine.start()
+    try:
+        for _ in range(3):
+            message_queue.put(Message(np.zeros((1, 1, 1), dtype=np.uint8), "test"))
+        time.sleep(0.1)
+        assert redis_handler.conn.xlen(key) == 3
+    finally:
+        routine.stop_event.set()
+        routine.runner.join()
+
+
+def test_redis_stream_is_trimmed_exactly(redis_handler):
+    trimming_handler = RedisHandler(urlparse("redis://127.0.0.1:6379"), maxlen=5)
+    for _ in range(20):
+        trimming_handler.send(key, "AAA")
+    assert redis_handler.conn.xlen(key) == 5
+    trimming_handler.close()
+
+
+def test_redis_stream_byte_budget(redis_handler):
+    # the budget is kept exactly even when approximate trimming is asked for
+    budget_handler = RedisHandler(urlparse("redis://127.0.0.1:6379"), maxlen=100, approximate_trim=True,
+                                  max_stream_bytes=1000)
+    for _ in range(20):
+        budget_handler.send(key, b"A" * 100)
+    assert redis_handler.conn.xlen(key) == 10
+    budget_handler.close()
+
+
+def test_redis_handlers_share_connection_pool(redis_handler):
+    pools = RedisConnectionPools()
+    sender = RedisHandler("redis://127.0.0.1:6379", connection_pools=pools)
+    reader = RedisHandler(urlparse("redis://127.0.0.1:6379"), connection_pools=pools)
+    assert sender.conn is reader.conn
+    sender.send(key, "AAA")
+    assert reader.read_next_msg(key).decode() == "AAA"
+    sender.close()
+    reader.close()
+    assert len(pools.clients) == 1
+    pools.disconnect()
+    assert pools.clients == {}
+
+
+def test_async_redis_blocking_read_waits_for_message(redis_handler):
+    async def read():
+        pools = RedisConnectionPools()
+        readers = [AsyncRedisHandler("redis://127.0.0.1:6379", block_ms=50, connection_pools=pools)
+                   for _ in range(2)]
+        for reader in readers:
+            await reader.connect()
+        assert readers[0].conn is readers[1].conn
+        start = time.monotonic()
+        assert await readers[0].read_most_recent_msg(key) is None
+        assert time.monotonic() - start >= 0.04
+        threading.Timer(0.01, redis_handler.send, (key, "AAA")).start()
+        msg = await readers[0].read_most_recent_msg(key)
+        for reader in readers:
+            await reader.close()
+        assert pools.async_clients == {}
+        return msg
+
+    assert asyncio.run(read()).decode() == "AAA"
+
+
+@pytest.fixture(scope="function")
+def ring_handlers():
+    writer = SharedMemoryRingHandler(maxlen=3)
+    reader = SharedMemoryRingHandler(block_ms=100)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_ring_send(ring_handlers):
+    writer, reader = ring_handlers
+    assert reader.receive(key) is None
+    writer.send(key, b"A")
+    assert reader.receive(key) == b"A"
+
+
+def test_ring_read_next_msg(ring_handlers):
+    writer, reader = ring_handlers
+    writer.send(key, b"AAA")
+    writer.send(key, b"BBB")
+    assert reader.read_next_msg(key) == b"BBB"
+    writer.send(key, b"CCC")
+    writer.send(key, b"DDD")
+    assert reader.read_next_msg(key) == b"CCC"
+    assert reader.read_next_msg(key) == b"DDD"
+
+
+def test_ring_read_next_msg_skips_overwritten_messages(ring_handlers):
+    writer, reader = ring_handlers
+    writer.send(key, b"A")
+    assert reader.read_next_msg(key) == b"A"
+    for msg in (b"B", b"C", b"D", b"E", b"F"):
+        writer.send(key, msg)
+    assert [reader.read_next_msg(key) for _ in range(3)] == [b"D", b"E", b"F"]
+
+
+def test_ring_read_most_recent_message_cannot_read_the_same_message(ring_handlers):
+    writer, reader = ring_handlers
+    reader.block_ms = None
+    writer.send(key, b"AAA")
+    writer.send(key, b"BBB")
+    assert reader.read_most_recent_msg(key) == b"BBB"
+    assert reader.read_most_recent_msg(key) is None
+
+
+def test_ring_read_waits_for_message(ring_handlers):
+    writer, reader = ring_handlers
+    writer.send(key, b"AAA")
+    assert reader.read_next_msg(key) == b"AAA"
+    threading.Timer(0.05, writer.send, (key, b"BBB")).start()
+    assert reader.read_next_msg(key) == b"BBB"
+
+
+def test_ring_grows_for_large_messages(ring_handlers):
+    writer, reader = ring_handlers
+    writer.send(key, b"A")
+    assert reader.read_next_msg(key) == b"A"
+    large_msg = os.urandom(2 * SharedMemoryRingHandler.SLOT_SIZE)
+    writer.send(key, large_msg)
+    assert reader.read_next_msg(key) == large_msg
+
+
+def test_ring_is_deleted_on_close(ring_handlers):
+    writer, reader = ring_handlers
+    writer.send(key, b"A")
+    assert reader.read_next_msg(key) == b"A"
+    writer.close()
+    reader.block_ms = None
+    assert reader.read_next_msg(key) is None
+    assert not [name for name in os.listdir("/dev/shm") if name.startswith("pipert_ring_" + key)]
+
+
+def test_ring_is_capped_by_its_byte_budget():
+    writer = SharedMemoryRingHandler(maxlen=100, max_ring_bytes=SharedMemoryRingHandler.SLOT_SIZE * 10)
+    writer.send(key, b"A")
+    assert writer.out_rings[key].slot_count == 10
+    writer.send(key, os.urandom(SharedMemoryRingHandler.SLOT_SIZE * 10))
+    assert writer.out_rings[key].slot_count == 2
+    writer.close()
+
+
+def test_ring_lock_is_released_when_another_thread_times_out(monkeypatch):
+    monkeypatch.setattr(_SemaphoreLock, "TIMEOUT", 0.05)
+    lock = _get_write_lock("test_ring_lock")
+
+    def write():
+        # gives up waiting for the lock and takes it anyway
+        with lock:
+            pass
+
+    try:
+        with lock:
+            waiter = threading.Thread(target=write)
+            waiter.start()
+            waiter.join()
+        assert lock.semaphore.value == 1
+    finally:
+        _unlink_write_lock("test_ring_lock")
@@ -7,7 +7,7 @@ if sys.version_info.minor == 8:
 else:
     from pipert.core.shared_memory import SharedMemoryGenerator as smGen
 from pipert.core.message import Message, FramePayload, message_encode, \
-    message_decode, PredictionPayload, FrameMetadataPayload
+    message_decode, PredictionPayload, FrameMetadataPayload, PICKLE_FORMAT, BINARY_FORMAT
 
 
 class DummyMessage(Message):
@@ -109,3 +109,72 @@ def test_prediction_payload_decode_encode():
     decoded_message = message_decode(encoded_message)
     decoded_message_data = decoded_message.get_payload()
     assert preds == decoded_message_data
+
+
+def test_get_age():
+    msg = create_msg()
+    assert msg.get_age() is None
+    msg.history["first"]["entry"] = time.time() - 1
+    msg.history["second"]["entry"] = time.time()
+    assert round(msg.get_age()) == 1
+
+
+def test_shared_copy():
+    frame = np.ones((2, 2), dtype=np.uint8)
+    msg = Message((frame, {"label": 1}), "source")
+    msg.record_custom("component", "entry")
+    shared = msg.shared_copy()
+    shared_frame, metadata = shared.get_payload()
+    assert shared.id == msg.id
+    assert np.shares_memory(shared_frame, frame)
+    assert not shared_frame.flags.writeable
+    assert frame.flags.writeable
+    metadata["label"] = 2
+    shared.record_custom("component", "exit")
+    assert msg.get_payload()[1] == {"label": 1}
+    assert "exit" not in msg.history["component"]
+
+
+def test_binary_format_decodes_frame_without_copying():
+    msg = create_msg()
+    msg.record_custom("component", "entry")
+    encoded_msg = message_encode(msg)
+    assert encoded_msg[0] == BINARY_FORMAT
+    decoded_msg = message_decode(encoded_msg, lazy=True)
+    assert decoded_msg.payload.encoded
+    frame = decoded_msg.get_payload()
+    assert (frame == msg.get_payload()).all()
+    assert np.shares_memory(frame, np.frombuffer(encoded_msg, dtype=np.uint8))
+    assert decoded_msg.history == msg.history
+
+
+def test_binary_format_keeps_metadata_and_exit():
+    msg = Message((np.arange(12, dtype=np.int16).reshape(3, 4), {"id": 2}), "localhost")
+    msg.reached_exit = True
+    decoded_msg = message_decode(message_encode(msg))
+    frame, metadata = decoded_msg.get_payload()
+    assert frame.dtype == np.int16 and frame.shape == (3, 4)
+    assert (frame == msg.get_payload()[0]).all()
+    assert metadata == {"id": 2}
+    assert decoded_msg.reached_exit
+
+
+def test_pickle_format_is_still_decoded():
+    msg = create_msg()
+    img = msg.get_payload()
+    decoded_msg = message_decode(message_encode(msg, wire_format=PICKLE_FORMAT))
+    assert decoded_msg.id == msg.id
+    assert (decoded_msg.get_payload() == img).all()
+
+
+def test_shared_memory_frame_is_a_view():
+    generator = DummyGenerator()
+    msg = create_msg()
+    img = msg.get_payload()
+    decoded_msg = message_decode(message_encode(msg, generator))
+    frame = decoded_msg.get_payload()
+    assert not frame.flags.writeable
+    assert (frame == img).all()
+    generator.cleanup()
+    # the view keeps the mapping after the memory is deleted
+    assert (frame == img).all()
@@ -2,16 +2,26 @@ import logging
 
 import pytest
 import time
+import multiprocessing as mp
 import os
+from threading import Thread
 
 if os.environ.get('TORCHVISION', 'no') == 'yes':
     from torch.multiprocessing import Event
 else:
     from multiprocessing import Event
-from pipert.core.routine import Events
+import numpy as np
+from pipert.core.message import Message
+from pipert.core.routine import Events, Pacer, State
+from pipert.core.time_breakdown import TimeBreakdown
 from pipert.core.errors import NoRunnerException
+from pipert.core.event_loop import EventLoopThread
+from pipert.core.utlis.monitored_queue import MonitoredQueue
+from pipert.core.utlis.reorder_buffer import ReorderBuffer, ReplicaLink, OrderedOutputQueue
+from queue import Queue
 from tests.pipert.core.utils.routines.dummy_routines import DummySleepRoutine, \
-    DummyRoutine, dummy_before_stop_handler, DummyCrashingRoutine
+    DummyRoutine, dummy_before_stop_handler, DummyCrashingRoutine, \
+    DummyConsumerRoutine, DummyBatchRoutine, DummyWorkerRoutine, DummyAsyncRoutine, DummyAsyncConsumerRoutine
 
 
 def dummy_before_handler(routine):
@@ -176,3 +186,280 @@ def test_setup_not_existing_extension():
     }
     r = DummyRoutine(extensions=extension)
     assert len(r._event_handlers) == 0
+
+
+def test_routine_waits_for_input():
+    q = Queue(maxsize=1)
+    routine = DummyConsumerRoutine(q, wakeup_interval=0.01)
+    assert routine.get_input_queues() == [q]
+    routine.as_thread()
+    routine.start()
+    time.sleep(0.05)
+    assert routine.calls == 0
+    q.put(1)
+    time.sleep(0.05)
+    assert routine.consumed == [1]
+    start = time.time()
+    routine.stop_event.set()
+    routine.runner.join()
+    assert time.time() - start < 0.1
+
+
+def test_wait_for_input_wakes_on_any_queue():
+    first, second = MonitoredQueue(Queue(maxsize=1)), MonitoredQueue(Queue(maxsize=1))
+    routine = DummyConsumerRoutine(first, wakeup_interval=1)
+    Thread(target=lambda: (time.sleep(0.05), second.put(1))).start()
+    start = time.time()
+    assert routine._wait_for_input([first, second])
+    assert time.time() - start < 0.5
+    assert first._listeners == [] and second._listeners == []
+
+
+def test_routine_polls_without_wait_for_input():
+    q = Queue(maxsize=1)
+    routine = DummyConsumerRoutine(q, wait_for_input=False)
+    routine.as_thread()
+    routine.start()
+    time.sleep(0.05)
+    routine.stop_event.set()
+    routine.runner.join()
+    assert routine.calls > 0
+    assert routine.consumed == []
+
+
+def test_batch_routine_keeps_order():
+    in_queue, out_queue = Queue(maxsize=10), Queue(maxsize=10)
+    for i in range(5):
+        in_queue.put(i)
+    routine = DummyBatchRoutine(in_queue, out_queue, max_batch=3, max_wait_ms=10)
+    routine.as_thread()
+    routine.start()
+    results = [out_queue.get(timeout=1) for _ in range(5)]
+    routine.stop_event.set()
+    routine.runner.join()
+    assert results == [0, 2, 4, 6, 8]
+    assert routine.batch_sizes == [3, 2]
+
+
+def test_batch_routine_flushes_on_timeout():
+    in_queue, out_queue = Queue(maxsize=10), Queue(maxsize=10)
+    routine = DummyBatchRoutine(in_queue, out_queue, max_batch=8, max_wait_ms=50)
+    routine.as_thread()
+    routine.start()
+    in_queue.put(1)
+    assert out_queue.get(timeout=1) == 2
+    routine.stop_event.set()
+    routine.runner.join()
+    assert routine.batch_sizes == [1]
+
+
+def test_batch_routine_drops_oldest_result():
+    in_queue, out_queue = Queue(maxsize=10), Queue(maxsize=2)
+    for i in range(5):
+        in_queue.put(i)
+    routine = DummyBatchRoutine(in_queue, out_queue, max_batch=5, max_wait_ms=10, drop_oldest=True)
+    routine.state = State()
+    assert routine.main_logic()
+    assert [out_queue.get(block=False) for _ in range(2)] == [6, 8]
+    assert routine.state.dropped == 3
+
+
+def test_thread_pool_shares_queues():
+    in_queue, out_queue = Queue(), Queue()
+    for i in range(30):
+        in_queue.put(i)
+    routine = DummyWorkerRoutine(in_queue, out_queue).as_thread_pool(3)
+    routine.start()
+    results = [out_queue.get(timeout=1) for _ in range(30)]
+    routine.stop_event.set()
+    routine.join()
+    assert len(routine.runners) == 3
+    assert sorted(item for item, _ in results) == list(range(30))
+    assert {replica for _, replica in results} == {0, 1, 2}
+
+
+@pytest.mark.parametrize("put_method", ["put", "put_nowait", "put_latest"])
+def test_ordered_thread_pool_keeps_order(put_method):
+    # a component queue, which has a put_latest of its own
+    in_queue, out_queue = Queue(), MonitoredQueue(Queue())
+    for i in range(30):
+        in_queue.put(i)
+    routine = DummyWorkerRoutine(in_queue, out_queue, put_method).as_thread_pool(3, ordered=True)
+    routine.start()
+    results = [out_queue.get(timeout=1) for _ in range(30)]
+    routine.stop_event.set()
+    routine.join()
+    assert [item for item, _ in results] == list(range(30))
+
+
+def test_ordered_output_queue_refuses_unknown_puts():
+    out_queue = OrderedOutputQueue(Queue(), ReplicaLink(ReorderBuffer(Event())))
+    with pytest.raises(AttributeError):
+        out_queue.put_many([1, 2])
+    assert out_queue.qsize() == 0
+
+
+def test_fire_event_does_not_leak_event_kwargs():
+    r = DummyRoutine()
+    calls = []
+
+    def handler(routine, value=None):
+        calls.append(value)
+
+    r.add_event_handler(Events.AFTER_LOGIC, handler, value=1)
+    r._fire_event(Events.AFTER_LOGIC, value=2)
+    r._fire_event(Events.AFTER_LOGIC)
+    r._fire_event(Events.BEFORE_LOGIC)
+    assert calls == [2, 1]
+
+    r.remove_event_handler(handler, Events.AFTER_LOGIC)
+    r._fire_event(Events.AFTER_LOGIC)
+    assert calls == [2, 1]
+
+
+def test_pacer_policies():
+    drop = Pacer(10, policy="drop")
+    assert drop.next_start(0, 0.05) == (0.1, 0)
+    next_start, missed = drop.next_start(0, 0.35)
+    assert (round(next_start, 2), missed) == (0.3, 3)
+
+    burst = Pacer(10, policy="burst")
+    assert burst.next_start(0, 0.35) == (0.1, 1)
+
+    skip = Pacer(10, policy="skip-to-latest")
+    assert skip.next_start(0, 0.35) == (0.35, 1)
+
+    with pytest.raises(ValueError):
+        Pacer(10, policy="unknown")
+
+
+def test_pacer_keeps_pace_without_frame_rate():
+    pacer = Pacer(10)
+    assert not pacer.set_fps(0)
+    assert pacer.period == pytest.approx(0.1)
+    assert pacer.set_fps(20)
+    assert pacer.period == pytest.approx(0.05)
+    with pytest.raises(ValueError):
+        Pacer(0)
+
+
+def test_pacer_does_not_drift():
+    routine = DummySleepRoutine(0.005)
+    routine._extension_pace(50)
+    routine.as_thread()
+    routine.start()
+    time.sleep(1)
+    routine.stop_event.set()
+    routine.runner.join()
+    assert 48 <= routine.state.count <= 52
+    assert routine.state.missed_deadlines == 0
+
+
+def test_time_breakdown():
+    q = Queue(maxsize=1)
+    routine = DummyConsumerRoutine(q, wakeup_interval=0.01,
+                                   extensions={"time_breakdown": {"report_interval": 60}})
+    routine.add_event_handler(Events.AFTER_LOGIC, lambda r: time.sleep(0.01))
+    routine.as_thread()
+    routine.start()
+    for i in range(5):
+        q.put(i)
+    time.sleep(0.1)
+    routine.stop_event.set()
+    routine.runner.join()
+    breakdown = routine.time_breakdown.as_dict()
+    assert breakdown["iterations"] == 5
+    assert breakdown["wait"] > 0
+    assert breakdown["handler"] >= 0.05
+    assert 0 <= breakdown["utilization"] <= 1
+
+
+def test_time_breakdown_adds_up_across_processes():
+    breakdown = TimeBreakdown()
+    breakdown.add({"wait": 1., "logic": 2.}, 3., 2.)
+    # the iteration of a routine that runs in a process of its own
+    child = mp.Process(target=breakdown.add, args=({"logic": 1., "custom": 0.5}, 2., 1.5))
+    child.start()
+    child.join()
+    totals = breakdown.as_dict()
+    assert totals["iterations"] == 2
+    assert totals["wait"] == 1. and totals["logic"] == 3.5
+    assert totals["wall"] == 5. and totals["busy"] == 3.5
+    assert totals["utilization"] == 0.7
+
+
+def test_shed_stale():
+    r = DummyRoutine(max_age_ms=100)
+    r.state = State()
+    msg = Message(np.zeros(1), "localhost")
+    assert not r.shed_stale(msg)
+    msg.history["comp"]["entry"] = time.time()
+    assert not r.shed_stale(msg)
+    msg.history["comp"]["entry"] = time.time() - 0.2
+    assert r.shed_stale(msg)
+    assert r.state.shed == 1
+
+
+def test_async_routine_as_thread():
+    r = DummyAsyncRoutine().as_thread()
+    r.stop_event = Event()
+    assert r.is_async()
+    r.start()
+    time.sleep(0.05)
+    r.stop_event.set()
+    r.runner.join()
+    assert r.counter > 0
+
+
+def test_async_routine_wakes_on_input():
+    q = MonitoredQueue(Queue(maxsize=1))
+    routine = DummyAsyncConsumerRoutine(q, wakeup_interval=1).as_asyncio(EventLoopThread())
+    routine.start()
+    try:
+        time.sleep(0.05)
+        q.put(1)
+        time.sleep(0.1)
+        assert routine.consumed == [1]
+    finally:
+        start = time.time()
+        routine.stop_event.set()
+        q.wake_waiters()
+        routine.runner.join()
+    assert time.time() - start < 0.5
+
+
+def test_async_time_breakdown():
+    q = MonitoredQueue(Queue(maxsize=1))
+    routine = DummyAsyncConsumerRoutine(q, wakeup_interval=0.01,
+                                        extensions={"time_breakdown": {"report_interval": 60}})
+    routine.add_event_handler(Events.AFTER_LOGIC, lambda r: time.sleep(0.01))
+    routine.as_asyncio(EventLoopThread())
+    routine.start()
+    for i in range(5):
+        q.put(i)
+    time.sleep(0.1)
+    routine.stop_event.set()
+    routine.runner.join()
+    breakdown = routine.time_breakdown.as_dict()
+    assert breakdown["iterations"] == 5
+    assert breakdown["wait"] > 0
+    assert breakdown["handler"] >= 0.05
+
+
+def test_paced_async_routine_does_not_block_the_event_loop():
+    event_loop_thread = EventLoopThread()
+    paced = DummyAsyncRoutine(name="paced", extensions={"pace": {"fps": 2}})
+    free = DummyAsyncRoutine(name="free")
+    for routine in (paced, free):
+        routine.stop_event = Event()
+        routine.as_asyncio(event_loop_thread)
+        routine.start()
+    try:
+        time.sleep(0.3)
+        assert paced.counter == 1
+        assert free.counter > 20
+    finally:
+        for routine in (paced, free):
+            routine.stop_event.set()
+            routine.runner.join()
+    assert paced.state.missed_deadlines == 0
@@ -1,3 +1,7 @@
+import gc
+
+import numpy as np
+
 import pipert.core.shared_memory as sm
 
 
@@ -46,3 +50,25 @@ def test_write_and_read_from_memory():
     memory.release_semaphore()
     assert data == b"AAA"
     generator.cleanup()
+
+
+def test_frame_view_outlives_the_memory():
+    generator = DummySharedMemoryGenerator()
+    frame = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    memory_name = generator.get_next_shared_memory(size=frame.nbytes)
+    memory = sm.get_shared_memory_object(memory_name)
+    memory.write_array(frame)
+    view = np.frombuffer(sm.map_shared_memory(memory_name), dtype=np.uint8).reshape(3, 4)
+    assert not view.flags.writeable
+    assert sm.get_live_mappings()[memory_name] == 1
+    generator.cleanup()
+    assert (view == frame).all()
+    row = view[1]
+    del view
+    gc.collect()
+    assert sm.get_live_mappings()[memory_name] == 1
+    assert (row == frame[1]).all()
+    del row
+    gc.collect()
+    assert memory_name not in sm.get_live_mappings()
+    assert sm.map_shared_memory(memory_name) is None
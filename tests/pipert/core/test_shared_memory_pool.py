@@ -0,0 +1,177 @@
+import gc
+import os
+import subprocess
+import threading
+
+import numpy as np
+import pytest
+import sys
+if sys.version_info.minor == 8:
+    from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen
+else:
+    from pipert.core.shared_memory import SharedMemoryGenerator as smGen
+from pipert.core.message import Message, message_encode, message_decode
+from pipert.core.shared_memory_pool import SharedMemoryPool, SharedMemorySlot, acknowledge_slot, read_slot, \
+    remove_orphaned_segments, get_shared_memory_stats, owned_name
+
+
+def read_frame(slot, dtype=np.uint8):
+    buffer = read_slot(slot)
+    return None if buffer is None else np.frombuffer(buffer, dtype=dtype)
+
+
+def test_write_and_read_slot():
+    pool = SharedMemoryPool("test_pool", slot_size=16, slot_count=2)
+    frame = np.arange(16, dtype=np.uint8)
+    slot = pool.write(frame)
+    assert slot.index == 0 and slot.generation == 1
+    view = read_frame(slot)
+    assert (view == frame).all()
+    assert not view.flags.writeable
+    assert (read_frame(pool.write(frame[:8])) == frame[:8]).all()
+    pool.cleanup()
+
+
+def test_reused_slot_is_not_read():
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=2, lease_ttl=0)
+    first = pool.write(np.zeros(4, dtype=np.uint8))
+    pool.write(np.ones(4, dtype=np.uint8))
+    third = pool.write(np.full(4, 2, dtype=np.uint8))
+    assert third.index == first.index
+    late_reads = get_shared_memory_stats()["late_reads"]
+    assert read_frame(first) is None
+    assert get_shared_memory_stats()["late_reads"] == late_reads + 1
+    assert (read_frame(third) == 2).all()
+    pool.cleanup()
+
+
+def test_recreated_pool_is_mapped_again():
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=1)
+    old_slot = pool.write(np.zeros(4, dtype=np.uint8))
+    assert read_frame(old_slot) is not None
+    pool.cleanup()
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=1)
+    assert (read_frame(pool.write(np.ones(4, dtype=np.uint8))) == 1).all()
+    assert read_frame(old_slot) is None
+    pool.cleanup()
+
+
+def test_messages_use_the_pool_of_the_generator():
+    generator = smGen("pool_component", max_count=2)
+    frame = np.ones((4, 4), dtype=np.uint8)
+    msg = Message(frame, "source")
+    decoded_msg = message_decode(message_encode(msg, generator), lazy=True)
+    assert isinstance(decoded_msg.payload.data, SharedMemorySlot)
+    assert (decoded_msg.get_payload() == frame).all()
+
+    # a frame larger than a slot gets a shared memory of its own
+    large_msg = Message(np.ones((8, 8), dtype=np.uint8), "source")
+    decoded_msg = message_decode(message_encode(large_msg, generator), lazy=True)
+    assert isinstance(decoded_msg.payload.data, str)
+    assert decoded_msg.get_payload().shape == (8, 8)
+    generator.cleanup()
+    assert generator.pool is None
+
+
+def test_leased_slot_is_reused_once_acknowledged():
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=2)
+    first = pool.write(np.zeros(4, dtype=np.uint8))
+    second = pool.write(np.ones(4, dtype=np.uint8))
+    fallbacks = get_shared_memory_stats()["pool_fallbacks"]
+    assert pool.write(np.ones(4, dtype=np.uint8)) is None
+    assert get_shared_memory_stats()["pool_fallbacks"] == fallbacks + 1
+
+    assert read_frame(second) is not None
+    acknowledge_slot(second)
+    third = pool.write(np.full(4, 2, dtype=np.uint8))
+    assert third.index == second.index
+    assert (read_frame(first) == 0).all()
+    pool.cleanup()
+
+
+@pytest.mark.skipif(sys.version_info.minor == 8, reason="readers are only counted with posix_ipc")
+def test_slot_is_reused_once_every_reader_acknowledged():
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=1)
+    slot = pool.write(np.zeros(4, dtype=np.uint8))
+    first_reader, second_reader = read_frame(slot), read_frame(slot)
+    assert (first_reader == 0).all()
+    acknowledge_slot(slot)
+    # the second reader still holds the frame
+    assert pool.write(np.ones(4, dtype=np.uint8)) is None
+    assert (second_reader == 0).all()
+    acknowledge_slot(slot)
+    assert pool.write(np.ones(4, dtype=np.uint8)).index == slot.index
+    pool.cleanup()
+
+
+def test_expired_lease_is_reclaimed():
+    pool = SharedMemoryPool("test_pool", slot_size=4, slot_count=1, lease_ttl=0)
+    first = pool.write(np.zeros(4, dtype=np.uint8))
+    expired_leases = get_shared_memory_stats()["expired_leases"]
+    second = pool.write(np.ones(4, dtype=np.uint8))
+    assert second.index == first.index
+    assert get_shared_memory_stats()["expired_leases"] == expired_leases + 1
+    pool.cleanup()
+
+
+def test_released_frame_acknowledges_its_slot():
+    generator = smGen("pool_component", max_count=2)
+    frame = np.ones((4, 4), dtype=np.uint8)
+
+    def send():
+        return message_decode(message_encode(Message(frame, "source"), generator), lazy=True)
+
+    row = send().get_payload()[1]
+    send().get_payload()
+    gc.collect()
+    # the slot of the released frame is reused, the one of the row is leased
+    assert isinstance(send().payload.data, SharedMemorySlot)
+    assert isinstance(send().payload.data, str)
+    del row
+    gc.collect()
+    assert isinstance(send().payload.data, SharedMemorySlot)
+    generator.cleanup()
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_remove_orphaned_segments():
+    # a run of the component that crashed without cleaning up
+    generator = smGen(owned_name("orphan_component", dead_pid()), max_count=5)
+    generator.write_to_pool(np.zeros(16, dtype=np.uint8))
+    generator.pool = None
+    running = smGen(owned_name("orphan_component"), max_count=5)
+    running.write_to_pool(np.zeros(16, dtype=np.uint8))
+    removed, leaked_bytes = remove_orphaned_segments("orphan_component")
+    assert removed == 1
+    assert leaked_bytes >= 16
+    assert [name for name in os.listdir("/dev/shm") if name.startswith("orphan_component_")] == \
+        [running.pool.name]
+    assert remove_orphaned_segments("orphan_component") == (0, 0)
+    running.cleanup()
+
+
+def test_routine_threads_create_one_pool_of_the_configured_size():
+    generator = smGen("pool_component", max_count=2, slot_size=64)
+    frames = [np.full(size, size, dtype=np.uint8) for size in (16, 32, 48, 64)]
+    barrier = threading.Barrier(len(frames))
+    slots = {}
+
+    def write(frame):
+        barrier.wait()
+        slots[frame.size] = generator.write_to_pool(frame)
+
+    threads = [threading.Thread(target=write, args=(frame,)) for frame in frames]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert generator.pool.slot_size == 64
+    written = [slot for slot in slots.values() if slot is not None]
+    assert len(written) == 2
+    assert {slot.instance for slot in written} == {generator.pool.instance}
+    generator.cleanup()
@@ -1,11 +1,16 @@
+import asyncio
 import os
+import random
+import threading
 import time
-from pipert.core.routine import Routine, Events
+from pipert.core.routine import Routine, BatchRoutine, Events
+from pipert.core.utlis.queue_handler import put_latest
 if os.environ.get('TORCHVISION', 'no') == 'yes':
     from torch.multiprocessing import Event
 else:
     from multiprocessing import Event
 import logging
+from queue import Empty
 
 
 class DummyCrashingRoutine(Routine):
@@ -113,3 +118,181 @@ class DummyRoutineWithQueue(Routine):
     def does_routine_use_queue(self, queue):
         return self.queue == queue
 
+
+
+class DummyConsumerRoutine(Routine):
+    def __init__(self, in_queue, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.stop_event = Event()
+        self.in_queue = in_queue
+        self.calls = 0
+        self.consumed = []
+
+    def main_logic(self, *args, **kwargs):
+        self.calls += 1
+        try:
+            self.consumed.append(self.in_queue.get(block=False))
+            return True
+        except Empty:
+            return False
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn"
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.in_queue == queue
+
+
+class DummyBatchRoutine(BatchRoutine):
+    def __init__(self, in_queue, out_queue, *args, **kwargs):
+        super().__init__(in_queue, out_queue, logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.stop_event = Event()
+        self.batch_sizes = []
+
+    def main_logic_batch(self, msgs):
+        self.batch_sizes.append(len(msgs))
+        return [msg * 2 for msg in msgs]
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+
+class DummyWorkerRoutine(Routine):
+    def __init__(self, in_queue, out_queue, put_method="put", *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.stop_event = Event()
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        # "put", "put_nowait" or "put_latest"
+        self.put_method = put_method
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            item = self.in_queue.get(block=False)
+        except Empty:
+            return False
+        time.sleep(random.uniform(0, 0.01))
+        if self.put_method == "put_latest":
+            put_latest(self.out_queue, (item, self.replica_index))
+        else:
+            getattr(self.out_queue, self.put_method)((item, self.replica_index))
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn",
+            "out_queue": "QueueOut",
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return (self.in_queue == queue) or (self.out_queue == queue)
+
+
+class DummyAsyncRoutine(Routine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.counter = 0
+        self.threads = set()
+
+    async def main_logic(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        self.counter += 1
+        await asyncio.sleep(0.001)
+        return True
+
+    async def setup(self, *args, **kwargs):
+        self.counter = 0
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        return Routine.get_constructor_parameters()
+
+    def does_routine_use_queue(self, queue):
+        return False
+
+
+class DummyFrameRoutine(Routine):
+    def __init__(self, in_queue, out_queue, *args, **kwargs):
+        kwargs.setdefault("logger", logging.getLogger("test_logs.log"))
+        super().__init__(*args, **kwargs)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            msg = self.in_queue.get(block=False)
+        except Empty:
+            return False
+        msg.update_payload(msg.get_payload() + 1)
+        self.out_queue.put(msg)
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn",
+            "out_queue": "QueueOut",
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return (self.in_queue == queue) or (self.out_queue == queue)
+
+
+class DummyAsyncConsumerRoutine(DummyAsyncRoutine):
+    def __init__(self, in_queue, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_event = Event()
+        self.in_queue = in_queue
+        self.consumed = []
+
+    async def main_logic(self, *args, **kwargs):
+        try:
+            self.consumed.append(self.in_queue.get(block=False))
+            return True
+        except Empty:
+            return False
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn"
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.in_queue == queue
@@ -0,0 +1,105 @@
+from pipert.core.message import Message
+from pipert.core.utlis import BroadcastQueue, MonitoredQueue, wait_not_empty, wake_waiters
+from queue import Empty, Full
+import numpy as np
+import pytest
+import time
+from threading import Thread
+
+
+def test_every_subscriber_gets_every_item():
+    broadcast_queue = BroadcastQueue(maxsize=4)
+    first = broadcast_queue.subscribe("first")
+    second = broadcast_queue.subscribe("second")
+    for i in range(3):
+        broadcast_queue.put(i)
+    assert [first.get(block=False) for _ in range(3)] == [0, 1, 2]
+    assert second.qsize() == 3
+    assert [second.get(block=False) for _ in range(3)] == [0, 1, 2]
+    with pytest.raises(Empty):
+        first.get(block=False)
+    assert broadcast_queue.empty()
+
+
+def test_subscriber_policies():
+    broadcast_queue = BroadcastQueue(maxsize=2, subscriber_policies={"slow": "drop_oldest"})
+    slow = broadcast_queue.subscribe("slow")
+    latest = broadcast_queue.subscribe("latest", policy="latest")
+    for i in range(5):
+        broadcast_queue.put(i)
+    assert [slow.get(block=False) for _ in range(2)] == [3, 4]
+    assert slow.dropped == 3
+    assert latest.get(block=False) == 4
+    assert latest.dropped == 4
+    with pytest.raises(ValueError):
+        broadcast_queue.subscribe("other", policy="unknown")
+
+
+def test_block_subscriber_holds_the_producer():
+    broadcast_queue = BroadcastQueue(maxsize=1)
+    blocking = broadcast_queue.subscribe("blocking", policy="block")
+    broadcast_queue.put(1)
+    with pytest.raises(Full):
+        broadcast_queue.put(2, block=False)
+    with pytest.raises(Full):
+        broadcast_queue.put(2, timeout=0.05)
+    Thread(target=lambda: (time.sleep(0.05), blocking.get())).start()
+    broadcast_queue.put(2, timeout=1)
+    assert blocking.get(block=False) == 2
+    # put_latest never waits for a blocking subscriber
+    broadcast_queue.put(3)
+    assert broadcast_queue.put_latest(4)
+    assert blocking.get(block=False) == 4
+
+
+def test_messages_share_a_read_only_frame():
+    broadcast_queue = BroadcastQueue(maxsize=1)
+    first = broadcast_queue.subscribe("first")
+    second = broadcast_queue.subscribe("second")
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    broadcast_queue.put(Message(frame, "source"))
+    first_msg = first.get(block=False)
+    second_msg = second.get(block=False)
+    first_frame = first_msg.get_payload()
+    assert np.shares_memory(first_frame, frame)
+    assert np.shares_memory(second_msg.get_payload(), frame)
+    with pytest.raises(ValueError):
+        first_frame[0, 0, 0] = 1
+    first_msg.update_payload(first_frame + 1)
+    first_msg.record_custom("component", "section")
+    assert second_msg.get_payload().sum() == 0
+    assert "component" not in second_msg.history
+
+
+def test_wait_not_empty_and_wake_waiters():
+    broadcast_queue = BroadcastQueue()
+    subscriber = broadcast_queue.subscribe("subscriber")
+    assert not wait_not_empty(subscriber, timeout=0.01)
+    Thread(target=lambda: (time.sleep(0.05), wake_waiters(subscriber))).start()
+    start = time.time()
+    assert not wait_not_empty(subscriber, timeout=5)
+    assert time.time() - start < 1
+    broadcast_queue.put(1)
+    assert wait_not_empty(subscriber, timeout=0)
+
+
+def test_broadcast_queue_is_read_through_subscribers():
+    broadcast_queue = BroadcastQueue()
+    broadcast_queue.put(1)
+    with pytest.raises(TypeError):
+        broadcast_queue.get()
+
+
+def test_monitored_subscribers_report_gets_and_drops():
+    monitored_queue = MonitoredQueue(BroadcastQueue(maxsize=2))
+    fast = monitored_queue.subscribe("fast")
+    slow = monitored_queue.subscribe("slow")
+    for i in range(4):
+        monitored_queue.put_latest(i)
+        assert fast.get(block=False) == i
+    # the slow subscriber missed the two oldest items
+    assert slow.get(block=False) == 2
+    stats = monitored_queue.get_stats()
+    assert stats["enqueued"] == 4
+    assert stats["dequeued"] == 5
+    assert stats["dropped"] == 2
@@ -0,0 +1,60 @@
+from pipert.core.utlis import LatestValueSlot, QueueHandler, put_latest, wait_not_empty, wake_waiters
+from queue import Empty, Queue
+import pytest
+import time
+from threading import Thread
+
+
+def test_put_overwrites_and_counts_drops():
+    slot = LatestValueSlot()
+    assert not slot.put_latest(1)
+    assert slot.put_latest(2)
+    slot.put(3, block=False)
+    assert slot.dropped == 2
+    assert slot.get() == 3
+    assert slot.empty()
+
+
+def test_get_waits_for_newer_version():
+    slot = LatestValueSlot()
+    slot.put(1)
+    assert slot.get() == 1
+    with pytest.raises(Empty):
+        slot.get(block=False)
+    with pytest.raises(Empty):
+        slot.get(timeout=0.05)
+    Thread(target=lambda: (time.sleep(0.05), slot.put(2))).start()
+    assert slot.get(timeout=1) == 2
+
+
+def test_get_newer_does_not_take_the_value():
+    slot = LatestValueSlot()
+    slot.put("a")
+    value, version = slot.get_newer(0)
+    assert value == "a"
+    with pytest.raises(Empty):
+        slot.get_newer(version, timeout=0.05)
+    assert slot.get(block=False) == "a"
+
+
+def test_wake_waiters():
+    slot = LatestValueSlot()
+    Thread(target=lambda: (time.sleep(0.05), wake_waiters(slot))).start()
+    start = time.time()
+    assert not wait_not_empty(slot, timeout=1)
+    assert time.time() - start < 0.5
+
+
+def test_put_latest_on_queue():
+    q = Queue(maxsize=1)
+    assert not put_latest(q, 1)
+    assert put_latest(q, 2)
+    assert q.get(block=False) == 2
+    assert q.empty()
+
+
+def test_queue_handler_on_slot():
+    q_handler = QueueHandler(LatestValueSlot())
+    assert q_handler.deque_non_blocking_put(1)
+    assert not q_handler.deque_non_blocking_put(2)
+    assert q_handler.get() == 2
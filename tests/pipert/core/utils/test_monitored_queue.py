@@ -0,0 +1,95 @@
+from pipert.core.utlis import LatestValueSlot, MonitoredQueue, QueueHandler, wait_not_empty
+from queue import Full, Queue
+import pytest
+import time
+from threading import Event, Thread
+
+
+def test_counts_items():
+    q = MonitoredQueue(Queue(maxsize=2))
+    q.put(1)
+    q.put(2)
+    with pytest.raises(Full):
+        q.put(3, block=False)
+    q.get()
+    stats = q.get_stats()
+    assert (stats["enqueued"], stats["dequeued"], stats["high_water"], stats["size"]) == (2, 1, 2, 1)
+
+
+def test_counts_drops():
+    q = MonitoredQueue(Queue(maxsize=1))
+    QueueHandler(q).deque_non_blocking_put(1)
+    QueueHandler(q).deque_non_blocking_put(2)
+    slot = MonitoredQueue(LatestValueSlot())
+    slot.put(1)
+    slot.put(2)
+    assert q.get_stats()["dropped"] == 1
+    assert slot.get_stats()["dropped"] == 1
+    assert q.get() == slot.get() == 2
+
+
+def test_wait_times():
+    q = MonitoredQueue(Queue(maxsize=1))
+    Thread(target=lambda: (time.sleep(0.05), q.put(1))).start()
+    assert wait_not_empty(q, timeout=1)
+    Thread(target=lambda: (time.sleep(0.05), q.get())).start()
+    q.put(2, timeout=1)
+    stats = q.get_stats()
+    assert stats["get_wait"] >= 0.04
+    assert stats["put_wait"] >= 0.04
+
+
+def test_shared_counters():
+    q = MonitoredQueue(Queue(maxsize=1), shared=True)
+    q.put(1)
+    assert q.get_stats()["enqueued"] == 1
+
+
+def test_drop_oldest_policy():
+    q = MonitoredQueue(Queue(maxsize=2), policy="drop_oldest")
+    for item in range(3):
+        q.put(item, block=False)
+    assert [q.get(), q.get()] == [1, 2]
+    assert q.get_stats()["dropped"] == 1
+
+
+def test_drop_newest_policy():
+    q = MonitoredQueue(Queue(maxsize=2), policy="drop_newest")
+    for item in range(3):
+        q.put(item)
+    assert QueueHandler(q).deque_non_blocking_put(3) is False
+    assert [q.get(), q.get()] == [0, 1]
+    assert q.get_stats()["dropped"] == 2
+
+
+def test_block_policy_timeout():
+    q = MonitoredQueue(Queue(maxsize=1), policy="block", timeout_ms=50)
+    q.put(1, block=False)
+    start = time.time()
+    q.put(2, block=False)
+    assert time.time() - start >= 0.05
+    assert q.get() == 1
+    assert q.get_stats()["dropped"] == 1
+
+
+def test_block_policy_waits_for_room():
+    q = MonitoredQueue(Queue(maxsize=1), policy="block")
+    q.put(1)
+    Thread(target=lambda: (time.sleep(0.05), q.get())).start()
+    q.put(2)
+    assert q.get() == 2
+    assert q.get_stats()["dropped"] == 0
+
+
+def test_block_policy_stops():
+    stop_event = Event()
+    q = MonitoredQueue(Queue(maxsize=1), policy="block", stop_event=stop_event)
+    q.put(1)
+    Thread(target=lambda: (time.sleep(0.05), stop_event.set())).start()
+    q.put(2)
+    assert q.get_stats()["dropped"] == 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        MonitoredQueue(Queue(), policy="drop_everything")
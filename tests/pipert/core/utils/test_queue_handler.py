@@ -1,7 +1,9 @@
-from pipert.core.utlis import QueueHandler
+from pipert.core.utlis import BroadcastQueue, MonitoredQueue, QueueHandler, SharedMemoryQueue, \
+    wait_any_not_empty, wait_not_empty, wake_waiters
 from queue import Queue
 import pytest
 import time
+from threading import Thread
 
 
 @pytest.fixture
@@ -64,3 +66,50 @@ def test_deque_non_blocking_put(q_handler):
     assert q_handler.deque_non_blocking_put(1)
     assert not q_handler.deque_non_blocking_put(2)
     assert q_handler.get() == 2
+
+
+def test_wait_not_empty(q_handler):
+    start = time.time()
+    assert not q_handler.wait_not_empty(0.1)
+    assert time.time() - start > 0.1
+    Thread(target=q_handler.put, args=(1,)).start()
+    assert q_handler.wait_not_empty(1)
+    assert q_handler.get() == 1
+
+
+def test_wake_waiters(q_handler):
+    start = time.time()
+    waiter = Thread(target=wait_not_empty, args=(q_handler.q, 1))
+    waiter.start()
+    time.sleep(0.05)
+    wake_waiters(q_handler.q)
+    waiter.join()
+    assert time.time() - start < 0.5
+
+
+def test_wait_any_not_empty_on_subscribers():
+    broadcast = MonitoredQueue(BroadcastQueue(maxsize=1))
+    first, second = broadcast.subscribe("first"), broadcast.subscribe("second")
+    assert not wait_any_not_empty([first, second], 0.01)
+    Thread(target=lambda: (time.sleep(0.05), broadcast.put(1))).start()
+    start = time.time()
+    assert wait_any_not_empty([first, second], 1)
+    assert time.time() - start < 0.5
+
+
+def test_wait_any_not_empty_across_processes():
+    first = SharedMemoryQueue(maxsize=1, name="test_wait_any_1")
+    second = SharedMemoryQueue(maxsize=1, name="test_wait_any_2")
+    Thread(target=lambda: (time.sleep(0.05), second.put(1))).start()
+    start = time.time()
+    assert wait_any_not_empty([MonitoredQueue(first), MonitoredQueue(second)], 1)
+    assert time.time() - start < 0.5
+    assert second.get(block=False) == 1
+
+
+def test_wait_any_not_empty_wakes_waiters():
+    first, second = MonitoredQueue(Queue(maxsize=1)), MonitoredQueue(Queue(maxsize=1))
+    Thread(target=lambda: (time.sleep(0.05), second.wake_waiters())).start()
+    start = time.time()
+    assert not wait_any_not_empty([first, second], 1)
+    assert time.time() - start < 0.5
@@ -0,0 +1,57 @@
+import os
+from multiprocessing.connection import wait
+from queue import Empty, Full
+
+import numpy as np
+import pytest
+
+from pipert.core.message import Message
+from pipert.core.utlis.shared_memory_queue import SharedMemoryQueue
+
+
+def shared_memories(prefix):
+    return [name for name in os.listdir("/dev/shm") if prefix in name]
+
+
+def test_frame_passes_through_shared_memory():
+    q = SharedMemoryQueue(maxsize=2, name="test_smq_pass")
+    frame = np.arange(24, dtype=np.uint8).reshape((2, 4, 3))
+    q.put(Message(frame, "source"))
+    assert len(shared_memories("test_smq_pass")) > 0
+
+    msg = q.get(timeout=1)
+    assert np.array_equal(msg.get_payload(), frame)
+    assert shared_memories("test_smq_pass") == []
+
+
+def test_full_queue_restores_message():
+    q = SharedMemoryQueue(maxsize=1, name="test_smq_full")
+    q.put(Message(np.zeros((2, 2)), "source"))
+    msg = Message(np.ones((2, 2)), "source")
+    with pytest.raises(Full):
+        q.put(msg, block=False)
+    assert not msg.payload.encoded
+    assert np.array_equal(msg.get_payload(), np.ones((2, 2)))
+
+    q.drain()
+    assert shared_memories("test_smq_full") == []
+    with pytest.raises(Empty):
+        q.get(block=False)
+
+
+def test_wait_not_empty():
+    q = SharedMemoryQueue(maxsize=1, name="test_smq_wait")
+    assert not q.wait_not_empty(0.01)
+    q.put("item")
+    assert q.wait_not_empty(1)
+    assert q.get(block=False) == "item"
+
+
+def test_wait_handle():
+    first = SharedMemoryQueue(maxsize=1, name="test_smq_handle_1")
+    second = SharedMemoryQueue(maxsize=1, name="test_smq_handle_2")
+    assert wait([first.wait_handle, second.wait_handle], 0.01) == []
+    second.put("item")
+    assert wait([first.wait_handle, second.wait_handle], 1) == [second.wait_handle]
+    assert second.qsize() == 1
+    assert second.get(block=False) == "item"
@@ -0,0 +1,99 @@
+from pipert.core.utlis import QueueHandler, SpscQueue, wait_not_empty, wake_waiters
+from queue import Empty, Full
+import pytest
+import time
+from threading import Thread
+
+
+def test_put_get_in_order():
+    q = SpscQueue(maxsize=3)
+    for item in range(3):
+        q.put(item)
+    assert q.full()
+    assert [q.get() for _ in range(3)] == [0, 1, 2]
+    assert q.empty()
+
+
+def test_non_blocking():
+    q = SpscQueue(maxsize=1)
+    with pytest.raises(Empty):
+        q.get(block=False)
+    q.put(1, block=False)
+    with pytest.raises(Full):
+        q.put(2, block=False)
+
+
+def test_timeouts():
+    q = SpscQueue(maxsize=1)
+    start = time.time()
+    with pytest.raises(Empty):
+        q.get(timeout=0.1)
+    assert time.time() - start >= 0.1
+    q.put(1)
+    with pytest.raises(Full):
+        q.put(2, timeout=0.1)
+
+
+def test_blocking_get_wakes_on_put():
+    q = SpscQueue(maxsize=1)
+    Thread(target=lambda: (time.sleep(0.05), q.put(1))).start()
+    assert q.get(timeout=1) == 1
+
+
+def test_blocking_put_wakes_on_get():
+    q = SpscQueue(maxsize=1)
+    q.put(1)
+    Thread(target=lambda: (time.sleep(0.05), q.get())).start()
+    q.put(2, timeout=1)
+    assert q.get(block=False) == 2
+
+
+def test_many_items_between_threads():
+    q = SpscQueue(maxsize=4)
+    received = []
+
+    def consume():
+        for _ in range(10000):
+            received.append(q.get(timeout=1))
+
+    consumer = Thread(target=consume)
+    consumer.start()
+    for item in range(10000):
+        q.put(item, timeout=1)
+    consumer.join()
+    assert received == list(range(10000))
+
+
+def test_queue_handler_drop_oldest():
+    q_handler = QueueHandler(SpscQueue(maxsize=1))
+    q_handler.put(1)
+    q_handler.deque_non_blocking_put(2)
+    assert q_handler.get() == 2
+
+
+def test_put_latest_while_consuming():
+    q = SpscQueue(maxsize=2)
+    received = []
+
+    def consume():
+        while not received or received[-1] != 9999:
+            try:
+                received.append(q.get(timeout=1))
+            except Empty:
+                return
+
+    consumer = Thread(target=consume)
+    consumer.start()
+    for item in range(10000):
+        q.put_latest(item)
+    consumer.join()
+    assert received[-1] == 9999
+    assert all(a < b for a, b in zip(received, received[1:]))
+
+
+def test_wake_waiters():
+    q = SpscQueue(maxsize=1)
+    Thread(target=lambda: (time.sleep(0.05), wake_waiters(q))).start()
+    start = time.time()
+    assert not wait_not_empty(q, timeout=1)
+    assert time.time() - start < 0.5